@@ -1,22 +1,30 @@
-from PySide6.QtCore import Qt ,QSortFilterProxyModel
+from PySide6.QtCore import Qt
 from PySide6.QtGui import QKeySequence
-from PySide6.QtWidgets import QWidget, QMenu, QApplication, QTableWidgetItem
+from PySide6.QtWidgets import QWidget, QMenu, QApplication, QTableWidgetItem, QMessageBox
 from amazon_order_ui import Ui_Form
 from orderForm import orderForm
 from pandasModel import PandasModel
+from pandasProxyModel import PandasProxyModel
+from persistQueue import PersistQueue
+import runArtifacts
 import pandas as pd
 import datetime
 import webbrowser
 
 
 class AmazonOrderWindow(QWidget):
+    PRESHIPPED_SAVE_DELAY_MS = 1500
+
     def __init__(self, root_path):
         super().__init__()
         self.ui = Ui_Form()
         self.ui.setupUi(self)
         self._root_path = root_path
+        self.persist = PersistQueue()
+        self.persist.failed.connect(self.persist_failed)
 
-        df = pd.read_excel(root_path+'amazon_order'+datetime.date.today().strftime("%m%d%y")+'.xlsx', dtype=str)
+        self._amazon_order_path = root_path+'amazon_order'+datetime.date.today().strftime("%m%d%y")+'.xlsx'
+        df = runArtifacts.load(self._amazon_order_path)
         df_history = pd.read_excel(root_path+'appdata/order_history.xlsx')
         preshipped = pd.read_excel(root_path+'appdata/preshipped.xlsx', dtype=str)
 
@@ -25,19 +33,19 @@ class AmazonOrderWindow(QWidget):
         preshipped.fillna('', inplace=True)
         
         self.model = PandasModel(df)
-        self.proxymodel = QSortFilterProxyModel()
+        self.proxymodel = PandasProxyModel()
         self.proxymodel.setSourceModel(self.model)
         self.proxymodel.setFilterCaseSensitivity(Qt.CaseInsensitive)
         self.ui.tableView.setModel(self.proxymodel)
 
         self.model_history = PandasModel(df_history)
-        self.proxymodel_history = QSortFilterProxyModel()
+        self.proxymodel_history = PandasProxyModel()
         self.proxymodel_history.setSourceModel(self.model_history)
         self.ui.tableView_2.setModel(self.proxymodel_history)
         self.proxymodel_history.setFilterCaseSensitivity(Qt.CaseInsensitive)
 
         self.model_preshipped = PandasModel(preshipped)
-        self.proxymodel_preshipped = QSortFilterProxyModel()
+        self.proxymodel_preshipped = PandasProxyModel()
         self.proxymodel_preshipped.setSourceModel(self.model_preshipped)
         self.ui.tableView_3.setModel(self.proxymodel_preshipped)
         self.ui.tableView_3.resizeColumnsToContents()
@@ -81,21 +89,13 @@ class AmazonOrderWindow(QWidget):
         self.context_menu.exec(point)
     
     def delete_unshipped(self):
-        rows = []
-        for item in self.ui.tableView.selectedIndexes():
-            r = self.ui.tableView.model().headerData(item.row(), Qt.Vertical)
-            if int(r) not in rows:
-                rows.append(int(r))
+        rows = {self.proxymodel.mapToSource(item).row() for item in self.ui.tableView.selectedIndexes()}
 
-        self.model._data.drop(rows, inplace=True)
-        self.model._data.drop(columns=['Last Order']).to_excel(self._root_path+'amazon_order'+datetime.date.today().strftime("%m%d%y")+'.xlsx', index=False)
+        self.model.remove_rows(list(rows))
+        # Hand the trimmed list over right away, the xlsx export and its cache follow in the background.
+        runArtifacts.publish(self._amazon_order_path, self.model._data.drop(columns=['Last Order']))
+        self.persist.schedule(self._amazon_order_path, lambda: self.model._data.drop(columns=['Last Order']), write=runArtifacts.export)
 
-        self.model = PandasModel(self.model._data)
-        self.proxymodel = QSortFilterProxyModel()
-        self.proxymodel.setSourceModel(self.model)
-        self.proxymodel.setFilterCaseSensitivity(Qt.CaseInsensitive)
-        self.ui.tableView.setModel(self.proxymodel)
-        
 
     # Ctrl + C -> Copy function implement.
     def keyPressEvent(self, event) -> None:
@@ -115,6 +115,11 @@ class AmazonOrderWindow(QWidget):
             return
         super().keyPressEvent(event)
 
+    # Write pending edits and deletes before the window goes away.
+    def closeEvent(self, event):
+        self.persist.flush()
+        super().closeEvent(event)
+
     def table_double_clicked(self,item):
         # if item.data().lower().startswith(('http://','https://')):
         #     webbrowser.open(item.data())
@@ -147,26 +152,16 @@ class AmazonOrderWindow(QWidget):
 
     # Delete order history
     def delete_history(self):
-        rows = []
-        for item in self.ui.tableView_2.selectedIndexes():
-            r = self.ui.tableView_2.model().headerData(item.row(), Qt.Vertical)
-            if int(r) not in rows:
-                rows.append(int(r))
-        # print(rows)
-
-        self.model_history._data.drop(rows, inplace=True)
-        self.model_history._data.reset_index(drop=True, inplace=True)
-        self.model_history._data.to_excel(self._root_path+'appdata/order_history.xlsx', index=False)
-        
-        self.refresh_button_clicked()
+        rows = {self.proxymodel_history.mapToSource(item).row() for item in self.ui.tableView_2.selectedIndexes()}
+
+        self.model_history.remove_rows(list(rows), reset_index=True)
+        self.persist.schedule(self._root_path+'appdata/order_history.xlsx', lambda: self.model_history._data, index=False)
 
 
     def refresh_button_clicked(self):
+        self.persist.flush()
         df_history = pd.read_excel(self._root_path+'appdata/order_history.xlsx')
-        self.model_history = PandasModel(df_history)
-        self.proxymodel_history = QSortFilterProxyModel()
-        self.proxymodel_history.setSourceModel(self.model_history)
-        self.ui.tableView_2.setModel(self.proxymodel_history)
+        self.model_history._data = df_history
 
 
 ################################################################################################
@@ -190,27 +185,17 @@ class AmazonOrderWindow(QWidget):
         memo = ''
         item_name = self.ui.tableView.model().data(self.ui.tableView.model().index(r, 12))
         # print(r, c)
-        self.model_preshipped._data = pd.concat([self.model_preshipped._data, pd.Series([order_id, sku, memo, item_name], index=self.model_preshipped._data.columns).to_frame().T], ignore_index=True)
-        self.model_preshipped._data.to_excel(self._root_path+'appdata/preshipped.xlsx', index=False, engine='openpyxl')
+        self.model_preshipped.append_rows(pd.DataFrame([[order_id, sku, memo, item_name]], columns=self.model_preshipped._data.columns))
+        self.save_preshipped()
 
     def delete_preshipped(self):
-        r = self.ui.tableView_3.currentIndex().row()
-        c = self.ui.tableView_3.currentIndex().column()
-        self.model_preshipped._data.drop(r, inplace=True)
-        self.model_preshipped._data.reset_index(drop=True, inplace=True)
-        self.model_preshipped = PandasModel(self.model_preshipped._data)
-        self.model_preshipped.datamodified.connect(self.save_preshipped)
-        self.proxymodel_preshipped = QSortFilterProxyModel()
-        self.proxymodel_preshipped.setSourceModel(self.model_preshipped)
-        self.ui.tableView_3.setModel(self.proxymodel_preshipped)
-        self.model_preshipped._data.to_excel(self._root_path+'appdata/preshipped.xlsx', index=False, engine='openpyxl')
+        index = self.proxymodel_preshipped.mapToSource(self.ui.tableView_3.currentIndex())
+        if not index.isValid():
+            return
+        self.model_preshipped.remove_rows([index.row()], reset_index=True)
+        self.save_preshipped()
         
     def refresh_table(self):
-        self.model_preshipped = PandasModel(self.model_preshipped._data)
-        self.model_preshipped.datamodified.connect(self.save_preshipped)
-        self.proxymodel_preshipped = QSortFilterProxyModel()
-        self.proxymodel_preshipped.setSourceModel(self.model_preshipped)
-        self.ui.tableView_3.setModel(self.proxymodel_preshipped)
         self.ui.tableView_3.resizeColumnsToContents()
         
 
@@ -219,9 +204,14 @@ class AmazonOrderWindow(QWidget):
             webbrowser.open("https://sellercentral.amazon.com/orders-v3/order/"+item.data())
 
     # Save preshipped data to excel file.
+    # Edits are coalesced for a short while and written on the persist worker thread,
+    # so typing into the memo column does not block the window.
     def save_preshipped(self):
-        # print('saved')
-        self.model_preshipped._data.to_excel(self._root_path+'appdata/preshipped.xlsx', index=False, engine='openpyxl')
+        self.persist.schedule(self._root_path+'appdata/preshipped.xlsx', lambda: self.model_preshipped._data,
+                              delay_ms=self.PRESHIPPED_SAVE_DELAY_MS, index=False, engine='openpyxl')
+
+    def persist_failed(self, path, error):
+        QMessageBox.warning(self, "Save failed", f"Could not save {path}\n{error}\nClose the file if it is open in Excel and try again.")
 
     
 ################################################################################################
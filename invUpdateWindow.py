@@ -1,14 +1,26 @@
 from PySide6.QtCore import QObject, QThread, Signal
-from PySide6.QtWidgets import QWidget, QMessageBox
+from PySide6.QtWidgets import QWidget, QMessageBox, QCheckBox
 from sp_api.api import Reports
 from sp_api.base.reportTypes import ReportType
 import pandas as pd
-import datetime, json, webbrowser, email, imaplib, os
+import datetime, json, webbrowser, imaplib, os
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from inventoryUpdate_ui import Ui_Form
+import runArtifacts
+from streamlit_inventory.services.square_service import SquareService
+from streamlit_inventory.services.amazon_service import AmazonService
+from streamlit_inventory.services.amazon_feed_service import AmazonFeedService
+from streamlit_inventory.services.allocation_service import AllocationService
+from streamlit_inventory.services.exclusion_service import ExclusionService
+from streamlit_inventory.services.data_service import DataService, SupplierBatch
+from streamlit_inventory.services.pipeline_service import Pipeline, Stage, StageCache, CheckpointCache, file_key
+from streamlit_inventory.services.metrics_service import RunMonitor
+from streamlit_inventory.models.config import ConfigManager
+from streamlit_inventory.models.inventory_schema import enforce_inventory_schema, MemoryReport
 from time import sleep
+from functools import partial
 from sqlalchemy import create_engine
 from sqlalchemy.engine import URL
 
@@ -38,108 +50,222 @@ class Worker(QObject):
     task = Signal(str)
     progress = Signal(int)
 
+    EXTERNAL_MAX_AGE = 30*60  # seconds mail downloads, POS and Amazon results are reused by a rerun
+
     createReportResponse = None
     reportResponse = None
     report = None
 
-    def __init__(self, root_path, check_state):
+    def __init__(self, root_path, check_state, stage_cache=None):
         super().__init__()
         self._root_path = root_path
         self._check_state = check_state
+        # results of stages from earlier runs of the window (see streamlit_inventory/services/pipeline_service.py)
+        self.stage_cache = stage_cache if stage_cache is not None else StageCache()
 
         with open(self._root_path+'appdata/api_keys.json') as f:
             temp = json.load(f)
             self.credentials = temp['credentials']
             self.refresh_token = temp['refresh_token']
 
-        with open(self._root_path+'appdata/keyword_mailadd.json') as f:
-            temp = json.load(f)
-            self.AL_mail = temp['AL']
-            self.VF_mail = temp['VF']
-            self.BY_mail = temp['BY']
-            self.NBF_mail = temp['NBF']
-            self.OUTRE_mail = temp['OUTRE']
-            self.HZ_mail = temp['HZ']
-            self.SNG_mail = temp['SNG']
-            self.MANE_mail = temp['MANE']
+        # compiled and validated before any mail is downloaded; one supplier stage per plan (keyword_mailadd.json)
+        config = ConfigManager(self._root_path)
+        self.data_service = DataService(self._root_path)
+        self.supplier_plans = self.data_service.supplier_plans
+        self.suppliers = list(self.supplier_plans)
+        # duplicate UPCs: 'max', 'sum' or 'prefer' with preferred_suppliers (appdata/allocation.json)
+        allocation = config.get_allocation_config()
+        self.allocation = AllocationService(allocation.policy, allocation.preferred_suppliers)
+        self.exclusions = ExclusionService(self._root_path)
             
     def run(self):
         # InvUpdateWindow.start_update(self)
-        self.createReportResponse = Reports(credentials=self.credentials, refresh_token=self.refresh_token).create_report(reportType=ReportType.GET_MERCHANT_LISTINGS_ALL_DATA)
-        self.update_history = pd.read_excel(self._root_path+'appdata/update_history.xlsx')
-
-        self.task.emit('Loading all_upc_inv')
-        self.load_all_upc_inv()
-        self.progress.emit(5)
-
-        self.task.emit('Updating AL inventory')
-        self.update_AL()
-        self.progress.emit(10)
-
-        self.task.emit('Updating VF inventory')
-        self.update_VF()
-        self.progress.emit(15)
-
-        self.task.emit('Updating BY inventory')
-        self.update_BY()
-        self.progress.emit(20)
-
-        self.task.emit('Updating NBF inventory')
-        self.update_NBF()
-        self.progress.emit(25)
-
-        self.task.emit('Updating OUTRE inventory')
-        self.update_OUTRE()
-        self.progress.emit(30)
-
-        self.task.emit('Updating HZ inventory')
-        self.update_HZ()
-        self.progress.emit(35)
-
-        self.task.emit('Updating SNG inventory')
-        self.update_SNG()
-        self.progress.emit(40)
+        self.amazon = AmazonService(self._root_path)
+        self.memory_report = MemoryReport()
+        # time, memory, I/O and rows of every stage, saved to appdata/runs/ for the Streamlit dashboard
+        self.monitor = RunMonitor('desktop')
+        self.received = {}
+        self.supplier_inv = {}
+
+        # stages run in dependency order; stages cached or checkpointed by an earlier run are skipped
+        pipeline = self.pipeline = Pipeline(self.build_stages(), self.stage_cache)
+        # the first supplier stage to run downloads and parses every supplier that is not cached, large files in a pool
+        self.supplier_batch = SupplierBatch(self.data_service, lambda: [c for c in self.suppliers if not pipeline.cached('supplier_'+c)],
+                                            prepare=self.prepare_supplier, clean=False, monitor=self.monitor)
+        if isinstance(self.stage_cache, CheckpointCache):
+            self.stage_cache.begin_run()
+        pipeline.run(on_stage=self.report_stage, monitor=self.monitor)
+        if isinstance(self.stage_cache, CheckpointCache):
+            self.stage_cache.end_run(pipeline.errors)
+        try:
+            self.monitor.save(self._root_path, 'failed' if pipeline.errors else 'completed', pipeline.errors)
+        except OSError as e:
+            print('\033[31m'+f'Could not save run manifest: {e}'+'\033[0m')
+        print(self.monitor.to_dataframe().to_string(index=False))
+
+        for name, error in pipeline.errors.items():
+            print('\033[31m'+f'{name} failed: {error}. Run the update again to retry from this stage.'+'\033[0m')
+        for name in ('square', 'amazon_feed'):
+            if pipeline.status.get(name) == 'skipped':
+                print('\033[31m'+f'{name} skipped: quantities are not pushed unless every supplier was updated.'+'\033[0m')
+        if 'duplicate' in pipeline.status:
+            print(self.memory_report.to_dataframe().to_string(index=False))
 
-        self.task.emit('Updating MANE inventory')
-        self.update_MANE()
-        self.progress.emit(45)
+        self.progress.emit(100)
+        self.task.emit('Done!' if not pipeline.errors else f'Failed: {", ".join(pipeline.errors)}')
+        self.finished.emit()
 
-        self.task.emit('Updating backorded items')
+    def report_stage(self, stage, index, total, status):
+        if status == 'running':
+            self.task.emit(stage.description)
+        else:
+            self.task.emit(f'{stage.description} ({status})')
+            self.progress.emit(int(100*(index+1)/total))
+
+    def build_stages(self):
+        root = self._root_path
+        suppliers = self.suppliers
+
+        stages = [
+            Stage('listings_request', self.stage_listings_request, outputs=('listings_request',),
+                  max_age=self.EXTERNAL_MAX_AGE, label='Requesting Amazon listings report'),
+            Stage('load', self.stage_load, outputs=('inventory_base',),
+                  key=lambda: file_key(root+'appdata/all_upc_inv.xlsx'), label='Loading all_upc_inv'),
+        ]
+        for comp_name in suppliers:
+            # unchecked suppliers are downloaded from mail, checked ones read the files already in inv_data
+            download = not self._check_state.get(comp_name)
+            plan = self.supplier_plans[comp_name]
+            stages.append(Stage('supplier_'+comp_name, partial(self.stage_supplier, comp_name),
+                                outputs=('supplier_'+comp_name, 'received_'+comp_name),
+                                key=lambda plan=plan, download=download: [repr(plan), download, None if download else file_key(*plan.file_paths(root))],
+                                max_age=self.EXTERNAL_MAX_AGE if download else None,
+                                label=f'Updating {comp_name} inventory'))
+        stages += [
+            Stage('merge', self.stage_merge, inputs=('inventory_base',), optional=tuple('supplier_'+c for c in suppliers),
+                  outputs=('inventory_merged',), label='Merging supplier inventory'),
+            Stage('history', self.stage_history, optional=tuple('received_'+c for c in suppliers),
+                  outputs=('update_history',), label='Updating update history'),
+            Stage('backorder', self.stage_backorder, inputs=('inventory_merged',), outputs=('inventory_backorder',),
+                  key=lambda: file_key(root+ExclusionService.BACKORDER_LIST), label='Updating backorded items'),
+            Stage('duplicate', self.stage_duplicate, inputs=('inventory_backorder',), outputs=('all_upc_inv',),
+                  key=lambda: file_key(root+ExclusionService.DUPLICATE_LIST), label='Updating duplicate items'),
+            Stage('pos', self.stage_pos, inputs=('all_upc_inv',), outputs=('fromPOS',),
+                  max_age=self.EXTERNAL_MAX_AGE, label='Updating POS inventory'),
+        ]
+        # quantities are pushed only when every supplier was read; the merge keeps a failed supplier's
+        # previous rows for the local save, but those must not reach Square or Amazon
+        supplier_outputs = tuple('supplier_'+c for c in suppliers)
+        if self._check_state.get('SQUARE'):
+            stages.append(Stage('square', self.stage_square, inputs=('fromPOS',)+supplier_outputs, label='Updating Square inventory'))
+        stages += [
+            Stage('listings_report', self.stage_listings_report, inputs=('listings_request',), outputs=('listings',),
+                  max_age=self.EXTERNAL_MAX_AGE, label='Waiting for Amazon listings report'),
+            Stage('amazon', self.stage_amazon, inputs=('listings', 'all_upc_inv', 'fromPOS'),
+                  outputs=('all_amazon', 'duplicates'), key=lambda: [self.allocation.policy, self.allocation.preferred_suppliers],
+                  label='Updating Amazon List'),
+        ]
+        if self._check_state.get('AMAZON_FEED'):
+            stages.append(Stage('amazon_feed', self.stage_amazon_feed, inputs=('all_amazon',)+supplier_outputs, label='Pushing Amazon quantities'))
+        stages += [
+            Stage('amazon_ord', self.stage_amazon_ord, inputs=('all_amazon', 'fromPOS', 'all_upc_inv'), outputs=('amazon_order',),
+                  max_age=self.EXTERNAL_MAX_AGE, label='Updating Amazon unshipped list'),
+            Stage('save', self.stage_save, inputs=('all_upc_inv', 'fromPOS', 'all_amazon', 'amazon_order', 'update_history'),
+                  label='Saving inventory data'),
+        ]
+        return stages
+
+    # Each stage_ method sets the attributes the original update_ methods work on from its
+    # inputs, calls them, and returns the attributes they produced.
+
+    def stage_listings_request(self):
+        # Reuse a listings report Amazon finished within AmazonService.LISTINGS_REPORT_MAX_AGE, otherwise request one now
+        documentId = self.amazon.find_recent_report()
+        reportId = None
+        if documentId is None:
+            reportId = Reports(credentials=self.credentials, refresh_token=self.refresh_token).create_report(reportType=ReportType.GET_MERCHANT_LISTINGS_ALL_DATA).payload['reportId']
+        return {'listings_request': (documentId, reportId)}
+
+    def stage_load(self):
+        self.load_all_upc_inv()
+        return {'inventory_base': self.all_upc_inv}
+
+    def stage_supplier(self, comp_name):
+        self.apply_supplier_plan(comp_name)
+        return {'supplier_'+comp_name: self.supplier_inv[comp_name], 'received_'+comp_name: self.received.get(comp_name)}
+
+    def stage_merge(self, inventory_base, **supplier_inv):
+        # replace the rows of every supplier that was read; a failed supplier keeps its previous rows
+        self.all_upc_inv = inventory_base
+        for name, new_inv in supplier_inv.items():
+            if new_inv is None:
+                continue
+            comp_name = name[len('supplier_'):]
+            self.all_upc_inv = self.all_upc_inv[self.all_upc_inv['COMPAY']!=comp_name]
+            self.all_upc_inv = pd.concat([self.all_upc_inv, new_inv])
+            self.all_upc_inv = enforce_inventory_schema(self.all_upc_inv.reset_index(drop=True), list(inventory_base.columns))
+            self.memory_report.record(comp_name, self.all_upc_inv)
+        return {'inventory_merged': self.all_upc_inv}
+
+    def stage_history(self, **received):
+        update_history = pd.read_excel(self._root_path+'appdata/update_history.xlsx')
+        for name, date in received.items():
+            if date is not None:
+                update_history.loc[update_history['Initial']==name[len('received_'):], 'Date'] = date
+        update_history.to_excel(self._root_path+'appdata/update_history.xlsx', index=False)
+        return {'update_history': update_history}
+
+    def stage_backorder(self, inventory_merged):
+        self.all_upc_inv = inventory_merged
         self.update_backord()
-        self.progress.emit(50)
+        return {'inventory_backorder': self.all_upc_inv}
 
-        self.task.emit('Updating duplicate items')
+    def stage_duplicate(self, inventory_backorder):
+        self.all_upc_inv = inventory_backorder
         self.update_duplicate()
-        self.progress.emit(55)
+        return {'all_upc_inv': self.all_upc_inv}
 
-        self.task.emit('Updating POS inventory')
+    def stage_pos(self, all_upc_inv):
+        self.all_upc_inv = all_upc_inv
         self.update_POS()
-        self.progress.emit(60)
-
-        self.reportResponse = Reports(credentials=self.credentials, refresh_token=self.refresh_token).get_report(self.createReportResponse.payload['reportId'])
-        while('reportDocumentId' not in self.reportResponse.payload):
-            sleep(5)
-            self.reportResponse = Reports(credentials=self.credentials, refresh_token=self.refresh_token).get_report(self.createReportResponse.payload['reportId'])
-        f = open(self._root_path+"inv_data\Amazon_All+Listings+Report.txt", "w", encoding='utf-8')
-        Reports(credentials=self.credentials, refresh_token=self.refresh_token).get_report_document(self.reportResponse.payload['reportDocumentId'], file=f)
-        f.close()
+        return {'fromPOS': self.fromPOS}
 
-        self.task.emit('Updating Amazon List')
+    def stage_square(self, fromPOS, **supplier_inv):
+        self.fromPOS = fromPOS
+        self.update_square()
+        return {}
+
+    def stage_listings_report(self, listings_request):
+        documentId, reportId = listings_request
+        if documentId is None:
+            self.reportResponse = Reports(credentials=self.credentials, refresh_token=self.refresh_token).get_report(reportId)
+            while('reportDocumentId' not in self.reportResponse.payload):
+                sleep(5)
+                self.reportResponse = Reports(credentials=self.credentials, refresh_token=self.refresh_token).get_report(reportId)
+            documentId = self.reportResponse.payload['reportDocumentId']
+        # streamed into a typed frame, cached in inv_data/Amazon_All+Listings+Report.feather per document
+        self.listingsDocumentId = documentId
+        return {'listings': self.amazon.read_listings_document(documentId)}
+
+    def stage_amazon(self, listings, all_upc_inv, fromPOS):
+        self.listings, self.all_upc_inv, self.fromPOS = listings, all_upc_inv, fromPOS
         self.update_amazon()
-        self.progress.emit(65)
+        return {'all_amazon': self.all_amazon, 'duplicates': self.duplicates}
 
-        self.task.emit('Updating Amazon unshipped list')
-        self.update_amazon_ord()
-        self.progress.emit(70)
+    def stage_amazon_feed(self, all_amazon, **supplier_inv):
+        self.all_amazon = all_amazon
+        self.update_amazon_feed()
+        return {}
 
-        self.update_history.to_excel(self._root_path+'appdata/update_history.xlsx', index=False)
+    def stage_amazon_ord(self, all_amazon, fromPOS, all_upc_inv):
+        self.all_amazon, self.fromPOS, self.all_upc_inv = all_amazon, fromPOS, all_upc_inv
+        self.update_amazon_ord()
+        return {'amazon_order': self.amazon_order}
 
-        self.task.emit('Saving inventory data')
+    def stage_save(self, all_upc_inv, fromPOS, all_amazon, amazon_order, update_history):
+        self.all_upc_inv, self.fromPOS, self.all_amazon, self.amazon_order = all_upc_inv, fromPOS, all_amazon, amazon_order
         self.save_data()
-        self.progress.emit(100)
-
-        self.task.emit('Done!')
-        self.finished.emit()
+        return {}
 
     def load_all_upc_inv(self):
         # all upc inv import
@@ -151,757 +277,66 @@ class Worker(QObject):
         # save column name for future use
         self.column_name = self.all_upc_inv.columns
 
-        # QMessageBox.information(self, "Info", "Updated")
-
-    def update_AL(self):
-        if self._check_state['AL'] == 0:
-            creds = get_credentials(self._root_path)
-
-            with open(self._root_path+'appdata/gmail_auth.json') as f:
-                temp = json.load(f)
-                email_user = temp['username']
-                email_password = temp['password']
-            
-            auth_string = f"user={email_user}\x01auth=Bearer {creds.token}\x01\x01"
-
-            mail = imaplib.IMAP4_SSL('imap.gmail.com')
-            mail.authenticate('XOAUTH2', lambda x: auth_string)
-            mail.select('"[Gmail]/All Mail"')
-            
-            status, messages = mail.search(None, f'SUBJECT {self.AL_mail["SUBJECT"]} FROM {self.AL_mail["FROM"]}')
-
-            if status == 'OK':
-                # Convert messages list from bytes to list of email IDs
-                messages = messages[0].split()
-
-                res, msg = mail.fetch(messages[-1], '(RFC822)')
-
-                decoded_msg = email.message_from_bytes(msg[0][1])
-                date_recieved = datetime.datetime.strptime(decoded_msg.get('Date'), "%a, %d %b %Y %X %z")
-                self.update_history.loc[self.update_history['Initial']=='AL', 'Date'] = date_recieved.strftime("%d-%b")
-
-                for part in decoded_msg.walk():
-                    if part.get('Content-Disposition'):
-                        filename = part.get_filename()
-                        if 'brs' in filename:
-                            with open(self._root_path+'inv_data/AL_brs inv.xls', 'wb') as f:
-                                f.write(part.get_payload(decode=True))
-                            print(f'AL - {filename} downloaded')
-                        elif 'inv' in filename:
-                            with open(self._root_path+'inv_data/AL_inv.xls', 'wb') as f:
-                                f.write(part.get_payload(decode=True))
-                            print(f'AL - {filename} downloaded')
-            else:
-                print("Failed to retrieve emails.")
-            
-            mail.close()
-            mail.logout()
-
-        # load new inv data
-        # filename = QFileDialog.getOpenFileName(self, "Select File ALICIA (AL) brs inv", "./", "Any Files (*)")
-        # temp1 = pd.read_excel(filename[0])
-        temp1 = pd.read_excel(self._root_path+'inv_data\AL_brs inv.xls')
-
-        # filename = QFileDialog.getOpenFileName(self, "Select File ALICIA (AL) inv", "./", "Any Files (*)")
-        # temp2 = pd.read_excel(filename[0])
-        temp2 = pd.read_excel(self._root_path+'inv_data\AL_inv.xls')
-
-        temp1.columns=['ItemCode', 'ItemCodeDesc', 'Stock Lvl', 'OnHand Customer', 'AliasItemNo', 'StandardUnitPrice']
-        temp2.columns=['ItemCode', 'ItemCodeDesc', 'Stock Lvl', 'OnHand Customer', 'AliasItemNo', 'StandardUnitPrice']
-
-        new_inv = pd.concat([temp1, temp2], ignore_index=True)
-        # get column name for choose upc / company inventory / description / extended description columns
-        column_list = list(new_inv.columns)
-
-        # Select Company name
-        # company_list = ['AL', 'VF', 'BY', 'OUTRE','HZ']
-        comp_name = 'AL'
-
-        # Select UPC column
-        itemlookupcode = 'AliasItemNo'
-
-        # Select Company Inventory column
-        comp_inv = 'OnHand Customer'
-
-        # Select Description column
-        description = 'ItemCode'
-
-        # Select Extended Description column
-        ext_desc = 'ItemCodeDesc'
-
-        # Merge needed columns
-        new_inv = new_inv[[itemlookupcode, comp_inv, description, ext_desc]]
-
-        new_inv.insert(0, 'Company', comp_name)
-
-        # rename columns
-        new_inv.columns = self.column_name
-
-        # pre processing
-        new_inv.dropna(subset=['UPC', 'company Inventory'])
-        new_inv['company Inventory'] = new_inv['company Inventory'].astype('int')
-
-        # delete exist data
-        self.all_upc_inv.drop(self.all_upc_inv[self.all_upc_inv['COMPAY']==comp_name].index, inplace=True)
-
-        # 
-        self.all_upc_inv = pd.concat([self.all_upc_inv, new_inv])
-
-        # reset index
-        self.all_upc_inv = self.all_upc_inv.reset_index(drop=True)
-
-        # self.update_history.loc[self.update_history['Initial']==comp_name, 'Date'] = datetime.date.today().strftime("%d-%b")
-        
-        # QMessageBox.information(self, "Info", "Updated")
-
-    def update_VF(self):
-        if self._check_state['VF'] == 0:
-            creds = get_credentials(self._root_path)
-
-            with open(self._root_path+'appdata/gmail_auth.json') as f:
-                temp = json.load(f)
-                email_user = temp['username']
-                email_password = temp['password']
-            
-            auth_string = f"user={email_user}\x01auth=Bearer {creds.token}\x01\x01"
-
-            mail = imaplib.IMAP4_SSL('imap.gmail.com')
-            mail.authenticate('XOAUTH2', lambda x: auth_string)
-            mail.select('"[Gmail]/All Mail"')
-
-            status, messages = mail.search(None, f'SUBJECT {self.VF_mail["SUBJECT"]} FROM {self.VF_mail["FROM"]}')
-
-            if status == 'OK':
-                # Convert messages list from bytes to list of email IDs
-                messages = messages[0].split()
-
-                res, msg = mail.fetch(messages[-1], '(RFC822)')
-
-                decoded_msg = email.message_from_bytes(msg[0][1])
-                date_recieved = datetime.datetime.strptime(decoded_msg.get('Date'), "%a, %d %b %Y %X %z")
-                self.update_history.loc[self.update_history['Initial']=='VF', 'Date'] = date_recieved.strftime("%d-%b")
-
-                for part in decoded_msg.walk():
-                    if part.get('Content-Disposition') and part.get_content_type() == 'application/vnd.ms-excel':
-                        filename = part.get_filename()
-                        with open(self._root_path+'inv_data/VF_Inventory.xls', 'wb') as f:
-                            f.write(part.get_payload(decode=True))
-                        print(f'VF - {filename} downloaded')
-            else:
-                print("Failed to retrieve emails.")
-
-            mail.close()
-            mail.logout()
-
-        # load new inv data
-        # filename = QFileDialog.getOpenFileName(self, "Select File AMEKOR (VF)", "./", "Any Files (*)")
-        # new_inv = pd.read_excel(filename[0])
-        new_inv = pd.read_excel(self._root_path+'inv_data\VF_Inventory.xls', dtype={'Barcode':str})
-
-        # get column name for choose upc / company inventory / description / extended description columns
-        column_list = list(new_inv.columns)
-
-        # Select Company name
-        # company_list = ['AL', 'VF', 'BY', 'OUTRE','HZ']
-        comp_name = 'VF'
-
-        # Select UPC column
-        itemlookupcode = 'Barcode'
-
-        # Select Company Inventory column
-        comp_inv = 'On hand'
-
-        # Select Description column
-        description = 'Product ID'
-
-        # Select Extended Description column
-        ext_desc = 'SKU'
-
-        # Merge needed columns
-        new_inv = new_inv[[itemlookupcode, comp_inv, description, ext_desc]]
-        new_inv.insert(0, 'Company', comp_name)
-
-        # cast data float to int
-        new_inv.loc[new_inv[itemlookupcode].str.isnumeric()==False, 'Barcode'] = pd.NA
-        new_inv[itemlookupcode]=pd.to_numeric(new_inv[itemlookupcode], downcast='integer')
-
-        # rename columns
-        new_inv.columns =self.column_name
-
-        # pre processing
-        new_inv = new_inv.dropna(subset=['UPC', 'company Inventory'])
-        new_inv['company Inventory'] = new_inv['company Inventory'].astype('int')
-        new_inv['UPC'] = new_inv['UPC'].astype('int64')
-        new_inv.loc[new_inv['company Inventory']<10, 'company Inventory'] = 0
-
-        # delete exist data
-        self.all_upc_inv.drop(self.all_upc_inv[self.all_upc_inv['COMPAY']==comp_name].index, inplace=True)
-
-        # 
-        self.all_upc_inv = pd.concat([self.all_upc_inv, new_inv])
-
-        # reset index
-        self.all_upc_inv = self.all_upc_inv.reset_index(drop=True)
-
-        # self.update_history.loc[self.update_history['Initial']==comp_name, 'Date'] = datetime.date.today().strftime("%d-%b")
-        # QMessageBox.information(self, "Info", "Updated")
-
-    def update_BY(self):
-        if self._check_state['BY'] == 0:
-            creds = get_credentials(self._root_path)
-
-            with open(self._root_path+'appdata/gmail_auth.json') as f:
-                temp = json.load(f)
-                email_user = temp['username']
-                email_password = temp['password']
-            
-            auth_string = f"user={email_user}\x01auth=Bearer {creds.token}\x01\x01"
-
-            mail = imaplib.IMAP4_SSL('imap.gmail.com')
-            mail.authenticate('XOAUTH2', lambda x: auth_string)
-            mail.select('"[Gmail]/All Mail"')
-
-            status, messages = mail.search(None, f'SUBJECT {self.BY_mail["SUBJECT"]} FROM {self.BY_mail["FROM"]}')
-
-            if status == 'OK':
-                # Convert messages list from bytes to list of email IDs
-                messages = messages[0].split()
-
-                res, msg = mail.fetch(messages[-1], '(RFC822)')
-
-                decoded_msg = email.message_from_bytes(msg[0][1])
-                date_recieved = datetime.datetime.strptime(decoded_msg.get('Date'), "%a, %d %b %Y %X %z")
-                self.update_history.loc[self.update_history['Initial']=='BY', 'Date'] = date_recieved.strftime("%d-%b")
-
-                for part in decoded_msg.walk():
-                    if part.get('Content-Disposition'):
-                        filename = part.get_filename()
-                        with open(self._root_path+'inv_data/BY_InventoryListAll.xls', 'wb') as f:
-                            f.write(part.get_payload(decode=True))
-                        print(f'BY - {filename} downloaded')
-            else:
-                print("Failed to retrieve emails.")
-
-            mail.close()
-            mail.logout()
-
-        # load new inv data
-        # filename = QFileDialog.getOpenFileName(self, "Select File BOYANG (BY)", "./", "Any Files (*)")
-        # new_inv = pd.read_excel(filename[0], skiprows=3)
-        new_inv = pd.read_excel(self._root_path+'inv_data\BY_InventoryListAll.xls', skiprows=3)
-
-        # get column name for choose upc / company inventory / description / extended description columns
-        column_list = list(new_inv.columns)
-
-        # Select Company name
-        # company_list = ['AL', 'VF', 'BY', 'OUTRE','HZ']
-        comp_name = 'BY'
-
-        # Select UPC column
-        itemlookupcode = 'Barcode'
-
-        # Select Company Inventory column
-        comp_inv = 'O/H'
-
-        # Select Description column
-        description = 'Item Name'
-
-        # Select Extended Description column
-        ext_desc = 'Color'
-
-        # Merge needed columns
-        new_inv = new_inv[[itemlookupcode, comp_inv, description, ext_desc]]
-
-        new_inv.insert(0, 'Company', comp_name)
-
-        # rename columns
-        new_inv.columns = self.column_name
-
-        # pre processing
-        new_inv = new_inv.dropna(subset=['UPC', 'company Inventory'])
-        new_inv['company Inventory'] = new_inv['company Inventory'].astype('int')
-        # new_inv['UPC'] = new_inv['UPC'].astype('int64')
-        new_inv.loc[new_inv['company Inventory']<10, 'company Inventory'] = 0
-
-        # delete exist data
-        self.all_upc_inv.drop(self.all_upc_inv[self.all_upc_inv['COMPAY']==comp_name].index, inplace=True)
-
-        # 
-        self.all_upc_inv = pd.concat([self.all_upc_inv, new_inv])
-
-        # reset index
-        self.all_upc_inv = self.all_upc_inv.reset_index(drop=True)
-
-        # self.update_history.loc[self.update_history['Initial']==comp_name, 'Date'] = datetime.date.today().strftime("%d-%b")
-        # QMessageBox.information(self, "Info", "Updated")
-
-    def update_NBF(self):
-        if self._check_state['NBF'] == 0:
-            creds = get_credentials(self._root_path)
-
-            with open(self._root_path+'appdata/gmail_auth.json') as f:
-                temp = json.load(f)
-                email_user = temp['username']
-                email_password = temp['password']
-            
-            auth_string = f"user={email_user}\x01auth=Bearer {creds.token}\x01\x01"
-
-            mail = imaplib.IMAP4_SSL('imap.gmail.com')
-            mail.authenticate('XOAUTH2', lambda x: auth_string)
-            mail.select('"[Gmail]/All Mail"')
-
-            status, messages = mail.search(None, f'SUBJECT {self.NBF_mail["SUBJECT"]} FROM {self.NBF_mail["FROM"]}')
-
-            if status == 'OK':
-                # Convert messages list from bytes to list of email IDs
-                messages = messages[0].split()
-
-                res, msg = mail.fetch(messages[-1], '(RFC822)')
-
-                decoded_msg = email.message_from_bytes(msg[0][1])
-                date_recieved = datetime.datetime.strptime(decoded_msg.get('Date'), "%a, %d %b %Y %X %z")
-                self.update_history.loc[self.update_history['Initial']=='NBF', 'Date'] = date_recieved.strftime("%d-%b")
-
-                for part in decoded_msg.walk():
-                    if part.get('Content-Disposition'):
-                        filename = part.get_filename()
-                        if filename.endswith('.xlsx'):
-                            with open(self._root_path+'inv_data/NBF_Chade Fashions.xlsx', 'wb') as f:
-                                f.write(part.get_payload(decode=True))
-                            print(f'NBF - {filename} downloaded')
-            else:
-                print("Failed to retrieve emails.")
-
-            mail.close()
-            mail.logout()
-
-        # load new inv data
-        # filename = QFileDialog.getOpenFileName(self, "Select File CHADE (NBF)", "./", "Any Files (*)")
-        # new_inv = pd.read_excel(filename[0])
-        new_inv = pd.read_excel(self._root_path+'inv_data/NBF_Chade Fashions.xlsx')
-
-        # get column name for choose upc / company inventory / description / extended description columns
-        column_list = list(new_inv.columns)
-
-        # Select Company name
-        # company_list = ['AL', 'VF', 'BY', 'NBF', 'OUTRE','HZ']
-        comp_name = 'NBF'
+        # COMPAY category, UPC text, int32 inventory (streamlit_inventory/models/inventory_schema.py)
+        self.all_upc_inv = enforce_inventory_schema(self.all_upc_inv, list(self.column_name))
+        self.memory_report.record('load', self.all_upc_inv)
 
-        # Select UPC column
-        itemlookupcode = 'UPC Code'
-
-        # Select Company Inventory column
-        comp_inv = 'Unnamed: 6'
-
-        # Select Description column
-        description = 'No.'
-
-        # Select Extended Description column
-        ext_desc = 'Description'
-
-        # Merge needed columns
-        new_inv = new_inv[[itemlookupcode, comp_inv, description, ext_desc]]
-        new_inv.insert(0, 'Company', comp_name)
-
-        # rename columns
-        new_inv.columns = self.column_name
-
-        # pre processing
-        new_inv = new_inv.dropna(subset=['UPC', 'company Inventory'])
-        new_inv[['company Inventory']] = new_inv[['company Inventory']].replace({'A':20, 'B':5, 'C':0, 'X':0})
-
-        # delete exist data
-        self.all_upc_inv.drop(self.all_upc_inv[self.all_upc_inv['COMPAY']==comp_name].index, inplace=True)
-
-        # 
-        self.all_upc_inv = pd.concat([self.all_upc_inv, new_inv])
-
-        # reset index
-        self.all_upc_inv = self.all_upc_inv.reset_index(drop=True)
-
-        # self.update_history.loc[self.update_history['Initial']==comp_name, 'Date'] = datetime.date.today().strftime("%d-%b")
-        # QMessageBox.information(self, "Info", "Updated")
-
-    def update_OUTRE(self):
-        if self._check_state['OUTRE'] == 0:
-            creds = get_credentials(self._root_path)
-
-            with open(self._root_path+'appdata/gmail_auth.json') as f:
-                temp = json.load(f)
-                email_user = temp['username']
-                email_password = temp['password']
-            
-            auth_string = f"user={email_user}\x01auth=Bearer {creds.token}\x01\x01"
-
-            mail = imaplib.IMAP4_SSL('imap.gmail.com')
-            mail.authenticate('XOAUTH2', lambda x: auth_string)
-            mail.select('Company/Outre')
-
-            status, messages = mail.search(None, f'SUBJECT {self.OUTRE_mail["SUBJECT"]}')
-
-            if status == 'OK':
-                # Convert messages list from bytes to list of email IDs
-                messages = messages[0].split()
-
-                res, msg = mail.fetch(messages[-1], '(RFC822)')
-
-                decoded_msg = email.message_from_bytes(msg[0][1])
-                date_recieved = datetime.datetime.strptime(decoded_msg.get('Date'), "%d %b %Y %X %z")
-                self.update_history.loc[self.update_history['Initial']=='OUTRE', 'Date'] = date_recieved.strftime("%d-%b")
-                
-                for part in decoded_msg.walk():
-                    filename = part.get('Content-Type').split('name=')[-1]
-                    if filename.endswith('.csv'):
-                        with open(self._root_path+'inv_data/OUTRE_StockAvailability.csv', 'wb') as f:
-                            f.write(part.get_payload(decode=True))
-                        print(f'OUTRE - {filename} downloaded')
-            else:
-                print("Failed to retrieve emails.")
-
-            mail.close()
-            mail.logout()
-
-        # load new inv data
-        # filename = QFileDialog.getOpenFileName(self, "Select File SUN TAIYANG (OUTRE)", "./", "Any Files (*)")
-        # new_inv = pd.read_csv(filename[0], sep='\t', encoding='utf_16', on_bad_lines='warn', skiprows=[1], skipfooter=1)
-        new_inv = pd.read_csv(self._root_path+'inv_data\OUTRE_StockAvailability.csv', sep='\t', encoding='utf_16', on_bad_lines='warn', skiprows=[1], skipfooter=1, engine='python')
-
-        # get column name for choose upc / company inventory / description / extended description columns
-        column_list = list(new_inv.columns)
-        
-        # Select Company name
-        # company_list = ['AL', 'VF', 'BY', 'NBF', 'OUTRE','HZ']
-        comp_name = 'OUTRE'
-
-        # Select UPC column
-        itemlookupcode = 'BARCODE'
-
-        # Select Company Inventory column
-        comp_inv = 'AVAIL'
-
-        # Select Description column
-        description = 'ITEM'
-
-        # Select Extended Description column
-        ext_desc = 'COLOR'
-
-        # Merge needed columns
-        new_inv = new_inv[[itemlookupcode, comp_inv, description, ext_desc]]
-
-        new_inv.insert(0, 'Company', comp_name)
-
-        # cast data float to int
-        # new_inv[comp_inv] = new_inv[comp_inv].astype('Int32')
-
-        # rename columns
-        new_inv.columns =self.column_name
-
-        # pre processing
-        new_inv = new_inv.dropna(subset=['UPC', 'company Inventory'])
-        new_inv[['company Inventory']] = new_inv[['company Inventory']].replace({'Y':20,'N':0})
-
-        # delete exist data
-        self.all_upc_inv.drop(self.all_upc_inv[self.all_upc_inv['COMPAY']==comp_name].index, inplace=True)
-
-        # 
-        self.all_upc_inv = pd.concat([self.all_upc_inv, new_inv])
-
-        # reset index
-        self.all_upc_inv = self.all_upc_inv.reset_index(drop=True)
-
-        # self.update_history.loc[self.update_history['Initial']==comp_name, 'Date'] = datetime.date.today().strftime("%d-%b")
-        # QMessageBox.information(self, "Info", "Updated")
-
-    def update_HZ(self):
-        if self._check_state['HZ'] == 0:
-            creds = get_credentials(self._root_path)
-
-            with open(self._root_path+'appdata/gmail_auth.json') as f:
-                temp = json.load(f)
-                email_user = temp['username']
-                email_password = temp['password']
-            
-            auth_string = f"user={email_user}\x01auth=Bearer {creds.token}\x01\x01"
-
-            mail = imaplib.IMAP4_SSL('imap.gmail.com')
-            mail.authenticate('XOAUTH2', lambda x: auth_string)
-            mail.select('Company/Sensationnel')
-
-            status, messages = mail.search(None, f'SUBJECT {self.HZ_mail["SUBJECT"]}')
-
-            if status == 'OK':
-                # Convert messages list from bytes to list of email IDs
-                messages = messages[0].split()
-
-                res, msg = mail.fetch(messages[-1], '(RFC822)')
-
-                decoded_msg = email.message_from_bytes(msg[0][1])
-                date_recieved = datetime.datetime.strptime(decoded_msg.get('Date'), "%d %b %Y %X %z")
-                self.update_history.loc[self.update_history['Initial']=='HZ', 'Date'] = date_recieved.strftime("%d-%b")
-                
-                for part in decoded_msg.walk():
-                    filename = part.get('Content-Type').split('name=')[-1]
-                    if filename.endswith('.csv'):
-                        with open(self._root_path+'inv_data/HZ_StockAvailability.csv', 'wb') as f:
-                            f.write(part.get_payload(decode=True))
-                        print(f'HZ - {filename} downloaded')
-            else:
-                print("Failed to retrieve emails.")
-
-            mail.close()
-            mail.logout()
-
-        # load new inv data
-        # filename = QFileDialog.getOpenFileName(self, "Select File SENSATIONNEL (HZ)", "./", "Any Files (*)")
-        # new_inv = pd.read_csv(filename[0], sep='\t', encoding='utf_16', on_bad_lines='warn', skiprows=[1], skipfooter=1)
-        new_inv = pd.read_csv(self._root_path+'inv_data\HZ_StockAvailability.csv', sep='\t', encoding='utf_16', on_bad_lines='warn', skiprows=[1], skipfooter=1, engine='python')
-
-        # get column name for choose upc / company inventory / description / extended description columns
-        column_list = list(new_inv.columns)
-
-        # Select Company name
-        # company_list = ['AL', 'VF', 'BY', 'NBF', 'OUTRE','HZ']
-        comp_name = 'HZ'
-
-        # Select UPC column
-        itemlookupcode = 'BARCODE'
-
-        # Select Company Inventory column
-        comp_inv = 'AVAIL'
-
-        # Select Description column
-        description = 'ITEM'
-
-        # Select Extended Description column
-        ext_desc = 'COLOR'
-
-        # Merge needed columns
-        new_inv = new_inv[[itemlookupcode, comp_inv, description, ext_desc]]
-
-        new_inv.insert(0, 'Company', comp_name)
-
-        # cast data float to int
-        # new_inv[comp_inv] = new_inv[comp_inv].astype('Int32')
-
-        # rename columns
-        new_inv.columns = self.column_name
-
-        # pre processing
-        new_inv = new_inv.dropna(subset=['UPC', 'company Inventory'])
-        new_inv[['company Inventory']] = new_inv[['company Inventory']].replace({'Y':20,'N':0})
-        #######################
-
-        # delete exist data
-        self.all_upc_inv.drop(self.all_upc_inv[self.all_upc_inv['COMPAY']==comp_name].index, inplace=True)
-
-        # 
-        self.all_upc_inv = pd.concat([self.all_upc_inv, new_inv])
-
-        # reset index
-        self.all_upc_inv = self.all_upc_inv.reset_index(drop=True)
-
-        # self.update_history.loc[self.update_history['Initial']==comp_name, 'Date'] = datetime.date.today().strftime("%d-%b")
         # QMessageBox.information(self, "Info", "Updated")
 
-    def update_SNG(self):
-        if self._check_state['SNG'] == 0:
-            creds = get_credentials(self._root_path)
-
-            with open(self._root_path+'appdata/gmail_auth.json') as f:
-                temp = json.load(f)
-                email_user = temp['username']
-                email_password = temp['password']
-            
-            auth_string = f"user={email_user}\x01auth=Bearer {creds.token}\x01\x01"
-
-            mail = imaplib.IMAP4_SSL('imap.gmail.com')
-            mail.authenticate('XOAUTH2', lambda x: auth_string)
-            mail.select('"[Gmail]/All Mail"')
-
-            status, messages = mail.search(None, f'SUBJECT {self.SNG_mail["SUBJECT"]} FROM {self.SNG_mail["FROM"]}')
-
-            if status == 'OK':
-                # Convert messages list from bytes to list of email IDs
-                messages = messages[0].split()
-                
-                downloaded = False
-                index = 0
-
-                while(downloaded == False):
-                    index -= 1
-                    res, msg = mail.fetch(messages[index], '(RFC822)')
-
-                    decoded_msg = email.message_from_bytes(msg[0][1])
-                    date_recieved = datetime.datetime.strptime(decoded_msg.get('Date'), "%a, %d %b %Y %X %z")
-                    self.update_history.loc[self.update_history['Initial']=='SNG', 'Date'] = date_recieved.strftime("%d-%b")
-
-                    for part in decoded_msg.walk():
-                        if part.get('Content-Disposition'):
-                            filename = part.get_filename()
-                            
-                            if len(filename) == 9:
-                                with open(self._root_path+'inv_data/SNG_inv.xlsx', 'wb') as f:
-                                    f.write(part.get_payload(decode=True))
-                                print(f'SNG - {filename} downloaded')
-                                downloaded = True
-            else:
-                print("Failed to retrieve emails.")
-
-            mail.close()
-            mail.logout()
-
-        # load new inv data
-        # filename = QFileDialog.getOpenFileName(self, "Select File SHAKE-N-GO (SNG)", "./", "Any Files (*)")
-        # new_inv = pd.read_excel(filename[0])
-        new_inv = pd.read_excel(self._root_path+'inv_data\SNG_inv.xlsx')
-
-        # get column name for choose upc / company inventory / description / extended description columns
-        column_list = list(new_inv.columns)
-
-        # Select Company name
-        # company_list = ['AL', 'VF', 'BY', 'NBF', 'OUTRE','HZ']
-        comp_name = 'SNG'
-
-        # Select UPC column
-        itemlookupcode = 'Barcode'
-
-        # Select Company Inventory column
-        comp_inv = 'Available'
-
-        # Select Description column
-        description = 'Item'
-
-        # Select Extended Description column
-        ext_desc = 'Descrip'
-
-        # Merge needed columns
-        new_inv = new_inv[[itemlookupcode, comp_inv, description, ext_desc]]
-
-        new_inv.insert(0, 'Company', comp_name)
-
-        # rename columns
-        new_inv.columns =self.column_name
-
-        # pre processing
-        new_inv = new_inv.dropna(subset=['UPC', 'company Inventory'])
-        new_inv[['company Inventory']] = new_inv[['company Inventory']].replace({'Y':20,'N':0})
-
-        # delete exist data
-        self.all_upc_inv.drop(self.all_upc_inv[self.all_upc_inv['COMPAY']==comp_name].index, inplace=True)
-
-        # 
-        self.all_upc_inv = pd.concat([self.all_upc_inv, new_inv])
-
-        # reset index
-        self.all_upc_inv = self.all_upc_inv.reset_index(drop=True)
-
-        # self.update_history.loc[self.update_history['Initial']==comp_name, 'Date'] = datetime.date.today().strftime("%d-%b")
-        # QMessageBox.information(self, "Info", "Updated")
-
-    def update_MANE(self):
-        if self._check_state['MANE'] == 0:
-            creds = get_credentials(self._root_path)
-
-            with open(self._root_path+'appdata/gmail_auth.json') as f:
-                temp = json.load(f)
-                email_user = temp['username']
-                email_password = temp['password']
-            
-            auth_string = f"user={email_user}\x01auth=Bearer {creds.token}\x01\x01"
-
-            mail = imaplib.IMAP4_SSL('imap.gmail.com')
-            mail.authenticate('XOAUTH2', lambda x: auth_string)
-            mail.select('"[Gmail]/All Mail"')
-
-            status, messages = mail.search(None, f'SUBJECT {self.MANE_mail["SUBJECT"]} FROM {self.MANE_mail["FROM"]}')
+    def prepare_supplier(self, comp_name):
+        # unchecked suppliers are downloaded from mail before they are parsed
+        if not self._check_state.get(comp_name):
+            self.download_supplier(comp_name)
 
-            if status == 'OK':
-                # Convert messages list from bytes to list of email IDs
-                messages = messages[0].split()
+    def download_supplier(self, comp_name):
+        # mail folder, search and attachment -> inv_data file mapping come from the supplier's compiled plan
+        plan = self.supplier_plans[comp_name]
+        creds = get_credentials(self._root_path)
 
-                res, msg = mail.fetch(messages[-1], '(RFC822)')
+        with open(self._root_path+'appdata/gmail_auth.json') as f:
+            email_user = json.load(f)['username']
 
-                decoded_msg = email.message_from_bytes(msg[0][1])
-                date_recieved = datetime.datetime.strptime(decoded_msg.get('Date'), "%a, %d %b %Y %X %z")
-                # self.update_history.loc[self.update_history['Initial']=='MANE', 'Date'] = date_recieved.strftime("%d-%b")
-
-                for part in decoded_msg.walk():
-                    if part.get('Content-Disposition'):
-                        filename = part.get_filename()
-                        if filename.endswith('.xlsx'):
-                            with open(self._root_path+'inv_data/MANE_inv.xlsx', 'wb') as f:
-                                f.write(part.get_payload(decode=True))
-                            print(f'MANE - {filename} downloaded')
-            else:
-                print("Failed to retrieve emails.")
+        auth_string = f"user={email_user}\x01auth=Bearer {creds.token}\x01\x01"
 
+        mail = imaplib.IMAP4_SSL('imap.gmail.com')
+        mail.authenticate('XOAUTH2', lambda x: auth_string)
+        try:
+            downloaded, date_recieved = plan.download(mail, self._root_path)
             mail.close()
+        finally:
             mail.logout()
 
-        # load new inv data
-        new_inv = pd.read_excel(self._root_path+'inv_data\MANE_inv.xlsx', dtype={'Barcode':str})
-
-        # get column name for choose upc / company inventory / description / extended description columns
-        column_list = list(new_inv.columns)
-
-        # Select Company name
-        # company_list = ['AL', 'VF', 'BY', 'OUTRE','HZ']
-        comp_name = 'MANE'
-
-        # Select UPC column
-        itemlookupcode = 'Barcode'
-
-        # Select Company Inventory column
-        comp_inv = 'AQOH'
-
-        # Select Description column
-        description = 'Item'
-
-        # Select Extended Description column
-        ext_desc = 'Color'
+        if not downloaded:
+            raise FileNotFoundError(f'No {comp_name} inventory attachment found in mail')
+        for path in downloaded:
+            print(f'{comp_name} - {os.path.basename(path)} downloaded')
+        if plan.record_received:
+            self.received[comp_name] = date_recieved.strftime("%d-%b")
 
-        # Merge needed columns
-        new_inv = new_inv[[itemlookupcode, comp_inv, description, ext_desc]]
-        new_inv.insert(0, 'Company', comp_name)
-
-        # rename columns
-        new_inv.columns =self.column_name
-
-        # pre processing
-        new_inv = new_inv.dropna(subset=['UPC', 'company Inventory'])
-        new_inv['company Inventory'] = new_inv['company Inventory'].astype('int')
-        new_inv['UPC'] = new_inv['UPC'].astype('int64')
-        new_inv.loc[new_inv['company Inventory']<10, 'company Inventory'] = 0
-
-        # delete exist data
-        self.all_upc_inv.drop(self.all_upc_inv[self.all_upc_inv['COMPAY']==comp_name].index, inplace=True)
-
-        # append data
-        self.all_upc_inv = pd.concat([self.all_upc_inv, new_inv])
-
-        # reset index
-        self.all_upc_inv = self.all_upc_inv.reset_index(drop=True)
+    def apply_supplier_plan(self, comp_name):
+        # read the supplier file with its compiled plan (column mapping + processing rules from ConfigManager);
+        # the merge stage replaces the supplier's rows in all_upc_inv. The first supplier taken from the batch
+        # also downloads and parses the others; the batch records each supplier's fetch_ and parse_ steps
+        # under that supplier's stage
+        self.supplier_inv[comp_name] = self.supplier_batch.take(comp_name)
 
     def update_backord(self):
         # filename = QFileDialog.getOpenFileName(self, "Select File backorded_list", "./", "Any Files (*)")
         # backorder_list = pd.read_csv(filename[0], dtype={'upc':str})
-        backorder_list = pd.read_excel(self._root_path+'appdata/backorder_list.xlsx', dtype={'upc':str})
-        self.all_upc_inv['UPC'] = self.all_upc_inv['UPC'].astype(str)
-        self.all_upc_inv['DESCRIPTION'] = self.all_upc_inv['DESCRIPTION'].astype(str)
-        self.all_upc_inv['EXTENDED DESCRIPTION'] = self.all_upc_inv['EXTENDED DESCRIPTION'].astype(str)
-        print(self.all_upc_inv.loc[self.all_upc_inv["UPC"].isin(backorder_list['upc'])])
-        self.all_upc_inv.loc[self.all_upc_inv["UPC"].isin(backorder_list['upc']) , "company Inventory"] = 0
-        self.all_upc_inv[self.all_upc_inv['UPC'].isin(backorder_list['upc'])]
+        # backorder_list.xlsx is compiled once per file change (ExclusionService)
+        self.all_upc_inv, backordered = self.exclusions.apply(self.all_upc_inv, duplicate=False)
+        print(backordered)
+        self.memory_report.record('backorder', self.all_upc_inv)
 
         # QMessageBox.information(self, "Info", "Updated")
 
     def update_duplicate(self):
         # filename = QFileDialog.getOpenFileName(self, "Select File dulplicate_list", "./", "Any Files (*)")
         # duplicate_list = pd.read_csv(filename[0], dtype={'UPC': str, 'DESCRIPTION':str,'EXTENDED DESCRIPTION':str})
-        duplicate_list = pd.read_excel(self._root_path+'appdata/duplicate_list.xlsx', dtype={'UPC': str, 'DESCRIPTION':str,'EXTENDED DESCRIPTION':str})
-
-        duplicate_index = self.all_upc_inv[(self.all_upc_inv['UPC'].isin(duplicate_list['UPC'])&(self.all_upc_inv['DESCRIPTION'].isin(duplicate_list['DESCRIPTION'])&(self.all_upc_inv['EXTENDED DESCRIPTION'].isin(duplicate_list['EXTENDED DESCRIPTION']))))].index
-        self.all_upc_inv.drop(duplicate_index, inplace=True)
+        # rows are removed only when UPC, DESCRIPTION and EXTENDED DESCRIPTION match one entry of duplicate_list.xlsx
+        self.all_upc_inv, duplicates = self.exclusions.apply(self.all_upc_inv, backorder=False)
+        print(f'{len(duplicates)} duplicate items removed')
+        self.memory_report.record('duplicate', self.all_upc_inv)
 
         # QMessageBox.information(self, "Info", "Updated")
         # self.button_dup.setDisabled(True)
@@ -985,48 +420,27 @@ class Worker(QObject):
         # QMessageBox.information(self, "Info", "Updated")
         # self.button_POS.setDisabled(True)
 
+    def update_square(self):
+        # Push Square counts from the fromPOS snapshot update_POS just built, so Square and Amazon
+        # get quantities from the same read of the item table. A failed push raises so the stage is
+        # reported by run() and retried by the next update instead of being cached.
+        summary = SquareService(self._root_path).push_pos_quantities(self.fromPOS)
+
+        for error in summary['errors']:
+            print('\033[31m'+error+'\033[0m')
+        print(f"Square: {summary['changed']} of {summary['total']} counts pushed in {summary['batches']} batches")
+        if summary['failed_batches']:
+            raise RuntimeError(f"{summary['failed_batches']} of {summary['batches']} Square batches failed")
+
     def update_amazon(self):
         # filename = QFileDialog.getOpenFileName(self, "Select File Amazon All List Report", "./", "Any Files (*)")
         # all_amazon = pd.read_csv(filename[0], sep='\t')
-        all_amazon = pd.read_csv(self._root_path+'inv_data\Amazon_All+Listings+Report.txt', sep='\t')
-        all_amazon = all_amazon[['seller-sku', 'asin1', 'item-name', 'item-description', 'listing-id',
-       'price', 'quantity', 'open-date', 'product-id-type', 'item-note',
-       'item-condition', 'will-ship-internationally', 'expedited-shipping',
-       'product-id', 'pending-quantity', 'fulfillment-channel', 'status']]
-        all_amazon['product-id'] = all_amazon['product-id'].astype(str)
-        all_amazon['inv_Sum'] = 0
-        all_amazon['inv_comp'] = 0
-        all_amazon['inv_store'] = 0
-
-        # merge comp inv
-        all_upc_inv = self.all_upc_inv
-
-        comp_inv_data = all_upc_inv[['UPC', 'company Inventory']].rename(columns={'UPC': 'product-id'})
-        comp_inv_data['product-id'] = comp_inv_data['product-id'].astype(str)
-
-
-        if len(all_amazon.merge(comp_inv_data, how='left', on='product-id')) != len(all_amazon):
-            print('\033[31m'+'check duplicate UPC (all_amazon - all_upc_inv)'+'\033[0m')
-        
-        all_amazon['inv_comp'] = all_amazon.merge(comp_inv_data, how='left', on='product-id')['company Inventory']
-
-        all_amazon['inv_comp'].fillna(0, inplace=True)
-        all_amazon['inv_comp'] = all_amazon['inv_comp'].astype(int)
-
-        # merge store inv
-        fromPOS = self.fromPOS
-
-        store_inv_data = fromPOS[['Item Lookup Code', 'FIN QTY']].rename(columns={'Item Lookup Code': 'product-id'})
-        store_inv_data['product-id'] = store_inv_data['product-id'].astype(str)
-
-        all_amazon['inv_store'] = all_amazon.merge(store_inv_data, how='left', on='product-id')['FIN QTY']
-        #print(all_amazon.merge(store_inv_data, how='left', on='product-id')['FIN QTY'].len())
-
-        all_amazon['inv_store'].fillna(0, inplace=True)
-        all_amazon['inv_store'] = all_amazon['inv_store'].astype(int)
-
-        # calc inv_sum
-        all_amazon['inv_Sum'] = all_amazon['inv_store'] + all_amazon['inv_comp']
+        # inv_comp / inv_store / inv_Sum through one row per UPC; duplicate UPCs resolved by the allocation policy
+        all_amazon, duplicates = self.allocation.allocate(self.listings, self.all_upc_inv, self.fromPOS)
+        if len(duplicates):
+            print('\033[31m'+f'check duplicate UPC ({len(duplicates)} conflicting, resolved with {self.allocation.policy})'+'\033[0m')
+            print(duplicates.to_string(index=False))
+        self.duplicates = duplicates
 
         self.all_amazon = all_amazon
         # all_amazon.to_csv('all_amazon.csv', index=False)
@@ -1034,10 +448,27 @@ class Worker(QObject):
         # QMessageBox.information(self, "Info", "Updated")
         # self.button_amazon.setDisabled(True)
 
+    def update_amazon_feed(self):
+        # Only SKUs whose inv_Sum differs from the report quantity are sent; a failed feed raises as in update_square
+        summary = AmazonFeedService(self.amazon).push_quantities(self.all_amazon)
+
+        for error in summary['errors']:
+            print('\033[31m'+error+'\033[0m')
+        print(f"Amazon: {summary['changed']} of {summary['total']} quantities sent in {summary['feeds']} feeds {summary['feed_ids']}")
+        if summary['failed_feeds']:
+            raise RuntimeError(f"{summary['failed_feeds']} of {summary['feeds']} Amazon feeds failed")
+
     def update_amazon_ord(self):
         # filename = QFileDialog.getOpenFileName(self, "Select File Amazon unsshipped order list", "./", "Any Files (*)")
         # unshipped_data = pd.read_csv(filename[0], sep='\t', dtype={'product-id':str})
-        unshipped_data = pd.read_csv(self._root_path+'inv_data\Amazon_unshipped_report.txt', sep='\t', dtype={'product-id':str})
+        # Unshipped orders come from the SP-API order cache; the downloaded report is only a fallback.
+        try:
+            unshipped_data = self.amazon.get_unshipped_feed()
+        except Exception as e:
+            print('\033[31m'+f'Could not get unshipped orders from Amazon, using Amazon_unshipped_report.txt: {e}'+'\033[0m')
+            unshipped_data = pd.read_csv(self._root_path+'inv_data\Amazon_unshipped_report.txt', sep='\t', dtype={'product-id':str})
+        # product-id (UPC) comes from the listings
+        unshipped_data = unshipped_data.drop(columns='product-id', errors='ignore')
 
         all_amazon = self.all_amazon[['seller-sku', 'inv_comp', 'inv_store', 'product-id', 'item-name']]
 
@@ -1070,7 +501,9 @@ class Worker(QObject):
         self.all_upc_inv.to_excel(self._root_path+"appdata/all_upc_inv_backup.xlsx", index=False)
         self.fromPOS.to_csv(self._root_path+'fromPOS'+datetime.date.today().strftime("%m%d%y")+'.csv', index=False)
         # self.all_amazon.to_csv('all_amazon'+datetime.date.today().strftime("%m%d%y")+'.csv', index=False)
-        self.amazon_order.to_excel(self._root_path+'amazon_order'+datetime.date.today().strftime("%m%d%y")+'.xlsx', index=False, freeze_panes=(1,0))
+        amazon_order_path = self._root_path+'amazon_order'+datetime.date.today().strftime("%m%d%y")+'.xlsx'
+        runArtifacts.publish(amazon_order_path, self.amazon_order)
+        runArtifacts.export(amazon_order_path, self.amazon_order, freeze_panes=(1,0))
         # self.update_history.to_excel('appdata/update_history.xlsx', index=False)
         self.update_history = pd.read_excel(self._root_path+'appdata/update_history.xlsx')
 
@@ -1099,6 +532,17 @@ class InvUpdateWindow(QWidget):
         self.ui = Ui_Form()
         self.ui.setupUi(self)
         self._root_path = root_path
+        # stage outputs are checkpointed, so an update that failed or crashed can resume at the failed stage
+        self.stage_cache = CheckpointCache(self._root_path+'appdata/checkpoints')
+
+        # one checkbox per configured supplier; a supplier added in keyword_mailadd.json gets a new one
+        self.supplier_checkboxes = {}
+        for code, config in ConfigManager(self._root_path).get_supplier_configs().items():
+            checkbox = getattr(self.ui, 'checkBox_'+code, None)
+            if checkbox is None:
+                checkbox = QCheckBox(f'{code} - {config.name.upper()}', self)
+                self.ui.verticalLayout.addWidget(checkbox)
+            self.supplier_checkboxes[code] = checkbox
 
         self.ui.pushButton_2.clicked.connect(self.start_update)
 
@@ -1111,17 +555,17 @@ class InvUpdateWindow(QWidget):
         self.ui.progressBar.setValue(n)
 
     def start_update(self):
-        check_state = {'AL': self.ui.checkBox_AL.isChecked(),
-                       'VF': self.ui.checkBox_VF.isChecked(),
-                       'BY': self.ui.checkBox_BY.isChecked(),
-                       'NBF': self.ui.checkBox_NBF.isChecked(),
-                       'OUTRE': self.ui.checkBox_OUTRE.isChecked(),
-                       'HZ': self.ui.checkBox_HZ.isChecked(),
-                       'SNG': self.ui.checkBox_SNG.isChecked(),
-                       'MANE': self.ui.checkBox_MANE.isChecked()}
+        check_state = {code: checkbox.isChecked() for code, checkbox in self.supplier_checkboxes.items()}
+        check_state['SQUARE'] = self.ui.checkBox_Square.isChecked()
+        check_state['AMAZON_FEED'] = self.ui.checkBox_AmazonFeed.isChecked()
+
+        if self.stage_cache.interrupted():
+            resume = QMessageBox.question(self, "Resume update", "The last update did not finish. Resume it from the last completed stage?")
+            if resume != QMessageBox.StandardButton.Yes:
+                self.stage_cache.clear()
 
         self.thread = QThread()
-        self.worker = Worker(self._root_path, check_state)
+        self.worker = Worker(self._root_path, check_state, self.stage_cache)
         self.worker.moveToThread(self.thread)
         self.thread.started.connect(self.worker.run)
         self.worker.finished.connect(self.thread.quit)
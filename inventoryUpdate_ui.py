@@ -125,6 +125,16 @@ class Ui_Form(object):
 
         self.verticalLayout_4.addWidget(self.checkBox_Amazon)
 
+        self.checkBox_Square = QCheckBox(Form)
+        self.checkBox_Square.setObjectName(u"checkBox_Square")
+
+        self.verticalLayout_4.addWidget(self.checkBox_Square)
+
+        self.checkBox_AmazonFeed = QCheckBox(Form)
+        self.checkBox_AmazonFeed.setObjectName(u"checkBox_AmazonFeed")
+
+        self.verticalLayout_4.addWidget(self.checkBox_AmazonFeed)
+
         self.pushButton_bord = QPushButton(Form)
         self.pushButton_bord.setObjectName(u"pushButton_bord")
 
@@ -175,6 +185,8 @@ class Ui_Form(object):
         self.checkBox_bord.setText(QCoreApplication.translate("Form", u"Backorder List", None))
         self.checkBox_POS.setText(QCoreApplication.translate("Form", u"POS Inventory", None))
         self.checkBox_Amazon.setText(QCoreApplication.translate("Form", u"Amazon Unshipped", None))
+        self.checkBox_Square.setText(QCoreApplication.translate("Form", u"Push to Square", None))
+        self.checkBox_AmazonFeed.setText(QCoreApplication.translate("Form", u"Push to Amazon", None))
         self.pushButton_bord.setText(QCoreApplication.translate("Form", u"Backorder List", None))
         self.pushButton.setText(QCoreApplication.translate("Form", u"Close", None))
         self.label_2.setText(QCoreApplication.translate("Form", u"If you want to skip downloading data from email, use a check box.", None))
@@ -5,8 +5,8 @@ import openpyxl
 
 from orderForm_ui import Ui_Form
 from pandasModel import PandasModel
+from pandasProxyModel import PandasProxyModel
 from PySide6.QtWidgets import QWidget
-from PySide6.QtCore import  QSortFilterProxyModel
 
 
 class orderForm(QWidget):
@@ -22,7 +22,7 @@ class orderForm(QWidget):
         df.sort_values('sku', inplace=True, ignore_index=True)
 
         self.model = PandasModel(df)
-        self.proxymodel = QSortFilterProxyModel()
+        self.proxymodel = PandasProxyModel()
         self.proxymodel.setSourceModel(self.model)
         self.ui.tableView.setModel(self.proxymodel)
 
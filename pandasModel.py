@@ -1,28 +1,65 @@
+import numpy as np
 import pandas as pd
-from PySide6.QtCore import QAbstractTableModel, Qt, Signal
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt, Signal
 from PySide6.QtGui import QColor
 
 
 class PandasModel(QAbstractTableModel):
     datamodified = Signal()
 
+    HIGHLIGHT_VALUE = 'Expedited'
+    HIGHLIGHT_COLOR = QColor(128, 0, 0)
+
     def __init__(self, data:pd.DataFrame):
         super().__init__()
-        self._data = data
+        self._frame = data
+        self._snapshot()
+
+    # The frame stays reachable as model._data so existing callers keep working.
+    # Assigning a new frame resets the model instead of requiring a new instance.
+    @property
+    def _data(self):
+        return self._frame
+
+    @_data.setter
+    def _data(self, data:pd.DataFrame):
+        self.beginResetModel()
+        self._frame = data
+        self._snapshot()
+        self.endResetModel()
+
+    def _snapshot(self):
+        # Column values as numpy arrays, rendered strings are built lazily per column.
+        self._columns = [self._frame.iloc[:, c].to_numpy() for c in range(self._frame.shape[1])]
+        self._index = self._frame.index.to_numpy()
+        self._display = [None] * len(self._columns)
+        # Highlight mask computed once for the whole table.
+        self._highlight = np.zeros(self._frame.shape, dtype=bool)
+        for c, values in enumerate(self._columns):
+            if values.dtype == object:
+                self._highlight[:, c] = values == self.HIGHLIGHT_VALUE
+
+    def display_column(self, column):
+        # Rendered strings of a column, cached until the column changes.
+        if self._display[column] is None:
+            self._display[column] = np.array([str(v) for v in self._columns[column]], dtype=object)
+        return self._display[column]
+
+    def column_values(self, column):
+        return self._columns[column]
 
     def data(self, index, role):
         if role == Qt.DisplayRole:
-            value = self._data.iloc[index.row(), index.column()]
-            return str(value)
+            return self.display_column(index.column())[index.row()]
         if role == Qt.BackgroundRole:
-            if self._data.iloc[index.row(), index.column()] == 'Expedited':
-                return QColor(128, 0, 0)
+            if self._highlight[index.row(), index.column()]:
+                return self.HIGHLIGHT_COLOR
 
-    def rowCount(self, index):
-        return self._data.shape[0]
+    def rowCount(self, index=None):
+        return len(self._index)
 
-    def columnCount(self, index):
-        return self._data.shape[1]
+    def columnCount(self, index=None):
+        return len(self._columns)
 
     def flags(self, index):
         if not index.isValid():
@@ -30,21 +67,66 @@ class PandasModel(QAbstractTableModel):
 
         return super().flags(index) | Qt.ItemIsEditable  # add editable flag.
 
-    def headerData(self, section, orientation, role):
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
         # section is the index of the column/row.
         if role == Qt.DisplayRole:
             if orientation == Qt.Horizontal:
-                return str(self._data.columns[section])
+                return str(self._frame.columns[section])
 
             if orientation == Qt.Vertical:
-                return str(self._data.index[section])
+                return str(self._index[section])
 
     def setData(self, index, value, role):
         if role == Qt.EditRole:
+            row, col = index.row(), index.column()
             # Set the value into the frame.
-            self._data.iloc[index.row(), index.column()] = value
-            # print('datamodified!')
+            self._frame.iloc[row, col] = value
+            # Refresh only the edited column snapshot and the edited cell.
+            self._columns[col] = self._frame.iloc[:, col].to_numpy()
+            if self._display[col] is not None:
+                self._display[col][row] = str(self._columns[col][row])
+            self._highlight[row, col] = value == self.HIGHLIGHT_VALUE
+            self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole, Qt.BackgroundRole])
             self.datamodified.emit()
             return True
 
-        return False
\ No newline at end of file
+        return False
+
+    def remove_rows(self, rows, reset_index=False):
+        # Remove rows by position with beginRemoveRows/endRemoveRows, one call per contiguous run,
+        # so attached views keep their scroll position and selection.
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+        if len(rows) == 0:
+            return
+        labels = self._index[rows]
+
+        runs = np.split(rows, np.flatnonzero(np.diff(rows) != 1) + 1)
+        for run in reversed(runs):
+            first, last = int(run[0]), int(run[-1])
+            span = np.s_[first:last + 1]
+            self.beginRemoveRows(QModelIndex(), first, last)
+            self._columns = [np.delete(values, span) for values in self._columns]
+            self._display = [None if strings is None else np.delete(strings, span) for strings in self._display]
+            self._highlight = np.delete(self._highlight, span, axis=0)
+            self._index = np.delete(self._index, span)
+            self.endRemoveRows()
+
+        self._frame.drop(labels, inplace=True)
+        if reset_index:
+            self._frame.reset_index(drop=True, inplace=True)
+            self._index = self._frame.index.to_numpy()
+            if len(self._index):
+                self.headerDataChanged.emit(Qt.Vertical, 0, len(self._index) - 1)
+
+    def append_rows(self, rows:pd.DataFrame):
+        first = self.rowCount()
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._frame = pd.concat([self._frame, rows], ignore_index=True)
+        self._snapshot()
+        self.endInsertRows()
+
+    def removeRows(self, row, count, parent=QModelIndex()):
+        if parent.isValid() or row < 0 or count <= 0 or row + count > self.rowCount():
+            return False
+        self.remove_rows(range(row, row + count))
+        return True
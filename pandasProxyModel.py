@@ -0,0 +1,278 @@
+import numpy as np
+import pandas as pd
+from PySide6.QtCore import QAbstractProxyModel, QModelIndex, Qt
+
+
+# Filter/sort proxy for PandasModel.
+# Filters and sorts are evaluated over whole columns (boolean masks / argsort) and the
+# result is kept as a permutation of source rows, so the view never calls back per row.
+# Keeps the QSortFilterProxyModel calls used by the windows.
+class PandasProxyModel(QAbstractProxyModel):
+    def __init__(self):
+        super().__init__()
+        self._perm = np.arange(0)       # proxy row -> source row
+        self._inverse = np.arange(0)    # source row -> proxy row (-1 if filtered out)
+        self._key_column = 0
+        self._key_filter = ''
+        self._column_filters = {}       # extra filters, column -> text
+        self._case_sensitivity = Qt.CaseSensitive
+        self._sort_column = -1
+        self._sort_order = Qt.AscendingOrder
+        self._search = {}               # column -> searchable strings (lowered if case insensitive)
+        self._order = None              # cached source rows in sort order
+        self._connections = []
+
+    def setSourceModel(self, model):
+        for signal, slot in self._connections:
+            signal.disconnect(slot)
+        self.beginResetModel()
+        super().setSourceModel(model)
+        self._connections = [
+            (model.modelAboutToBeReset, self.beginResetModel),
+            (model.modelReset, self._source_reset),
+            (model.dataChanged, self._source_data_changed),
+            (model.layoutAboutToBeChanged, self.beginResetModel),
+            (model.layoutChanged, self._source_reset),
+            (model.rowsAboutToBeRemoved, self._source_rows_about_to_be_removed),
+            (model.rowsRemoved, self._source_rows_removed),
+            (model.rowsAboutToBeInserted, self.beginResetModel),
+            (model.rowsInserted, self._source_reset),
+        ]
+        for signal, slot in self._connections:
+            signal.connect(slot)
+        self._invalidate_cache()
+        self._perm, self._inverse = self._compute()
+        self.endResetModel()
+
+    ############################################################################################
+    # QSortFilterProxyModel compatible API
+    ############################################################################################
+    def setFilterKeyColumn(self, column):
+        self._key_column = column
+        if self._key_filter:
+            self._refilter()
+
+    def filterKeyColumn(self):
+        return self._key_column
+
+    def setFilterFixedString(self, text):
+        self._key_filter = text
+        self._refilter()
+
+    def setFilterCaseSensitivity(self, sensitivity):
+        if sensitivity != self._case_sensitivity:
+            self._case_sensitivity = sensitivity
+            self._search = {}
+            self._refilter()
+
+    def setColumnFilter(self, column, text):
+        # Additional per-column filter, ANDed with the key column filter.
+        if text:
+            self._column_filters[column] = text
+        else:
+            self._column_filters.pop(column, None)
+        self._refilter()
+
+    def clearFilters(self):
+        self._key_filter = ''
+        self._column_filters = {}
+        self._refilter()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self._sort_column = column
+        self._sort_order = order
+        self._order = None
+        self._relayout()
+
+    def permutation(self):
+        # Source rows in view order.
+        return self._perm
+
+    ############################################################################################
+    # Mask / permutation
+    ############################################################################################
+    def _invalidate_cache(self, column=None):
+        if column is None:
+            self._search = {}
+            self._order = None
+        else:
+            self._search.pop(column, None)
+            if column == self._sort_column:
+                self._order = None
+
+    def _searchable(self, column):
+        if column not in self._search:
+            strings = pd.Series(self.sourceModel().display_column(column), dtype=object)
+            if self._case_sensitivity == Qt.CaseInsensitive:
+                strings = strings.str.lower()
+            self._search[column] = strings
+        return self._search[column]
+
+    def _contains(self, column, text):
+        if self._case_sensitivity == Qt.CaseInsensitive:
+            text = text.lower()
+        return self._searchable(column).str.contains(text, regex=False).to_numpy(dtype=bool)
+
+    def _filter_mask(self):
+        filters = dict(self._column_filters)
+        mask = None
+        if self._key_filter:
+            if self._key_column < 0:
+                # -1 matches the text in any column, like QSortFilterProxyModel
+                mask = np.zeros(self.sourceModel().rowCount(), dtype=bool)
+                for c in range(self.sourceModel().columnCount()):
+                    mask |= self._contains(c, self._key_filter)
+            else:
+                filters[self._key_column] = self._key_filter
+        for column, text in filters.items():
+            m = self._contains(column, text)
+            mask = m if mask is None else mask & m
+        return mask
+
+    def _sorted_order(self):
+        if self._order is None:
+            values = self.sourceModel().column_values(self._sort_column)
+            if values.dtype.kind not in 'iufb':
+                values = self.sourceModel().display_column(self._sort_column)
+            if self._sort_order == Qt.DescendingOrder:
+                # sort on negated ranks so equal keys keep source order, like ascending
+                _, rank = np.unique(values, return_inverse=True)
+                order = np.argsort(-rank.reshape(-1), kind='stable')
+            else:
+                order = np.argsort(values, kind='stable')
+            self._order = order
+        return self._order
+
+    def _compute(self):
+        source = self.sourceModel()
+        n = source.rowCount() if source is not None else 0
+        if n == 0:
+            return np.arange(0), np.arange(0)
+
+        mask = self._filter_mask()
+        if 0 <= self._sort_column < source.columnCount():
+            perm = self._sorted_order()
+            if mask is not None:
+                perm = perm[mask[perm]]
+        elif mask is not None:
+            perm = np.flatnonzero(mask)
+        else:
+            perm = np.arange(n)
+
+        inverse = np.full(n, -1, dtype=np.int64)
+        inverse[perm] = np.arange(len(perm))
+        return perm, inverse
+
+    def _refilter(self):
+        # Visible row set changes, so the view is reset.
+        self.beginResetModel()
+        self._perm, self._inverse = self._compute()
+        self.endResetModel()
+
+    def _relayout(self):
+        # Same rows in a different order; keep selection and current index.
+        self.layoutAboutToBeChanged.emit()
+        old_perm = self._perm
+        old_indexes = self.persistentIndexList()
+        self._perm, self._inverse = self._compute()
+        new_indexes = []
+        for index in old_indexes:
+            row = self._inverse[old_perm[index.row()]] if index.row() < len(old_perm) else -1
+            new_indexes.append(self.index(int(row), index.column()) if row >= 0 else QModelIndex())
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    ############################################################################################
+    # Source model signals
+    ############################################################################################
+    def _source_reset(self):
+        self._invalidate_cache()
+        self._perm, self._inverse = self._compute()
+        self.endResetModel()
+
+    def _source_rows_about_to_be_removed(self, parent, first, last):
+        # Remove the matching proxy rows, one run at a time, before the source drops them.
+        proxy_rows = self._inverse[first:last + 1]
+        proxy_rows = np.sort(proxy_rows[proxy_rows >= 0])
+        if len(proxy_rows) == 0:
+            return
+        runs = np.split(proxy_rows, np.flatnonzero(np.diff(proxy_rows) != 1) + 1)
+        for run in reversed(runs):
+            self.beginRemoveRows(QModelIndex(), int(run[0]), int(run[-1]))
+            self._perm = np.delete(self._perm, np.s_[int(run[0]):int(run[-1]) + 1])
+            self._inverse[:] = -1
+            self._inverse[self._perm] = np.arange(len(self._perm))
+            self.endRemoveRows()
+
+    def _source_rows_removed(self, parent, first, last):
+        # Shift the remaining source rows down to the new numbering.
+        count = last - first + 1
+        self._perm = np.where(self._perm > last, self._perm - count, self._perm)
+        self._inverse = np.full(self.sourceModel().rowCount(), -1, dtype=np.int64)
+        self._inverse[self._perm] = np.arange(len(self._perm))
+        self._invalidate_cache()
+
+    def _source_data_changed(self, top_left, bottom_right, roles=None):
+        roles = roles or []
+        for column in range(top_left.column(), bottom_right.column() + 1):
+            self._invalidate_cache(column)
+
+        affected = set(range(top_left.column(), bottom_right.column() + 1))
+        filtered = set(self._column_filters)
+        if self._key_filter:
+            filtered.add(self._key_column)
+        if affected & filtered or (self._key_filter and self._key_column < 0):
+            self._refilter()
+            return
+        if self._sort_column in affected:
+            self._relayout()
+            return
+
+        if top_left == bottom_right:
+            index = self.mapFromSource(top_left)
+            if index.isValid():
+                self.dataChanged.emit(index, index, roles)
+        elif len(self._perm):
+            self.dataChanged.emit(self.index(0, top_left.column()),
+                                  self.index(len(self._perm) - 1, bottom_right.column()), roles)
+
+    ############################################################################################
+    # QAbstractProxyModel
+    ############################################################################################
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or row < 0 or row >= len(self._perm) or column < 0 or column >= self.columnCount():
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._perm)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.sourceModel() is None:
+            return 0
+        return self.sourceModel().columnCount()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid() or proxy_index.row() >= len(self._perm):
+            return QModelIndex()
+        return self.sourceModel().index(int(self._perm[proxy_index.row()]), proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid() or source_index.row() >= len(self._inverse):
+            return QModelIndex()
+        row = self._inverse[source_index.row()]
+        if row < 0:
+            return QModelIndex()
+        return self.index(int(row), source_index.column())
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Vertical:
+            if section < 0 or section >= len(self._perm):
+                return None
+            section = int(self._perm[section])
+        return self.sourceModel().headerData(section, orientation, role)
@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor
+from PySide6.QtCore import QObject, QTimer, Signal
+
+
+# Debounced write-behind queue for the xlsx files behind the tables.
+# Every schedule() for the same path restarts that path's timer; when it fires the frame is
+# copied on the GUI thread and written by a single worker thread, so writes stay in order.
+class PersistQueue(QObject):
+    failed = Signal(str, str)  # path, error message
+
+    def __init__(self, delay_ms=500):
+        super().__init__()
+        self._delay_ms = delay_ms
+        self._pending = {}  # path -> (timer, frame getter, writer, writer kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._futures = []
+
+    # write(path, frame, **kwargs) runs on the worker thread, DataFrame.to_excel by default.
+    def schedule(self, path, get_frame, delay_ms=None, write=None, **kwargs):
+        if path in self._pending:
+            timer = self._pending[path][0]
+        else:
+            timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.timeout.connect(lambda: self._fire(path))
+        self._pending[path] = (timer, get_frame, write, kwargs)
+        timer.start(self._delay_ms if delay_ms is None else delay_ms)
+
+    def _fire(self, path):
+        timer, get_frame, write, kwargs = self._pending.pop(path)
+        timer.stop()
+        timer.deleteLater()
+        frame = get_frame().copy()
+        self._futures = [f for f in self._futures if not f.done()]
+        self._futures.append(self._executor.submit(self._write, path, frame, write, kwargs))
+
+    def _write(self, path, frame, write, kwargs):
+        try:
+            if write is None:
+                frame.to_excel(path, **kwargs)
+            else:
+                write(path, frame, **kwargs)
+        except Exception as e:
+            print('\033[31m'+f'Error occured while saving {path}: {e}'+'\033[0m')
+            self.failed.emit(path, str(e))
+
+    def flush(self):
+        # Write everything still pending and wait for the worker to finish.
+        for path in list(self._pending):
+            self._fire(path)
+        for future in self._futures:
+            future.result()
+        self._futures = []
@@ -0,0 +1,68 @@
+import os
+import pandas as pd
+
+# Shared cache for run artifacts such as amazon_order<mmddyy>.xlsx.
+# Inside one process (both windows opened from main.MainWindow) the frame is handed over in
+# memory. Otherwise a Feather sidecar next to the xlsx is read instead of parsing the workbook.
+# The xlsx stays the human-facing export; the sidecar is only trusted while it is at least as
+# new as the xlsx, so a workbook edited by hand still wins. The same holds for the in-memory
+# frame: it is only handed over while the xlsx has not changed since it was published or exported.
+
+_handoff = {}  # path -> (frame, mtime of the xlsx it supersedes or was exported to, None if missing)
+
+
+def _mtime(path):
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+def sidecar_path(path):
+    return os.path.splitext(path)[0]+'.feather'
+
+
+def as_text(frame:pd.DataFrame):
+    # Same shape of data as pd.read_excel(path, dtype=str) gives for the exported file:
+    # strings everywhere, whole floats without '.0', missing values left as NaN.
+    text = {}
+    for column in frame.columns:
+        values = frame[column].reset_index(drop=True)
+        if pd.api.types.is_float_dtype(values) and (values.dropna() % 1 == 0).all():
+            values = values.astype('Int64')
+        text[str(column)] = values.astype(str).where(values.notna()).astype(object)
+    return pd.DataFrame(text, columns=[str(c) for c in frame.columns])
+
+
+def publish(path, frame:pd.DataFrame):
+    # Hand the frame over to other windows of this process.
+    _handoff[path] = (as_text(frame), _mtime(path))
+    return _handoff[path][0]
+
+
+def export(path, frame:pd.DataFrame, **kwargs):
+    # Write the xlsx export and then the sidecar, so the sidecar is never older than the xlsx.
+    frame.to_excel(path, index=False, **kwargs)
+    if path in _handoff:
+        # the handed over frame now matches the xlsx written here
+        _handoff[path] = (_handoff[path][0], _mtime(path))
+    try:
+        as_text(frame).to_feather(sidecar_path(path))
+    except Exception as e:
+        print('\033[31m'+f'Could not write cache {sidecar_path(path)}: {e}'+'\033[0m')
+
+
+def load(path):
+    if path in _handoff:
+        frame, mtime = _handoff[path]
+        current = _mtime(path)
+        if current is None or (mtime is not None and current <= mtime):
+            return frame.copy()
+        # edited on disk since it was handed over
+        _handoff.pop(path, None)
+
+    sidecar = sidecar_path(path)
+    if os.path.exists(sidecar) and (not os.path.exists(path) or os.path.getmtime(sidecar) >= os.path.getmtime(path)):
+        try:
+            return pd.read_feather(sidecar)
+        except Exception as e:
+            print('\033[31m'+f'Could not read cache {sidecar}: {e}'+'\033[0m')
+
+    return pd.read_excel(path, dtype=str)
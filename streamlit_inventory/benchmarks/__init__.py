@@ -0,0 +1,15 @@
+"""
+Offline benchmarks of the inventory update.
+
+Generates synthetic supplier files, all_upc_inv, Amazon reports and a SQLite copy of the
+POS tables (fixtures.py), then times every DataService step and the InventoryService
+pipeline at each size (harness.py). Nothing connects to Gmail, SP-API or the POS server.
+
+Run from the repository root:
+
+    python -m streamlit_inventory.benchmarks --sizes 10000 100000 --output results.json
+    python -m streamlit_inventory.benchmarks --baseline results.json
+
+The fixtures of each size are kept in --work-dir and reused by later runs. At 1,000,000 rows
+generating them and the Excel steps take several minutes.
+"""
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Command line entry point: python -m streamlit_inventory.benchmarks --help"""
+
+import sys
+import logging
+import argparse
+import pandas as pd
+
+from .harness import DEFAULT_SIZES, REGRESSION_RATIO, run_benchmarks, save_results, load_results, compare
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the inventory update on synthetic inputs.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='inventory rows per fixture set')
+    parser.add_argument('--work-dir', default='benchmark_data', help='directory for the generated fixtures')
+    parser.add_argument('--output', default=None, help='results file, benchmark_data/results_<time>.json by default')
+    parser.add_argument('--baseline', default=None, help='earlier results file to compare with')
+    parser.add_argument('--ratio', type=float, default=REGRESSION_RATIO, help='slowdown reported as a regression')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per DataService step, the fastest is kept')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--regenerate', action='store_true', help='write the fixtures again')
+    parser.add_argument('--verbose', action='store_true', help='show service logs')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s %(name)s %(levelname)s %(message)s')
+
+    results = run_benchmarks(args.sizes, args.work_dir, args.repeat, args.seed, args.regenerate)
+    output = args.output or f"{args.work_dir}/results_{results['created'].replace(' ', '_').replace(':', '')}.json"
+    path = save_results(results, output)
+
+    with pd.option_context('display.width', 200, 'display.max_rows', None):
+        columns = ['rows', 'benchmark', 'status', 'wall_s', 'cpu_s', 'peak_rss_delta_mb', 'read_mb', 'written_mb', 'rows_in', 'rows_out']
+        print(pd.DataFrame(results['results'])[columns].to_string(index=False))
+        print(f'\nResults saved to {path}')
+
+        if not args.baseline:
+            return 0
+        comparison = compare(results, load_results(args.baseline), args.ratio)
+        print(f'\nCompared with {args.baseline}:')
+        print(comparison.to_string(index=False))
+        regressed = comparison[comparison['regressed']]
+        if len(regressed):
+            print(f'\n{len(regressed)} benchmarks are more than {args.ratio}x slower than the baseline')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""
+Synthetic inputs of an inventory update.
+
+generate_fixtures() writes, under one root directory, every file an update reads:
+
+    inv_data/   supplier files in each supplier's layout (see ConfigManager): AL/VF/BY as
+                .xls, NBF/SNG/MANE as .xlsx, OUTRE/HZ as UTF-16 tab-separated CSV with the
+                dashed second line and TOTAL footer; the Amazon listings report and the
+                unshipped orders report
+    appdata/    all_upc_inv.xlsx, backorder_list.xlsx, duplicate_list.xlsx,
+                update_history.xlsx, keyword_mailadd.json and pos.sqlite, a SQLite copy of
+                the POS tables read by POS_INVENTORY_QUERY
+
+The .xls files hold xlsx content: nothing maintained writes the old BIFF format, and
+read_excel picks the reader from the file content, so the supplier plans read them unchanged.
+
+Supplier files together hold `rows` items, all_upc_inv the same items with older
+quantities, the POS half of them, and the listings report half of them with a few UPCs
+listed twice.
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, event
+
+from ..services.amazon_service import AmazonService
+from ..services.database_service import DatabaseService
+
+SUPPLIERS = ['AL', 'VF', 'BY', 'NBF', 'OUTRE', 'HZ', 'SNG', 'MANE']
+COLORS = np.array(['1', '1B', '2', '4', '27', '30', '33', '99J', 'T1B/30', 'T1B/27', 'P4/30', 'BURG', 'OM27'])
+STYLES = np.array(['WAVE', 'BODY', 'STRAIGHT', 'DEEP', 'KINKY', 'BRAID', 'LOC', 'BOB', 'CURL', 'TWIST'])
+
+POS_DB = 'appdata/pos.sqlite'
+LISTINGS_REPORT = 'inv_data/Amazon_All+Listings+Report.txt'
+UNSHIPPED_REPORT = 'inv_data/Amazon_unshipped_report.txt'
+
+
+def _catalog(rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    """Items of every supplier: company, UPC, style number, style name and color."""
+    company = np.array(SUPPLIERS)[rng.integers(0, len(SUPPLIERS), rows)]
+    # 12 digits without a leading zero, unique
+    upc = (600000000000 + rng.choice(10 ** 11, rows, replace=False)).astype(str)
+    style = rng.integers(100, 100 + max(rows // 20, 10), rows).astype(str)
+    return pd.DataFrame({
+        'COMPAY': company,
+        'UPC': upc,
+        'style': pd.Series(company).str.cat(style, sep='-'),
+        'name': STYLES[rng.integers(0, len(STYLES), rows)],
+        'color': COLORS[rng.integers(0, len(COLORS), rows)],
+    })
+
+
+def _write_excel(path: Path, data: pd.DataFrame, title: Optional[str] = None, startrow: int = 0):
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        if title:
+            pd.DataFrame([[title]]).to_excel(writer, index=False, header=False)
+        data.to_excel(writer, index=False, startrow=startrow)
+
+
+def _write_stock_csv(path: Path, data: pd.DataFrame):
+    """OUTRE/HZ StockAvailability export: tab separated UTF-16 with a dashed line and a TOTAL footer."""
+    lines = data.to_csv(sep='\t', index=False, lineterminator='\n').split('\n', 1)
+    with open(path, 'w', encoding='utf_16', newline='') as f:
+        f.write(lines[0] + '\n----\n' + lines[1] + 'TOTAL\n')
+
+
+def _write_suppliers(inv_data: Path, items: pd.DataFrame, rng: np.random.Generator):
+    def part(code):
+        return items[items['COMPAY'] == code].reset_index(drop=True)
+
+    def quantities(count, high=60):
+        return rng.integers(0, high, count)
+
+    def flags(count, values):
+        return np.array(values)[rng.integers(0, len(values), count)]
+
+    al = part('AL')
+    al_export = pd.DataFrame({
+        'Item Code': al['style'], 'Item Description': al['name'] + ' ' + al['color'],
+        'Stock Level': flags(len(al), ['IN', 'LOW', 'OUT']), 'On Hand': quantities(len(al)),
+        'Alias': al['UPC'], 'Price': rng.uniform(3, 40, len(al)).round(2)
+    })
+    # two exports with different header rows, renamed positionally by the plan
+    half = len(al_export) // 2
+    _write_excel(inv_data / 'AL_brs inv.xls', al_export.iloc[:half])
+    _write_excel(inv_data / 'AL_inv.xls', al_export.iloc[half:].rename(columns={'Alias': 'AliasItemNo'}))
+
+    vf = part('VF')
+    barcodes = vf['UPC'].copy()
+    # a few non-numeric barcodes, dropped by the int64 UPC rule
+    barcodes[rng.random(len(vf)) < 0.01] = 'N/A'
+    _write_excel(inv_data / 'VF_Inventory.xls', pd.DataFrame({
+        'Barcode': barcodes, 'On hand': quantities(len(vf)), 'Product ID': vf['style'],
+        'SKU': vf['style'] + '-' + vf['color'], 'Warehouse': 'MAIN'
+    }))
+
+    by = part('BY')
+    _write_excel(inv_data / 'BY_InventoryListAll.xls', pd.DataFrame({
+        'Barcode': by['UPC'], 'O/H': quantities(len(by)), 'Item Name': by['name'], 'Color': by['color']
+    }), title='Inventory List - All Items', startrow=3)
+
+    nbf = part('NBF')
+    # the availability grade is the seventh column and has no header
+    _write_excel(inv_data / 'NBF_Chade Fashions.xlsx', pd.DataFrame({
+        'No.': nbf['style'], 'Description': nbf['name'] + ' ' + nbf['color'], 'Color': nbf['color'],
+        'UPC Code': nbf['UPC'], 'Price': rng.uniform(3, 40, len(nbf)).round(2), 'Pack': 1,
+        '': flags(len(nbf), ['A', 'B', 'C', 'X'])
+    }))
+
+    for code, file_name in (('OUTRE', 'OUTRE_StockAvailability.csv'), ('HZ', 'HZ_StockAvailability.csv')):
+        stock = part(code)
+        _write_stock_csv(inv_data / file_name, pd.DataFrame({
+            'BARCODE': stock['UPC'], 'AVAIL': flags(len(stock), ['Y', 'N']),
+            'ITEM': stock['style'] + ' ' + stock['name'], 'COLOR': stock['color']
+        }))
+
+    sng = part('SNG')
+    _write_excel(inv_data / 'SNG_inv.xlsx', pd.DataFrame({
+        'Barcode': sng['UPC'], 'Available': flags(len(sng), ['Y', 'N']), 'Item': sng['style'],
+        'Descrip': sng['name'] + ' ' + sng['color']
+    }))
+
+    mane = part('MANE')
+    _write_excel(inv_data / 'MANE_inv.xlsx', pd.DataFrame({
+        'Barcode': mane['UPC'], 'AQOH': quantities(len(mane)), 'Item': mane['style'], 'Color': mane['color']
+    }))
+
+
+def _write_pos(path: Path, items: pd.DataFrame, rng: np.random.Generator):
+    """Item, SupplierList, Department and Supplier tables with the columns POS_INVENTORY_QUERY reads."""
+    count = len(items)
+    display = np.array(['', '0', '1', '2', '1(1)', '0(2)'])[rng.integers(0, 6, count)]
+    supplier_id = rng.integers(1, len(SUPPLIERS) + 1, count)
+    item = pd.DataFrame({
+        'ID': np.arange(1, count + 1), 'ItemLookupCode': items['UPC'].to_numpy(),
+        'Price': rng.uniform(5, 60, count).round(2), 'Quantity': rng.integers(0, 12, count),
+        'SubDescription1': items['name'].to_numpy(), 'SubDescription2': '', 'SubDescription3': display,
+        'Description': (items['style'] + ' ' + items['name']).to_numpy(), 'ExtendedDescription': items['color'].to_numpy(),
+        'BinLocation': 'A' + pd.Series(rng.integers(1, 400, count)).astype(str).to_numpy(),
+        'DepartmentID': np.array([2, 4, 6, 1])[rng.integers(0, 4, count)],
+        'SupplierID': supplier_id, 'Inactive': (rng.random(count) < 0.05).astype(int)
+    })
+    # colors of a style share a reorder number
+    supplier_list = pd.DataFrame({'ItemID': item['ID'], 'SupplierID': supplier_id,
+                                  'ReorderNumber': items['style'].to_numpy()})
+    department = pd.DataFrame({'ID': range(1, 7), 'Name': ['MISC', 'WIG', 'BEAUTY', 'BRAID', 'TOOLS', 'PONYTAIL']})
+    supplier = pd.DataFrame({'ID': range(1, len(SUPPLIERS) + 1), 'Code': SUPPLIERS,
+                             'SupplierName': [f'{code} Supplier' for code in SUPPLIERS]})
+
+    path.unlink(missing_ok=True)
+    with sqlite3.connect(path) as connection:
+        for name, table in (('Item', item), ('SupplierList', supplier_list),
+                            ('Department', department), ('Supplier', supplier)):
+            table.to_sql(name, connection, index=False)
+        connection.execute('CREATE INDEX ix_supplierlist ON SupplierList (ItemID, SupplierID)')
+    connection.close()
+
+
+def _write_amazon(inv_data: Path, items: pd.DataFrame, rng: np.random.Generator) -> pd.DataFrame:
+    count = len(items)
+    listings = pd.DataFrame({
+        'item-name': (items['name'] + ' ' + items['color']).to_numpy(), 'item-description': '',
+        'listing-id': [f'L{index:010d}' for index in range(count)],
+        'seller-sku': [f'SKU-{index:08d}' for index in range(count)],
+        'price': rng.uniform(8, 80, count).round(2), 'quantity': rng.integers(0, 30, count),
+        'open-date': '2024-01-15 10:00:00 PST', 'image-url': '', 'item-is-marketplace': 'y',
+        'product-id-type': 4, 'zshop-shipping-fee': '', 'item-note': '', 'item-condition': 11,
+        'zshop-category1': '', 'zshop-browse-path': '', 'zshop-storefront-feature': '',
+        'asin1': [f'B0{index:08d}' for index in range(count)], 'asin2': '', 'asin3': '',
+        'will-ship-internationally': '', 'expedited-shipping': '', 'zshop-boldface': '',
+        'product-id': items['UPC'].to_numpy(), 'bid-for-featured-placement': '', 'add-delete': '',
+        'pending-quantity': 0, 'fulfillment-channel': 'DEFAULT', 'merchant-shipping-group': 'Migrated Template',
+        'status': np.where(rng.random(count) < 0.9, 'Active', 'Inactive')
+    })
+    listings.to_csv(inv_data / Path(LISTINGS_REPORT).name, sep='\t', index=False)
+
+    orders = max(count // 50, 10)
+    lines = listings.sample(orders, replace=True, random_state=int(rng.integers(1 << 31)))
+    unshipped = pd.DataFrame({
+        'order-id': [f'111-{index:07d}-{index % 9973:07d}' for index in range(orders)],
+        'order-item-id': [f'{index:014d}' for index in range(orders)],
+        'purchase-date': pd.Timestamp('2024-06-01') + pd.to_timedelta(rng.integers(0, 7 * 86400, orders), unit='s'),
+        'sku': lines['seller-sku'].to_numpy(), 'product-id': lines['asin1'].to_numpy(),
+        'quantity-purchased': rng.integers(1, 3, orders),
+        'ship-service-level': np.where(rng.random(orders) < 0.8, 'Standard', 'Expedited')
+    })
+    unshipped.to_csv(inv_data / Path(UNSHIPPED_REPORT).name, sep='\t', index=False)
+    return listings
+
+
+def generate_fixtures(root_path: str, rows: int, seed: int = 0) -> Dict[str, int]:
+    """
+    Write the synthetic inputs of an update with `rows` inventory items.
+
+    Args:
+        root_path: Directory to write appdata/ and inv_data/ to (ends with a separator)
+        rows: Items across all supplier files and in all_upc_inv
+        seed: Random seed, the same files for the same seed and size
+
+    Returns:
+        Rows written per input
+    """
+    rng = np.random.default_rng(seed)
+    root = Path(root_path)
+    appdata, inv_data = root / 'appdata', root / 'inv_data'
+    appdata.mkdir(parents=True, exist_ok=True)
+    inv_data.mkdir(parents=True, exist_ok=True)
+
+    catalog = _catalog(rows, rng)
+    _write_suppliers(inv_data, catalog, rng)
+
+    base = pd.DataFrame({
+        'COMPAY': catalog['COMPAY'], 'UPC': catalog['UPC'], 'company Inventory': rng.integers(0, 60, rows),
+        'DESCRIPTION': catalog['style'], 'EXTENDED DESCRIPTION': catalog['name'] + ' ' + catalog['color']
+    })
+    _write_excel(appdata / 'all_upc_inv.xlsx', base)
+
+    listed = catalog.sample(frac=0.5, random_state=seed)
+    # some UPCs are listed under a second SKU
+    listed = pd.concat([listed, listed.sample(frac=0.02, random_state=seed)], ignore_index=True)
+    listings = _write_amazon(inv_data, listed, rng)
+
+    pos_items = catalog.sample(frac=0.5, random_state=seed + 1)
+    _write_pos(root / POS_DB, pos_items, rng)
+
+    backorder = catalog['UPC'].sample(frac=0.01, random_state=seed + 2)
+    _write_excel(appdata / 'backorder_list.xlsx', pd.DataFrame({'upc': backorder}))
+    duplicate = base.sample(frac=0.005, random_state=seed + 3)
+    _write_excel(appdata / 'duplicate_list.xlsx', duplicate[['UPC', 'DESCRIPTION', 'EXTENDED DESCRIPTION']])
+    _write_excel(appdata / 'update_history.xlsx', pd.DataFrame({'Initial': SUPPLIERS, 'Date': '01-Jan'}))
+
+    with open(appdata / 'keyword_mailadd.json', 'w') as f:
+        json.dump({code: {'SUBJECT': f'{code} inventory', 'FROM': f'{code.lower()}@example.com'}
+                   for code in SUPPLIERS}, f)
+
+    return {'suppliers': rows, 'all_upc_inv': rows, 'listings': len(listings), 'pos': len(pos_items),
+            'backorder': len(backorder), 'duplicate': len(duplicate)}
+
+
+def pos_engine(root_path: str):
+    """SQLAlchemy engine on pos.sqlite, attached as schema dbo so POS_INVENTORY_QUERY runs unchanged."""
+    path = Path(root_path) / POS_DB
+    engine = create_engine('sqlite://')
+
+    @event.listens_for(engine, 'connect')
+    def attach(connection, record):
+        connection.execute(f"ATTACH DATABASE '{path.as_posix()}' AS dbo")
+
+    return engine
+
+
+def pos_database(root_path: str) -> DatabaseService:
+    """DatabaseService reading the SQLite POS stand-in."""
+    return DatabaseService(root_path, engine=pos_engine(root_path))
+
+
+class ReportFileAmazon:
+    """Offline AmazonService stand-in serving the generated listings and unshipped reports."""
+
+    def __init__(self, root_path: str = ''):
+        self.root_path = root_path
+
+    def get_listings(self) -> pd.DataFrame:
+        """Listings with the LISTINGS_DTYPES columns, as AmazonService.read_listings_document returns them."""
+        listings = pd.read_csv(f'{self.root_path}{LISTINGS_REPORT}', sep='\t',
+                               usecols=lambda column: column in AmazonService.LISTINGS_DTYPES,
+                               dtype=AmazonService.LISTINGS_DTYPES)
+        # generated product-ids have no leading zeros, so they need no normalizing
+        return listings.reindex(columns=list(AmazonService.LISTINGS_DTYPES))
+
+    def get_unshipped_feed(self) -> pd.DataFrame:
+        """Unshipped order lines with AmazonService.UNSHIPPED_COLUMNS."""
+        unshipped = pd.read_csv(f'{self.root_path}{UNSHIPPED_REPORT}', sep='\t', dtype={'product-id': str})
+        return unshipped[AmazonService.UNSHIPPED_COLUMNS]
@@ -0,0 +1,205 @@
+"""
+Benchmark harness.
+
+Times each DataService step of an update and the whole InventoryService pipeline on the
+synthetic inputs of fixtures.py, once per input size, and compares a run with a baseline.
+Every measurement is a StageMetrics (wall and CPU time, peak RSS delta, bytes read and
+written, rows in and out) from metrics_service.
+"""
+
+import sys
+import json
+import time
+import platform
+import logging
+from pathlib import Path
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import pandas as pd
+import pyarrow as pa
+
+from .fixtures import SUPPLIERS, generate_fixtures, pos_database, ReportFileAmazon
+from ..services.data_service import DataService
+from ..services.inventory_service import InventoryService
+from ..services.pipeline_service import StageCache
+from ..services.metrics_service import RunMonitor, StageMetrics, count_rows
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+FIXTURES_FILE = 'fixtures.json'
+
+# a benchmark regresses when it is this much slower than the baseline...
+REGRESSION_RATIO = 1.25
+# ...and took at least this long there, below which timings are mostly noise
+MIN_BASELINE_WALL_S = 0.05
+
+
+def _measure(name: str, func: Callable[[], Any], rows_in: Optional[int] = None,
+             repeat: int = 1) -> Tuple[StageMetrics, Any]:
+    """Run func repeat times; metrics of the fastest run and the last result."""
+    best, result = None, None
+    for _ in range(repeat):
+        monitor = RunMonitor('benchmark')
+        with monitor.measure(name, rows_in) as metrics:
+            result = func()
+            metrics.rows_out = count_rows(result)
+        if best is None or metrics.wall_s < best.wall_s:
+            best = metrics
+    logger.info(f"{name}: {best.wall_s:.3f}s")
+    return best, result
+
+
+def prepare_fixtures(work_dir: str, rows: int, seed: int = 0, regenerate: bool = False) -> str:
+    """
+    Root of the fixtures of one size, generated on first use.
+
+    Returns:
+        Root path (with a trailing separator) holding appdata/ and inv_data/
+    """
+    root = Path(work_dir) / f'rows_{rows}'
+    marker = root / FIXTURES_FILE
+    if not regenerate and marker.exists():
+        with open(marker) as f:
+            if json.load(f).get('seed') == seed:
+                return f'{root}/'
+
+    started = time.perf_counter()
+    counts = generate_fixtures(f'{root}/', rows, seed)
+    with open(marker, 'w') as f:
+        json.dump({'rows': rows, 'seed': seed, 'counts': counts}, f)
+    logger.info(f"Generated fixtures for {rows} rows in {time.perf_counter() - started:.1f}s")
+    return f'{root}/'
+
+
+def benchmark_data_service(root_path: str, repeat: int = 1) -> List[StageMetrics]:
+    """Time the DataService steps of an update in pipeline order, each on the previous step's output."""
+    data = DataService(root_path)
+    results = []
+
+    def run(name, func, rows_in=None):
+        metrics, result = _measure(name, func, rows_in, repeat)
+        results.append(metrics)
+        return result
+
+    base = run('load_base_inventory', data.load_base_inventory)
+    suppliers = {code: run(f'process_supplier_file[{code}]', lambda code=code: data.process_supplier_file(code))
+                 for code in SUPPLIERS}
+    run('process_multiple_suppliers', lambda: data.process_multiple_suppliers(SUPPLIERS))
+
+    def merge():
+        inventory = base
+        for code in SUPPLIERS:
+            inventory = data.update_supplier_inventory(inventory, code, suppliers[code])
+        return inventory
+
+    merged = run('update_supplier_inventory', merge, len(base) + count_rows(suppliers))
+    backordered = run('update_backorder_items', lambda: data.update_backorder_items(merged), len(merged))
+    all_inventory = run('remove_duplicate_items', lambda: data.remove_duplicate_items(backordered), len(backordered))
+
+    pos_raw = run('get_pos_inventory_data', pos_database(root_path).get_pos_inventory_data)
+    pos = run('process_pos_data', lambda: data.process_pos_data(pos_raw.copy(), all_inventory),
+              len(pos_raw) + len(all_inventory))
+
+    amazon = ReportFileAmazon(root_path)
+    listings = run('read_listings_report', amazon.get_listings)
+    amazon_listings = run('process_amazon_listings',
+                          lambda: data.process_amazon_listings(all_inventory, pos, listings=listings),
+                          len(all_inventory) + len(pos) + len(listings))
+    unshipped = amazon.get_unshipped_feed()
+    orders = run('process_amazon_orders',
+                 lambda: data.process_amazon_orders(amazon_listings, pos, all_inventory, unshipped_data=unshipped),
+                 len(unshipped))
+    run('get_data_quality_report', lambda: data.get_data_quality_report(all_inventory), len(all_inventory))
+
+    # exports go to a separate root so the fixtures stay unchanged
+    output_root = Path(root_path) / 'output'
+    (output_root / 'appdata').mkdir(parents=True, exist_ok=True)
+    history = pd.read_excel(f'{root_path}appdata/update_history.xlsx')
+    run('save_inventory_data',
+        lambda: DataService(f'{output_root}/').save_inventory_data(all_inventory, pos, amazon_listings, orders, history),
+        len(all_inventory) + len(pos) + len(amazon_listings) + len(orders))
+    return results
+
+
+def benchmark_pipeline(root_path: str) -> List[StageMetrics]:
+    """
+    Time a full update (all suppliers, POS, Amazon listings and orders) through
+    InventoryService with the offline POS and Amazon stand-ins: a first run with an empty
+    stage cache, then a rerun that reuses it. Stages of the first run are listed as
+    pipeline/<stage>.
+    """
+    service = InventoryService(root_path, StageCache(), database_service=pos_database(root_path),
+                               amazon_service=ReportFileAmazon(root_path))
+    updates = []
+
+    def update():
+        updates.append(service.update_inventory(SUPPLIERS, update_amazon=True))
+        return updates[-1]['all_inventory']
+
+    cold, _ = _measure('pipeline', update)
+    stage_rows = updates[0]['metrics'].astype(object)
+    stage_rows = stage_rows[stage_rows['parent'].isna()].where(stage_rows.notna(), None)
+    stages = [StageMetrics(**{**row, 'stage': f"pipeline/{row['stage']}"}) for row in stage_rows.to_dict('records')]
+
+    warm, _ = _measure('pipeline (cached rerun)', update)
+    return [cold, *stages, warm]
+
+
+def run_benchmarks(sizes: List[int] = DEFAULT_SIZES, work_dir: str = 'benchmark_data', repeat: int = 1,
+                   seed: int = 0, regenerate: bool = False) -> Dict[str, Any]:
+    """
+    Run every benchmark at every size.
+
+    Args:
+        sizes: Inventory rows of each fixture set
+        work_dir: Directory for the fixtures, reused between runs
+        repeat: Runs per DataService step; the fastest is kept
+        seed: Fixture random seed
+        regenerate: Write the fixtures again even if they exist
+
+    Returns:
+        Results with environment details and one entry per size and benchmark
+    """
+    results = []
+    for rows in sizes:
+        root_path = prepare_fixtures(work_dir, rows, seed, regenerate)
+        for metrics in benchmark_data_service(root_path, repeat) + benchmark_pipeline(root_path):
+            results.append({'rows': rows, 'benchmark': metrics.stage,
+                            **{name: value for name, value in asdict(metrics).items() if name not in ('stage', 'parent')}})
+
+    return {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'platform': platform.platform(),
+        'python': sys.version.split()[0], 'pandas': pd.__version__, 'pyarrow': pa.__version__,
+        'seed': seed, 'repeat': repeat, 'results': results
+    }
+
+
+def save_results(results: Dict[str, Any], path: str) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=1)
+    return path
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any],
+            ratio: float = REGRESSION_RATIO, min_wall_s: float = MIN_BASELINE_WALL_S) -> pd.DataFrame:
+    """
+    Wall time of each benchmark against the baseline.
+
+    Returns:
+        rows, benchmark, baseline_s, wall_s, ratio and regressed (slower by more than ratio)
+        for the benchmarks present in both
+    """
+    current = pd.DataFrame(results['results'])[['rows', 'benchmark', 'wall_s']]
+    previous = pd.DataFrame(baseline['results'])[['rows', 'benchmark', 'wall_s']].rename(columns={'wall_s': 'baseline_s'})
+    comparison = previous.merge(current, on=['rows', 'benchmark'])
+    comparison['ratio'] = (comparison['wall_s'] / comparison['baseline_s']).round(2)
+    comparison['regressed'] = (comparison['ratio'] > ratio) & (comparison['baseline_s'] >= min_wall_s)
+    return comparison[['rows', 'benchmark', 'baseline_s', 'wall_s', 'ratio', 'regressed']]
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the SP-API Feeds endpoints used by AmazonFeedService.
+
+Point appdata/api_keys.json at it with
+    {"credentials": {"lwa_app_id": "dev", "lwa_client_secret": "dev"}, "refresh_token": "dev",
+     "seller_id": "DEVSELLER", "endpoint": "http://127.0.0.1:8766"}
+
+Endpoints:
+    POST /feeds/2021-06-30/documents          createFeedDocument, returns an upload url on the stand-in
+    PUT  /standin/upload/<feedDocumentId>      stores the uploaded document
+    POST /feeds/2021-06-30/feeds              createFeed, applies JSON_LISTINGS_FEED and
+                                              POST_FLAT_FILE_INVLOADER_DATA quantities right away
+    GET  /feeds/2021-06-30/feeds/<feedId>     getFeed, always DONE
+    GET  /standin/quantities                  current quantity per sku
+    GET  /standin/feeds                       feeds received with their type and message count
+"""
+
+import json
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class SpApiStandin:
+    """In-memory feed state."""
+
+    def __init__(self, throttle_every: int = 0):
+        self.documents = {}         # feedDocumentId -> uploaded bytes (None until uploaded)
+        self.feeds = {}             # feedId -> feed details
+        self.quantities = {}        # sku -> quantity
+        self.received = 0
+        self.throttle_every = throttle_every
+        self.lock = threading.Lock()
+
+    def create_document(self, base_url):
+        with self.lock:
+            document_id = f'DOC{len(self.documents) + 1}'
+            self.documents[document_id] = None
+            return 200, {'feedDocumentId': document_id, 'url': f'{base_url}/standin/upload/{document_id}'}
+
+    def upload(self, document_id, content):
+        with self.lock:
+            if document_id not in self.documents:
+                return 404, {'errors': [{'code': 'NotFound', 'message': document_id}]}
+            self.documents[document_id] = content
+            return 200, {}
+
+    def create_feed(self, body):
+        """Apply the feed document at once. Returns (status, response body)."""
+        with self.lock:
+            self.received += 1
+            if self.throttle_every and self.received % self.throttle_every == 0:
+                return 429, {'errors': [{'code': 'QuotaExceeded', 'message': 'You exceeded your quota'}]}
+
+            content = self.documents.get(body.get('inputFeedDocumentId'))
+            if content is None:
+                return 400, {'errors': [{'code': 'InvalidInput', 'message': 'Feed document was not uploaded'}]}
+
+            feed_type = body.get('feedType')
+            if feed_type == 'JSON_LISTINGS_FEED':
+                messages = json.loads(content)['messages']
+                updates = {
+                    message['sku']: message['patches'][0]['value'][0]['quantity'] for message in messages
+                }
+            elif feed_type == 'POST_FLAT_FILE_INVLOADER_DATA':
+                lines = content.decode('iso-8859-1').splitlines()[1:]
+                updates = {sku: int(quantity) for sku, quantity in (line.split('\t') for line in lines if line)}
+            else:
+                return 400, {'errors': [{'code': 'InvalidInput', 'message': f'Unsupported feedType {feed_type}'}]}
+
+            self.quantities.update(updates)
+            feed_id = str(len(self.feeds) + 1)
+            self.feeds[feed_id] = {'feedId': feed_id, 'feedType': feed_type, 'processingStatus': 'DONE',
+                                   'messages': len(updates), 'resultFeedDocumentId': f'RESULT{feed_id}'}
+            return 202, {'feedId': feed_id}
+
+    def get_feed(self, feed_id):
+        with self.lock:
+            if feed_id not in self.feeds:
+                return 404, {'errors': [{'code': 'NotFound', 'message': feed_id}]}
+            return 200, {key: value for key, value in self.feeds[feed_id].items() if key != 'messages'}
+
+
+def make_handler(standin: SpApiStandin):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self):
+            return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        def do_POST(self):
+            body = json.loads(self._body() or b'{}')
+            if self.path == '/feeds/2021-06-30/documents':
+                host, port = self.server.server_address[:2]
+                self._send(*standin.create_document(f'http://{host}:{port}'))
+            elif self.path == '/feeds/2021-06-30/feeds':
+                self._send(*standin.create_feed(body))
+            else:
+                self._send(404, {'errors': [{'code': 'NotFound', 'message': self.path}]})
+
+        def do_PUT(self):
+            if self.path.startswith('/standin/upload/'):
+                self._send(*standin.upload(self.path.rsplit('/', 1)[1], self._body()))
+            else:
+                self._send(404, {'errors': [{'code': 'NotFound', 'message': self.path}]})
+
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path.startswith('/feeds/2021-06-30/feeds/'):
+                self._send(*standin.get_feed(path.rsplit('/', 1)[1]))
+            elif path == '/standin/quantities':
+                self._send(200, standin.quantities)
+            elif path == '/standin/feeds':
+                self._send(200, list(standin.feeds.values()))
+            else:
+                self._send(404, {'errors': [{'code': 'NotFound', 'message': self.path}]})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(host: str = '127.0.0.1', port: int = 8766, throttle_every: int = 0) -> ThreadingHTTPServer:
+    """Start the stand-in on a background thread and return the server."""
+    server = ThreadingHTTPServer((host, port), make_handler(SpApiStandin(throttle_every)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local SP-API Feeds stand-in')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--throttle-every', type=int, default=0,
+                        help='answer every Nth createFeed request with 429 to exercise retries')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(SpApiStandin(args.throttle_every)))
+    print(f"SP-API stand-in listening on http://{args.host}:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Square inventory endpoints used by SquareService.
+
+Point appdata/square_auth.json at it with
+    {"access_token": "dev", "environment": "custom", "custom_url": "http://127.0.0.1:8765"}
+
+Endpoints:
+    POST /v2/inventory/changes/batch-create   records PHYSICAL_COUNT changes, replays idempotency keys
+    POST /v2/catalog/search                   ITEM objects with cursor paging, begin_time and deleted objects
+    POST /standin/catalog                     upsert items ({"items": [...]}) or delete them ({"delete": [ids]})
+    GET  /standin/counts                      current counts per catalog_object_id
+    GET  /standin/requests                    number of batch requests received and applied
+"""
+
+import json
+import argparse
+import datetime
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class SquareStandin:
+    """In-memory Square inventory state."""
+
+    def __init__(self, throttle_every: int = 0, catalog_items: int = 0):
+        self.counts = {}
+        self.catalog = {}           # item id -> ITEM object
+        self.catalog_version = 0
+        self.responses = {}         # idempotency_key -> response body
+        self.received = 0
+        self.applied = 0
+        self.throttle_every = throttle_every
+        self.lock = threading.Lock()
+        self.upsert_items([
+            {'id': f'ITEM{i}', 'variations': [{'id': f'VAR{i}', 'upc': f'{100000000000 + i}'}]}
+            for i in range(catalog_items)
+        ])
+
+    def upsert_items(self, items):
+        """Add or replace items given as {'id', 'product_type', 'variations': [{'id', 'upc'}]}."""
+        with self.lock:
+            for item in items:
+                self.catalog_version += 1
+                updated_at = self._now()
+                self.catalog[item['id']] = {
+                    'type': 'ITEM',
+                    'id': item['id'],
+                    'version': self.catalog_version,
+                    'updated_at': updated_at,
+                    'is_deleted': False,
+                    'item_data': {
+                        'product_type': item.get('product_type', 'REGULAR'),
+                        'variations': [
+                            {
+                                'type': 'ITEM_VARIATION',
+                                'id': variation['id'],
+                                'version': self.catalog_version,
+                                'updated_at': updated_at,
+                                'is_deleted': False,
+                                'item_variation_data': {'item_id': item['id'], 'upc': variation.get('upc')}
+                            }
+                            for variation in item.get('variations', [])
+                        ]
+                    }
+                }
+
+    def delete_items(self, item_ids):
+        with self.lock:
+            for item_id in item_ids:
+                self.catalog_version += 1
+                item = self.catalog[item_id]
+                item.update({'is_deleted': True, 'version': self.catalog_version, 'updated_at': self._now()})
+
+    def search_catalog(self, body):
+        """Answer search_catalog_objects for ITEM objects, 'limit' per page."""
+        with self.lock:
+            begin_time = body.get('begin_time')
+            objects = [
+                item for item in sorted(self.catalog.values(), key=lambda item: item['version'])
+                if (not begin_time or item['updated_at'] > begin_time)
+                and (body.get('include_deleted_objects') or not item['is_deleted'])
+            ]
+            start = int(body.get('cursor') or 0)
+            end = start + min(int(body.get('limit', 100)), 1000)
+            response = {'objects': objects[start:end], 'latest_time': self._latest_time()}
+            if end < len(objects):
+                response['cursor'] = str(end)
+            return 200, response
+
+    def _latest_time(self):
+        return max((item['updated_at'] for item in self.catalog.values()), default=self._now())
+
+    @staticmethod
+    def _now():
+        return datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+    def batch_change(self, body):
+        """Apply a batch_change_inventory body. Returns (status, response body)."""
+        with self.lock:
+            self.received += 1
+            if self.throttle_every and self.received % self.throttle_every == 0:
+                return 429, {'errors': [{'category': 'RATE_LIMIT_ERROR', 'code': 'RATE_LIMITED'}]}
+
+            key = body.get('idempotency_key')
+            if key in self.responses:
+                return 200, self.responses[key]
+
+            counts = []
+            for change in body.get('changes', []):
+                count = change['physical_count']
+                self.counts[count['catalog_object_id']] = count['quantity']
+                counts.append({
+                    'catalog_object_id': count['catalog_object_id'],
+                    'state': count['state'],
+                    'location_id': count['location_id'],
+                    'quantity': count['quantity'],
+                    'calculated_at': count['occurred_at']
+                })
+            self.applied += 1
+            self.responses[key] = {'counts': counts}
+            return 200, self.responses[key]
+
+
+def make_handler(standin: SquareStandin):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if self.path == '/v2/inventory/changes/batch-create':
+                self._send(*standin.batch_change(body))
+            elif self.path == '/v2/catalog/search':
+                self._send(*standin.search_catalog(body))
+            elif self.path == '/standin/catalog':
+                standin.upsert_items(body.get('items', []))
+                standin.delete_items(body.get('delete', []))
+                self._send(200, {'catalog_version': standin.catalog_version})
+            else:
+                self._send(404, {'errors': [{'code': 'NOT_FOUND', 'detail': self.path}]})
+
+        def do_GET(self):
+            if self.path == '/standin/counts':
+                self._send(200, standin.counts)
+            elif self.path == '/standin/requests':
+                self._send(200, {'received': standin.received, 'applied': standin.applied})
+            else:
+                self._send(404, {'errors': [{'code': 'NOT_FOUND', 'detail': self.path}]})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(host: str = '127.0.0.1', port: int = 8765, throttle_every: int = 0,
+          catalog_items: int = 0) -> ThreadingHTTPServer:
+    """Start the stand-in on a background thread and return the server."""
+    server = ThreadingHTTPServer((host, port), make_handler(SquareStandin(throttle_every, catalog_items)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local Square API stand-in')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--throttle-every', type=int, default=0,
+                        help='answer every Nth batch request with 429 to exercise retries')
+    parser.add_argument('--catalog-items', type=int, default=0,
+                        help='seed the catalog with N items of one variation each')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port),
+                                 make_handler(SquareStandin(args.throttle_every, args.catalog_items)))
+    print(f"Square stand-in listening on http://{args.host}:{args.port}")
+    server.serve_forever()
@@ -27,8 +27,18 @@ Each supplier configuration includes:
 - Inventory value transformations
 - File naming patterns and filters
 
-The configuration system enables the creation of specialized processor classes
-for each supplier while maintaining a consistent interface.
+The configurations compile into SupplierPlan objects (see supplier_plan.py), so every
+supplier is downloaded, read and standardized by one shared implementation.
+
+The settings above are the defaults of the existing suppliers. An entry of
+keyword_mailadd.json can override them, or define a new supplier completely, with these
+optional keys next to SUBJECT and FROM:
+
+    "NAME", "FORMAT", "ENCODING"   supplier name, 'excel' or 'csv', file encoding
+    "COLUMNS"                      column_mapping (upc/inventory/description/extended_description_column)
+    "RULES"                        processing_rules, merged over the defaults, e.g.
+                                   {"file_names": ["XY_inv.xlsx"], "attachments": [["*.xlsx", "XY_inv.xlsx"]]}
+    "DTYPES"                       read dtypes, e.g. {"Barcode": "str"}
 """
 
 import json
@@ -38,6 +48,8 @@ from typing import Dict, List, Any, Optional
 from pathlib import Path
 import logging
 
+from .supplier_plan import SupplierPlan, compile_supplier_plan
+
 logger = logging.getLogger(__name__)
 
 
@@ -116,6 +128,20 @@ class EmailConfig:
             raise ValueError("Email username and password are required")
 
 
+@dataclass
+class AllocationConfig:
+    """How duplicate UPCs in the supplier inventory are resolved for Amazon listings."""
+    policy: str = 'max'  # 'max', 'sum' or 'prefer' (see AllocationService)
+    preferred_suppliers: List[str] = field(default_factory=list)
+    
+    def __post_init__(self):
+        """Validate allocation configuration after initialization."""
+        if self.policy not in ['max', 'sum', 'prefer']:
+            raise ValueError(f"Unknown allocation policy: {self.policy}")
+        if self.policy == 'prefer' and not self.preferred_suppliers:
+            raise ValueError("The 'prefer' allocation policy needs preferred_suppliers")
+
+
 class ConfigurationError(Exception):
     """Exception raised for configuration-related errors."""
     pass
@@ -136,9 +162,11 @@ class ConfigManager:
         
         # Configuration caches
         self._supplier_configs: Optional[Dict[str, SupplierConfig]] = None
+        self._supplier_plans: Optional[Dict[str, SupplierPlan]] = None
         self._database_config: Optional[DatabaseConfig] = None
         self._amazon_config: Optional[AmazonConfig] = None
         self._email_config: Optional[EmailConfig] = None
+        self._allocation_config: Optional[AllocationConfig] = None
         
         # Validate configuration directory exists
         if not self.appdata_path.exists():
@@ -191,18 +219,18 @@ class ConfigManager:
                 
                 self._supplier_configs = {}
                 for code, config in supplier_data.items():
-                    # Create SupplierConfig with basic email settings
+                    # Create SupplierConfig from the email settings, overriding the defaults below
                     supplier_config = SupplierConfig(
                         code=code,
-                        name=self._get_supplier_name(code),
+                        name=config.get('NAME') or self._get_supplier_name(code),
                         email_subject=config.get('SUBJECT', ''),
                         email_from=config.get('FROM'),
-                        file_format=self._get_supplier_file_format(code),
+                        file_format=config.get('FORMAT') or self._get_supplier_file_format(code),
                         file_patterns=self._get_supplier_file_patterns(code),
-                        column_mapping=self._get_supplier_column_mapping(code),
-                        processing_rules=self._get_supplier_processing_rules(code),
-                        dtypes=self._get_supplier_dtypes(code),
-                        encoding=self._get_supplier_encoding(code)
+                        column_mapping=config.get('COLUMNS') or self._get_supplier_column_mapping(code),
+                        processing_rules={**self._get_supplier_processing_rules(code), **config.get('RULES', {})},
+                        dtypes=config.get('DTYPES') or self._get_supplier_dtypes(code),
+                        encoding=config.get('ENCODING') or self._get_supplier_encoding(code)
                     )
                     
                     self._supplier_configs[code] = supplier_config
@@ -243,6 +271,50 @@ class ConfigManager:
         """
         return list(self.get_supplier_configs().keys())
     
+    def get_supplier_plans(self) -> Dict[str, SupplierPlan]:
+        """
+        Compile the read and standardization plan of every supplier.
+        All plans are validated together, so a bad configuration fails before any file is read.
+        
+        Returns:
+            Dictionary mapping supplier codes to SupplierPlan objects
+            
+        Raises:
+            ConfigurationError: If any supplier configuration does not compile
+        """
+        if self._supplier_plans is None:
+            plans, errors = {}, []
+            for code, config in self.get_supplier_configs().items():
+                try:
+                    plans[code] = compile_supplier_plan(
+                        code, config.file_format, config.column_mapping, config.processing_rules,
+                        config.dtypes, config.encoding, config.email_subject, config.email_from
+                    )
+                except ValueError as e:
+                    errors.append(str(e))
+            
+            if errors:
+                raise ConfigurationError(f"Invalid supplier plans: {'; '.join(errors)}")
+            
+            self._supplier_plans = plans
+            logger.info(f"Compiled {len(plans)} supplier plans")
+        
+        return self._supplier_plans
+    
+    def get_supplier_plan(self, supplier_code: str) -> SupplierPlan:
+        """
+        Get the compiled plan of a specific supplier.
+        
+        Raises:
+            ConfigurationError: If supplier configuration not found or invalid
+        """
+        plans = self.get_supplier_plans()
+        
+        if supplier_code not in plans:
+            raise ConfigurationError(f"Supplier configuration not found: {supplier_code}")
+        
+        return plans[supplier_code]
+    
     def create_supplier_processor(self, supplier_code: str):
         """
         Create a processor instance for the specified supplier.
@@ -334,12 +406,39 @@ class ConfigManager:
         
         return self._email_config
     
+    def get_allocation_config(self) -> AllocationConfig:
+        """
+        Get the allocation policy from allocation.json, e.g.
+        {"policy": "prefer", "preferred_suppliers": ["OUTRE", "HZ"]}.
+        Without the file duplicate UPCs take the largest quantity ('max').
+        
+        Returns:
+            AllocationConfig object
+            
+        Raises:
+            ConfigurationError: If allocation configuration is invalid
+        """
+        if self._allocation_config is None:
+            try:
+                if (self.appdata_path / 'allocation.json').exists():
+                    self._allocation_config = AllocationConfig(**self._load_json_file('allocation.json'))
+                else:
+                    self._allocation_config = AllocationConfig()
+                logger.info(f"Allocation policy: {self._allocation_config.policy}")
+                
+            except Exception as e:
+                raise ConfigurationError(f"Failed to load allocation configuration: {e}")
+        
+        return self._allocation_config
+    
     def reload_configurations(self):
         """Clear cached configurations to force reload on next access."""
         self._supplier_configs = None
+        self._supplier_plans = None
         self._database_config = None
         self._amazon_config = None
         self._email_config = None
+        self._allocation_config = None
         logger.info("Configuration cache cleared")
     
     def validate_all_configurations(self) -> Dict[str, bool]:
@@ -359,6 +458,14 @@ class ConfigManager:
             logger.error(f"Supplier configuration validation failed: {e}")
             validation_results['suppliers'] = False
         
+        # Validate supplier plans
+        try:
+            self.get_supplier_plans()
+            validation_results['supplier_plans'] = True
+        except ConfigurationError as e:
+            logger.error(f"Supplier plan validation failed: {e}")
+            validation_results['supplier_plans'] = False
+        
         # Validate database configuration
         try:
             self.get_database_config()
@@ -375,6 +482,14 @@ class ConfigManager:
             logger.error(f"Amazon configuration validation failed: {e}")
             validation_results['amazon'] = False
         
+        # Validate allocation configuration
+        try:
+            self.get_allocation_config()
+            validation_results['allocation'] = True
+        except ConfigurationError as e:
+            logger.error(f"Allocation configuration validation failed: {e}")
+            validation_results['allocation'] = False
+        
         # Validate email configuration
         try:
             self.get_email_config()
@@ -491,7 +606,11 @@ class ConfigManager:
             'AL': {
                 'multiple_files': True,
                 'file_names': ['AL_brs inv.xls', 'AL_inv.xls'],
+                # attachment name pattern -> file saved under inv_data/
+                'attachments': [['*brs*', 'AL_brs inv.xls'], ['*inv*', 'AL_inv.xls']],
                 'concat_files': True,
+                # both exports are read with the same header
+                'header_names': ['ItemCode', 'ItemCodeDesc', 'Stock Lvl', 'OnHand Customer', 'AliasItemNo', 'StandardUnitPrice'],
                 'inventory_type': 'int',
                 'email_folder': '"[Gmail]/All Mail"',
                 'file_patterns': ['*brs*', '*inv*']
@@ -499,15 +618,17 @@ class ConfigManager:
             'VF': {
                 'multiple_files': False,
                 'file_names': ['VF_Inventory.xls'],
+                'attachments': [['*.xls', 'VF_Inventory.xls']],
                 'inventory_type': 'int',
                 'email_folder': '"[Gmail]/All Mail"',
                 'dtype_overrides': {'Barcode': str},
-                'numeric_conversion': True,
+                'upc_type': 'int64',
                 'min_inventory_threshold': 10
             },
             'BY': {
                 'multiple_files': False,
                 'file_names': ['BY_InventoryListAll.xls'],
+                'attachments': [['*', 'BY_InventoryListAll.xls']],
                 'inventory_type': 'int',
                 'email_folder': '"[Gmail]/All Mail"',
                 'skiprows': 3,
@@ -516,6 +637,7 @@ class ConfigManager:
             'NBF': {
                 'multiple_files': False,
                 'file_names': ['NBF_Chade Fashions.xlsx'],
+                'attachments': [['*.xlsx', 'NBF_Chade Fashions.xlsx']],
                 'inventory_mapping': {'A': 20, 'B': 5, 'C': 0, 'X': 0},
                 'email_folder': '"[Gmail]/All Mail"',
                 'file_extension_filter': '.xlsx'
@@ -523,6 +645,8 @@ class ConfigManager:
             'OUTRE': {
                 'multiple_files': False,
                 'file_names': ['OUTRE_StockAvailability.csv'],
+                'attachments': [['*.csv', 'OUTRE_StockAvailability.csv']],
+                'mail_search_from': False,
                 'csv_separator': '\t',
                 'skiprows': [1],
                 'skipfooter': 1,
@@ -532,6 +656,8 @@ class ConfigManager:
             'HZ': {
                 'multiple_files': False,
                 'file_names': ['HZ_StockAvailability.csv'],
+                'attachments': [['*.csv', 'HZ_StockAvailability.csv']],
+                'mail_search_from': False,
                 'csv_separator': '\t',
                 'skiprows': [1],
                 'skipfooter': 1,
@@ -541,6 +667,8 @@ class ConfigManager:
             'SNG': {
                 'multiple_files': False,
                 'file_names': ['SNG_inv.xlsx'],
+                # 9-character attachment names
+                'attachments': [['?????????', 'SNG_inv.xlsx']],
                 'inventory_mapping': {'Y': 20, 'N': 0},
                 'filename_length_filter': 9,
                 'email_folder': '"[Gmail]/All Mail"',
@@ -549,9 +677,12 @@ class ConfigManager:
             'MANE': {
                 'multiple_files': False,
                 'file_names': ['MANE_inv.xlsx'],
+                'attachments': [['*.xlsx', 'MANE_inv.xlsx']],
+                'record_received': False,
                 'inventory_type': 'int',
                 'email_folder': '"[Gmail]/All Mail"',
                 'dtype_overrides': {'Barcode': str},
+                'upc_type': 'int64',
                 'min_inventory_threshold': 10
             }
         }
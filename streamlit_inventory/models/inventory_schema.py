@@ -0,0 +1,109 @@
+"""
+Typed schema of the combined inventory table (appdata/all_upc_inv.xlsx).
+
+all_upc_inv is read from Excel as object columns (UPC a mix of int and str) and grows by
+concatenating supplier frames, so every stage used to re-cast it with astype(str).
+enforce_inventory_schema gives it one compact layout instead:
+
+    COMPAY                 category (a handful of supplier codes)
+    UPC                    pyarrow string, numbers written without a decimal part
+    company Inventory      int32
+    DESCRIPTION,
+    EXTENDED DESCRIPTION   category when values repeat, pyarrow string otherwise
+
+UPC stays text: UPC-A codes keep their leading zero in Amazon product-id and POS
+Item Lookup Code, which an integer column would drop.
+"""
+
+import numbers
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Dict, List, Any
+import logging
+
+from .supplier_plan import STANDARD_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+
+TEXT_DTYPE = 'string[pyarrow]'
+QUANTITY_DTYPE = 'int32'
+
+# A description column becomes categorical when it has fewer distinct values than this share of rows
+CATEGORY_MAX_RATIO = 0.5
+
+
+def normalize_upc(upc: pd.Series) -> pd.Series:
+    """UPC values as text; numbers (int, or float from columns with blanks) lose the '.0'."""
+    if pd.api.types.is_numeric_dtype(upc):
+        numeric = upc
+    elif upc.dtype == object:
+        numeric = pd.to_numeric(upc.where(upc.map(lambda value: isinstance(value, numbers.Number))),
+                                errors='coerce')
+    else:
+        numeric = None
+
+    text = upc.astype(TEXT_DTYPE)
+    if numeric is not None and numeric.notna().any():
+        digits = numeric.round().astype('Int64').astype(TEXT_DTYPE)
+        text = digits.where(numeric.notna(), text)
+    return text.str.strip()
+
+
+def _as_text(values: pd.Series) -> pd.Series:
+    """Free text as a category when values repeat enough, pyarrow strings otherwise."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(object)
+    text = values.astype(TEXT_DTYPE)
+    if text.nunique() < CATEGORY_MAX_RATIO * len(text):
+        return text.astype('category')
+    return text
+
+
+def enforce_inventory_schema(data: pd.DataFrame, column_names: List[str] = STANDARD_COLUMNS) -> pd.DataFrame:
+    """
+    Cast the combined inventory to the typed schema.
+
+    Cheap on a frame that already has it, so it is applied after every merge.
+
+    Args:
+        data: Inventory with company, UPC, inventory, description and extended description columns
+        column_names: Names of those columns, STANDARD_COLUMNS by default
+
+    Returns:
+        Typed copy of the first five columns; missing inventory becomes 0
+    """
+    company_col, upc_col, inv_col, desc_col, ext_col = column_names
+    quantity = pd.to_numeric(data[inv_col], errors='coerce').fillna(0)
+
+    return pd.DataFrame({
+        company_col: data[company_col].astype(object).astype('category'),
+        upc_col: normalize_upc(data[upc_col]),
+        inv_col: quantity.astype(QUANTITY_DTYPE),
+        desc_col: _as_text(data[desc_col]),
+        ext_col: _as_text(data[ext_col])
+    }, index=data.index)
+
+
+def memory_bytes(data: pd.DataFrame) -> int:
+    """Memory held by a frame, including the strings it references."""
+    return int(data.memory_usage(index=True, deep=True).sum())
+
+
+@dataclass
+class MemoryReport:
+    """Size of the inventory table at each stage of an update."""
+    stages: List[Dict[str, Any]] = field(default_factory=list)
+
+    def record(self, stage: str, data: pd.DataFrame) -> Dict[str, Any]:
+        """Record rows and bytes of data after a stage and log them."""
+        entry = {'stage': stage, 'rows': len(data), 'bytes': memory_bytes(data)}
+        self.stages.append(entry)
+        logger.info(f"{stage}: {entry['rows']} rows, {entry['bytes'] / 1024 / 1024:.2f} MB")
+        return entry
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Stages with rows, bytes and MB."""
+        report = pd.DataFrame(self.stages, columns=['stage', 'rows', 'bytes'])
+        report['MB'] = (report['bytes'] / 1024 / 1024).round(2)
+        return report
@@ -1,23 +1,28 @@
 """
 Supplier-specific data processing models and classes.
 
-This module provides base classes and specific implementations for processing
-inventory data from different suppliers based on their unique file formats
-and processing requirements.
+This module provides the inventory containers and the processor that reads supplier
+files through their compiled SupplierPlan (see supplier_plan.py).
 """
 
 import pandas as pd
+import numpy as np
 import os
-from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import logging
 
+from .supplier_plan import compile_supplier_plan
+from .inventory_schema import normalize_upc
+
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+INVENTORY_COLUMNS = ['COMPAY', 'UPC', 'company Inventory', 'Description', 'Extended Description']
+
+
+@dataclass(slots=True)
 class InventoryItem:
     """Represents a single inventory item from a supplier."""
     upc: str
@@ -35,39 +40,80 @@ class InventoryItem:
             raise ValueError("Quantity cannot be negative")
 
 
+def validate_inventory(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Split standardized inventory rows into valid and rejected rows with vectorized masks.
+
+    UPCs are normalized to strings by normalize_upc (numeric UPCs lose their '.0', also in
+    columns mixing numbers and text) and quantities to int64. A row is rejected for an
+    empty UPC, a non-numeric, fractional or negative quantity; rejected rows keep their
+    original values plus a 'reason' column.
+
+    Args:
+        df: DataFrame with INVENTORY_COLUMNS
+
+    Returns:
+        Tuple of valid rows and rejected rows
+    """
+    upc = normalize_upc(df['UPC'])
+    quantity = pd.to_numeric(df['company Inventory'], errors='coerce')
+
+    empty_upc = (upc.isna() | (upc == '') | upc.str.lower().isin(['nan', 'none', '<na>'])).to_numpy(dtype=bool)
+    non_numeric = quantity.isna().to_numpy()
+    fractional = (quantity % 1 != 0).to_numpy(dtype=bool) & ~non_numeric
+    negative = (quantity < 0).to_numpy(dtype=bool)
+
+    reason = np.select([empty_upc, non_numeric, fractional, negative],
+                       ['empty UPC', 'non-numeric quantity', 'fractional quantity', 'negative quantity'], default='')
+    invalid = reason != ''
+
+    rejected = df[invalid].assign(reason=reason[invalid])
+    valid = df[~invalid].assign(**{
+        'UPC': upc[~invalid].astype(str).to_numpy(),
+        'company Inventory': quantity[~invalid].astype('int64').to_numpy(),
+        'Description': df['Description'][~invalid].astype(str).to_numpy(),
+        'Extended Description': df['Extended Description'][~invalid].astype(str).to_numpy()
+    })
+    return valid.reset_index(drop=True), rejected.reset_index(drop=True)
+
+
 @dataclass
 class SupplierInventory:
-    """Container for all inventory items from a supplier."""
+    """
+    Inventory of a supplier, held column-wise in a DataFrame with INVENTORY_COLUMNS.
+    Rows that failed validation are kept in rejected with a 'reason' column.
+    """
     supplier_code: str
-    items: List[InventoryItem]
+    data: pd.DataFrame
     last_sync: datetime
     file_sources: List[str]
+    rejected: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=INVENTORY_COLUMNS + ['reason']))
     
     @property
     def item_count(self) -> int:
         """Get total number of items."""
-        return len(self.items)
+        return len(self.data)
+
+    @property
+    def items(self) -> List[InventoryItem]:
+        """InventoryItem per row, built on demand from the columns."""
+        return [
+            InventoryItem(upc, description, extended_description, self.supplier_code, int(quantity), self.last_sync)
+            for upc, quantity, description, extended_description in zip(
+                self.data['UPC'], self.data['company Inventory'],
+                self.data['Description'], self.data['Extended Description'])
+        ]
     
     def to_dataframe(self) -> pd.DataFrame:
-        """Convert inventory items to pandas DataFrame."""
-        if not self.items:
-            return pd.DataFrame(columns=['COMPAY', 'UPC', 'company Inventory', 'Description', 'Extended Description'])
-        
-        data = []
-        for item in self.items:
-            data.append({
-                'COMPAY': item.supplier_code,
-                'UPC': item.upc,
-                'company Inventory': item.quantity,
-                'Description': item.description,
-                'Extended Description': item.extended_description
-            })
-        
-        return pd.DataFrame(data)
+        """Inventory as a DataFrame with INVENTORY_COLUMNS."""
+        return self.data[INVENTORY_COLUMNS].copy()
 
 
-class SupplierProcessor(ABC):
-    """Base class for supplier-specific inventory processing."""
+class SupplierProcessor:
+    """
+    Inventory processing of one supplier, driven by its compiled SupplierPlan.
+    Every supplier shares this implementation; differences live in the configuration.
+    """
     
     def __init__(self, supplier_code: str, config: Dict[str, Any]):
         """
@@ -76,13 +122,19 @@ class SupplierProcessor(ABC):
         Args:
             supplier_code: Supplier code (e.g., 'AL', 'VF')
             config: Supplier configuration dictionary
+            
+        Raises:
+            ValueError: If the configuration does not compile into a plan
         """
         self.supplier_code = supplier_code
         self.config = config
         self.column_mapping = config.get('column_mapping', {})
         self.processing_rules = config.get('processing_rules', {})
+        self.plan = compile_supplier_plan(
+            supplier_code, config.get('file_format', 'excel'), self.column_mapping, self.processing_rules,
+            config.get('dtypes'), config.get('encoding', 'utf-8')
+        )
         
-    @abstractmethod
     def process_files(self, file_paths: List[str]) -> SupplierInventory:
         """
         Process supplier inventory files.
@@ -93,190 +145,37 @@ class SupplierProcessor(ABC):
         Returns:
             SupplierInventory object with processed data
         """
-        pass
-    
-    def _standardize_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
-        """
-        Standardize DataFrame columns to common format.
-        
-        Args:
-            df: Input DataFrame with supplier-specific columns
-            
-        Returns:
-            DataFrame with standardized columns
-        """
-        # Extract column mappings
-        upc_col = self.column_mapping.get('upc_column')
-        inv_col = self.column_mapping.get('inventory_column')
-        desc_col = self.column_mapping.get('description_column')
-        ext_desc_col = self.column_mapping.get('extended_description_column')
-        
-        if not all([upc_col, inv_col, desc_col, ext_desc_col]):
-            raise ValueError(f"Missing column mappings for supplier {self.supplier_code}")
-        
-        # Select and rename columns
-        try:
-            standardized = df[[upc_col, inv_col, desc_col, ext_desc_col]].copy()
-            standardized.insert(0, 'Company', self.supplier_code)
-            standardized.columns = ['COMPAY', 'UPC', 'company Inventory', 'Description', 'Extended Description']
-            
-            return standardized
-            
-        except KeyError as e:
-            raise ValueError(f"Column not found in {self.supplier_code} data: {e}")
-    
-    def _clean_inventory_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """
-        Clean and validate inventory data.
+        existing = [file_path for file_path in file_paths if os.path.exists(file_path)]
+        for file_path in set(file_paths) - set(existing):
+            logger.warning(f"File not found: {file_path}")
+        if not existing:
+            raise ValueError(f"No valid files provided for {self.supplier_code}")
         
-        Args:
-            df: DataFrame with standardized columns
-            
-        Returns:
-            Cleaned DataFrame
-        """
-        # Remove rows with missing UPC or inventory
-        df = df.dropna(subset=['UPC', 'company Inventory'])
-        
-        # Apply inventory mapping if specified
-        inventory_mapping = self.processing_rules.get('inventory_mapping')
-        if inventory_mapping:
-            df['company Inventory'] = df['company Inventory'].replace(inventory_mapping)
-        
-        # Convert inventory to integer if specified
-        if self.processing_rules.get('inventory_type') == 'int':
-            df['company Inventory'] = df['company Inventory'].astype('int')
-        
-        return df
+        data = self.plan.execute(file_paths=existing, column_names=INVENTORY_COLUMNS)
+        return self._to_supplier_inventory(data, existing)
     
-    def _dataframe_to_inventory_items(self, df: pd.DataFrame) -> List[InventoryItem]:
+    def _to_supplier_inventory(self, df: pd.DataFrame, file_sources: List[str]) -> SupplierInventory:
         """
-        Convert DataFrame to list of InventoryItem objects.
+        Validate cleaned data and wrap it in a SupplierInventory.
         
         Args:
             df: Cleaned DataFrame with standardized columns
+            file_sources: Files the data was read from
             
         Returns:
-            List of InventoryItem objects
+            SupplierInventory with the valid rows; rejected rows are logged in bulk
         """
-        items = []
-        current_time = datetime.now()
-        
-        for _, row in df.iterrows():
-            try:
-                item = InventoryItem(
-                    upc=str(row['UPC']),
-                    description=str(row['Description']),
-                    extended_description=str(row['Extended Description']),
-                    supplier_code=self.supplier_code,
-                    quantity=int(row['company Inventory']),
-                    last_updated=current_time
-                )
-                items.append(item)
-            except (ValueError, TypeError) as e:
-                logger.warning(f"Skipping invalid item for {self.supplier_code}: {e}")
-                continue
-        
-        return items
-
-
-class ExcelSupplierProcessor(SupplierProcessor):
-    """Processor for suppliers using Excel files."""
-    
-    def process_files(self, file_paths: List[str]) -> SupplierInventory:
-        """Process Excel files for supplier inventory."""
-        if not file_paths:
-            raise ValueError(f"No files provided for {self.supplier_code}")
-        
-        dataframes = []
-        processed_files = []
-        
-        for file_path in file_paths:
-            if not os.path.exists(file_path):
-                logger.warning(f"File not found: {file_path}")
-                continue
-            
-            try:
-                df = pd.read_excel(file_path)
-                dataframes.append(df)
-                processed_files.append(file_path)
-                logger.info(f"Loaded {len(df)} rows from {file_path}")
-                
-            except Exception as e:
-                logger.error(f"Error reading {file_path}: {e}")
-                continue
-        
-        if not dataframes:
-            raise ValueError(f"No valid files processed for {self.supplier_code}")
-        
-        # Concatenate if multiple files
-        if len(dataframes) > 1 and self.processing_rules.get('concat_files', False):
-            combined_df = pd.concat(dataframes, ignore_index=True)
-        else:
-            combined_df = dataframes[0]
-        
-        # Standardize and clean data
-        standardized_df = self._standardize_dataframe(combined_df)
-        cleaned_df = self._clean_inventory_data(standardized_df)
-        
-        # Convert to inventory items
-        items = self._dataframe_to_inventory_items(cleaned_df)
-        
-        return SupplierInventory(
-            supplier_code=self.supplier_code,
-            items=items,
-            last_sync=datetime.now(),
-            file_sources=processed_files
-        )
-
-
-class CSVSupplierProcessor(SupplierProcessor):
-    """Processor for suppliers using CSV files."""
-    
-    def process_files(self, file_paths: List[str]) -> SupplierInventory:
-        """Process CSV files for supplier inventory."""
-        if not file_paths:
-            raise ValueError(f"No files provided for {self.supplier_code}")
-        
-        file_path = file_paths[0]  # CSV suppliers typically use single files
-        
-        if not os.path.exists(file_path):
-            raise ValueError(f"File not found: {file_path}")
-        
-        try:
-            # Get CSV-specific parameters
-            separator = self.processing_rules.get('csv_separator', ',')
-            encoding = self.config.get('encoding', 'utf-8')
-            skiprows = self.processing_rules.get('skiprows', None)
-            skipfooter = self.processing_rules.get('skipfooter', 0)
-            
-            df = pd.read_csv(
-                file_path,
-                sep=separator,
-                encoding=encoding,
-                skiprows=skiprows,
-                skipfooter=skipfooter,
-                engine='python',
-                on_bad_lines='warn'
-            )
-            
-            logger.info(f"Loaded {len(df)} rows from {file_path}")
-            
-        except Exception as e:
-            raise ValueError(f"Error reading CSV file {file_path}: {e}")
-        
-        # Standardize and clean data
-        standardized_df = self._standardize_dataframe(df)
-        cleaned_df = self._clean_inventory_data(standardized_df)
-        
-        # Convert to inventory items
-        items = self._dataframe_to_inventory_items(cleaned_df)
+        valid, rejected = validate_inventory(df)
+        if len(rejected):
+            counts = ', '.join(f"{count} {reason}" for reason, count in rejected['reason'].value_counts().items())
+            logger.warning(f"Rejected {len(rejected)} of {len(df)} rows for {self.supplier_code}: {counts}")
         
         return SupplierInventory(
             supplier_code=self.supplier_code,
-            items=items,
+            data=valid,
             last_sync=datetime.now(),
-            file_sources=[file_path]
+            file_sources=file_sources,
+            rejected=rejected
         )
 
 
@@ -286,7 +185,7 @@ class SupplierProcessorFactory:
     @staticmethod
     def create_processor(supplier_code: str, config: Dict[str, Any]) -> SupplierProcessor:
         """
-        Create appropriate processor for supplier.
+        Create processor for supplier.
         
         Args:
             supplier_code: Supplier code
@@ -295,213 +194,8 @@ class SupplierProcessorFactory:
         Returns:
             SupplierProcessor instance
         """
-        # Use specialized processors for specific suppliers
-        specialized_processors = {
-            'AL': AliciaProcessor,
-            'VF': VivicaFoxProcessor,
-            'BY': BoyangProcessor,
-            'NBF': ChadeProcessor,
-            'OUTRE': OutreProcessor,
-            'HZ': HarlemProcessor,
-            'SNG': SNGProcessor,
-            'MANE': ManeProcessor
-        }
-        
-        if supplier_code in specialized_processors:
-            processor_class = specialized_processors[supplier_code]
-            return processor_class(supplier_code, config)
-        
-        # Fallback to generic processors based on file format
-        file_format = config.get('file_format', 'excel')
-        
-        if file_format == 'excel':
-            return ExcelSupplierProcessor(supplier_code, config)
-        elif file_format == 'csv':
-            return CSVSupplierProcessor(supplier_code, config)
-        else:
-            raise ValueError(f"Unsupported file format: {file_format}")
-
-
-# Specific processor classes for suppliers with unique requirements
-
-class AliciaProcessor(ExcelSupplierProcessor):
-    """Specialized processor for Alicia International (AL) with dual file handling."""
-    
-    def process_files(self, file_paths: List[str]) -> SupplierInventory:
-        """Process AL files - expects both 'brs' and 'inv' files."""
-        # AL requires both files to be concatenated
-        if len(file_paths) < 2:
-            logger.warning(f"AL processor expects 2 files, got {len(file_paths)}")
-        
-        return super().process_files(file_paths)
-
+        return SupplierProcessor(supplier_code, config)
 
-class VivicaFoxProcessor(ExcelSupplierProcessor):
-    """Specialized processor for Vivica Fox (VF) with barcode handling."""
-    
-    def process_files(self, file_paths: List[str]) -> SupplierInventory:
-        """Process VF files with special barcode handling."""
-        if not file_paths:
-            raise ValueError(f"No files provided for {self.supplier_code}")
-        
-        file_path = file_paths[0]
-        if not os.path.exists(file_path):
-            raise ValueError(f"File not found: {file_path}")
-        
-        try:
-            # Load with specific dtype for Barcode column
-            df = pd.read_excel(file_path, dtype={'Barcode': str})
-            logger.info(f"Loaded {len(df)} rows from {file_path}")
-            
-        except Exception as e:
-            raise ValueError(f"Error reading Excel file {file_path}: {e}")
-        
-        # Standardize and clean data
-        standardized_df = self._standardize_dataframe(df)
-        
-        # VF-specific cleaning: handle non-numeric barcodes
-        standardized_df.loc[~standardized_df['UPC'].str.isnumeric(), 'UPC'] = pd.NA
-        standardized_df['UPC'] = pd.to_numeric(standardized_df['UPC'], downcast='integer')
-        
-        cleaned_df = self._clean_inventory_data(standardized_df)
-        
-        # VF-specific rule: set inventory to 0 if less than 10
-        cleaned_df.loc[cleaned_df['company Inventory'] < 10, 'company Inventory'] = 0
-        
-        # Convert to inventory items
-        items = self._dataframe_to_inventory_items(cleaned_df)
-        
-        return SupplierInventory(
-            supplier_code=self.supplier_code,
-            items=items,
-            last_sync=datetime.now(),
-            file_sources=[file_path]
-        )
-
-
-class BoyangProcessor(ExcelSupplierProcessor):
-    """Specialized processor for Boyang (BY) with skiprows handling."""
-    
-    def process_files(self, file_paths: List[str]) -> SupplierInventory:
-        """Process BY files with skiprows."""
-        if not file_paths:
-            raise ValueError(f"No files provided for {self.supplier_code}")
-        
-        file_path = file_paths[0]
-        if not os.path.exists(file_path):
-            raise ValueError(f"File not found: {file_path}")
-        
-        try:
-            # Skip first 3 rows as per existing logic
-            df = pd.read_excel(file_path, skiprows=3)
-            logger.info(f"Loaded {len(df)} rows from {file_path}")
-            
-        except Exception as e:
-            raise ValueError(f"Error reading Excel file {file_path}: {e}")
-        
-        # Standardize and clean data
-        standardized_df = self._standardize_dataframe(df)
-        cleaned_df = self._clean_inventory_data(standardized_df)
-        
-        # BY-specific rule: set inventory to 0 if less than 10
-        cleaned_df.loc[cleaned_df['company Inventory'] < 10, 'company Inventory'] = 0
-        
-        # Convert to inventory items
-        items = self._dataframe_to_inventory_items(cleaned_df)
-        
-        return SupplierInventory(
-            supplier_code=self.supplier_code,
-            items=items,
-            last_sync=datetime.now(),
-            file_sources=[file_path]
-        )
-
-
-class ChadeProcessor(ExcelSupplierProcessor):
-    """Specialized processor for Chade Fashions (NBF) with inventory mapping."""
-    
-    def _clean_inventory_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Clean NBF data with special inventory mapping."""
-        # Remove rows with missing UPC or inventory
-        df = df.dropna(subset=['UPC', 'company Inventory'])
-        
-        # NBF-specific inventory mapping
-        inventory_mapping = {'A': 20, 'B': 5, 'C': 0, 'X': 0}
-        df['company Inventory'] = df['company Inventory'].replace(inventory_mapping)
-        
-        return df
-
-
-class OutreProcessor(CSVSupplierProcessor):
-    """Specialized processor for Outre with tab-separated values."""
-    
-    def process_files(self, file_paths: List[str]) -> SupplierInventory:
-        """Process Outre CSV files with special formatting."""
-        return super().process_files(file_paths)
-
-
-class HarlemProcessor(CSVSupplierProcessor):
-    """Specialized processor for Harlem 125 (HZ) with tab-separated values."""
-    
-    def process_files(self, file_paths: List[str]) -> SupplierInventory:
-        """Process HZ CSV files with special formatting."""
-        return super().process_files(file_paths)
-
-
-class SNGProcessor(ExcelSupplierProcessor):
-    """Specialized processor for SNG Hair with filename filtering."""
-    
-    def process_files(self, file_paths: List[str]) -> SupplierInventory:
-        """Process SNG files with filename length validation."""
-        # SNG has specific filename length requirements
-        filename_length = self.processing_rules.get('filename_length_filter')
-        if filename_length:
-            filtered_paths = []
-            for path in file_paths:
-                filename = os.path.basename(path)
-                if len(filename) == filename_length:
-                    filtered_paths.append(path)
-            file_paths = filtered_paths
-        
-        return super().process_files(file_paths)
-
-
-class ManeProcessor(ExcelSupplierProcessor):
-    """Specialized processor for Mane Concept with barcode handling."""
-    
-    def process_files(self, file_paths: List[str]) -> SupplierInventory:
-        """Process MANE files with special barcode handling."""
-        if not file_paths:
-            raise ValueError(f"No files provided for {self.supplier_code}")
-        
-        file_path = file_paths[0]
-        if not os.path.exists(file_path):
-            raise ValueError(f"File not found: {file_path}")
-        
-        try:
-            # Load with specific dtype for Barcode column
-            df = pd.read_excel(file_path, dtype={'Barcode': str})
-            logger.info(f"Loaded {len(df)} rows from {file_path}")
-            
-        except Exception as e:
-            raise ValueError(f"Error reading Excel file {file_path}: {e}")
-        
-        # Standardize and clean data
-        standardized_df = self._standardize_dataframe(df)
-        cleaned_df = self._clean_inventory_data(standardized_df)
-        
-        # MANE-specific rule: set inventory to 0 if less than 10
-        cleaned_df.loc[cleaned_df['company Inventory'] < 10, 'company Inventory'] = 0
-        
-        # Convert to inventory items
-        items = self._dataframe_to_inventory_items(cleaned_df)
-        
-        return SupplierInventory(
-            supplier_code=self.supplier_code,
-            items=items,
-            last_sync=datetime.now(),
-            file_sources=[file_path]
-        )
 
 # Usage example
 if __name__ == "__main__":
@@ -0,0 +1,289 @@
+"""
+Compiled supplier plans.
+
+A SupplierPlan is compiled once from a supplier's column mapping and processing rules
+(see ConfigManager) and validated before any file is read. Every supplier is then read
+and standardized by the same implementation: only the mapped columns are read, and the
+UPC conversion, inventory mapping, integer cast and threshold rules run as one chain of
+column expressions. The plan also holds where the supplier's mail is found and which
+attachment is saved to which file, so downloading is shared as well. Adding a supplier
+only needs configuration.
+"""
+
+import pandas as pd
+from dataclasses import dataclass, field
+from datetime import datetime
+from email import message_from_bytes
+from email.message import Message
+from email.utils import parsedate_to_datetime
+from fnmatch import fnmatchcase
+from typing import Dict, List, Any, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Column names of appdata/all_upc_inv.xlsx
+STANDARD_COLUMNS = ['COMPAY', 'UPC', 'company Inventory', 'DESCRIPTION', 'EXTENDED DESCRIPTION']
+
+# column_mapping keys, in the order of STANDARD_COLUMNS[1:]
+MAPPING_KEYS = ('upc_column', 'inventory_column', 'description_column', 'extended_description_column')
+
+FILE_FORMATS = ('excel', 'csv')
+INVENTORY_TYPES = (None, 'int')
+UPC_TYPES = (None, 'int64')
+
+DEFAULT_MAIL_FOLDER = '"[Gmail]/All Mail"'
+
+
+@dataclass(frozen=True)
+class SupplierPlan:
+    """Validated read and standardization plan of one supplier."""
+    code: str
+    file_format: str
+    file_names: Tuple[str, ...]
+    source_columns: Tuple[str, ...]
+    read_options: Dict[str, Any] = field(default_factory=dict)
+    header_names: Optional[Tuple[str, ...]] = None
+    inventory_mapping: Optional[Dict[str, Any]] = None
+    inventory_type: Optional[str] = None
+    upc_type: Optional[str] = None
+    min_inventory_threshold: Optional[int] = None
+    mail_folder: str = DEFAULT_MAIL_FOLDER
+    mail_search: str = ''
+    # (attachment name pattern, file name) pairs; an attachment is saved by the first pattern it matches
+    attachments: Tuple[Tuple[str, str], ...] = ()
+    search_backwards: bool = False
+    record_received: bool = True
+
+    def file_paths(self, root_path: str = '') -> List[str]:
+        """Files the supplier's inventory is saved to, under inv_data/."""
+        return [f'{root_path}inv_data/{name}' for name in self.file_names]
+
+    def attachment_path(self, filename: str, root_path: str = '') -> Optional[str]:
+        """File an attachment is saved to, None if it matches no attachment pattern (case-insensitive)."""
+        for pattern, file_name in self.attachments:
+            if fnmatchcase(filename.lower(), pattern.lower()):
+                return f'{root_path}inv_data/{file_name}'
+        return None
+
+    def save_attachments(self, message: Message, root_path: str = '') -> List[str]:
+        """Save the attachments of a mail that match the plan; returns the files written."""
+        saved = []
+        for part in message.walk():
+            filename = part.get_filename()
+            path = self.attachment_path(filename, root_path) if filename else None
+            if path is None:
+                continue
+            with open(path, 'wb') as f:
+                f.write(part.get_payload(decode=True))
+            logger.info(f"{self.code} - {filename} downloaded to {path}")
+            saved.append(path)
+        return saved
+
+    def download(self, mail, root_path: str = '') -> Tuple[List[str], Optional[datetime]]:
+        """
+        Save the supplier's attachments from its newest mail.
+
+        With search_backwards, older mails are tried in turn until one has a matching attachment.
+
+        Args:
+            mail: Authenticated imaplib connection
+            root_path: Root of inv_data/
+
+        Returns:
+            Tuple of the files saved and the date the mail they came from was received
+            (empty and None if no mail matched)
+        """
+        mail.select(self.mail_folder)
+        status, messages = mail.search(None, self.mail_search)
+        if status != 'OK':
+            logger.warning(f"{self.code}: mail search failed ({status})")
+            return [], None
+
+        message_ids = messages[0].split()
+        for message_id in reversed(message_ids if self.search_backwards else message_ids[-1:]):
+            _, data = mail.fetch(message_id, '(RFC822)')
+            message = message_from_bytes(data[0][1])
+            saved = self.save_attachments(message, root_path)
+            if saved:
+                return saved, parsedate_to_datetime(message.get('Date'))
+
+        logger.warning(f"{self.code}: no attachment matched in {len(message_ids)} mail(s)")
+        return [], None
+
+    def _read_file(self, file_path: str) -> pd.DataFrame:
+        if self.header_names:
+            # Files whose header row differs between exports are renamed positionally
+            raw = pd.read_excel(file_path, **self.read_options) if self.file_format == 'excel' \
+                else pd.read_csv(file_path, engine='python', on_bad_lines='warn', **self.read_options)
+            raw.columns = list(self.header_names)
+            return raw[list(self.source_columns)]
+
+        try:
+            if self.file_format == 'excel':
+                return pd.read_excel(file_path, usecols=list(self.source_columns), **self.read_options)
+            return pd.read_csv(file_path, engine='python', on_bad_lines='warn',
+                               usecols=list(self.source_columns), **self.read_options)
+        except ValueError as e:
+            raise ValueError(f"{self.code} file {file_path} does not have columns {list(self.source_columns)}: {e}")
+
+    def read(self, file_paths: List[str]) -> pd.DataFrame:
+        """Read the mapped columns of every file into one frame."""
+        frames = [self._read_file(file_path) for file_path in file_paths]
+        raw = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+        logger.info(f"Loaded {len(raw)} rows for {self.code} from {len(frames)} file(s)")
+        return raw
+
+    def transform(self, raw: pd.DataFrame, column_names: List[str] = STANDARD_COLUMNS) -> pd.DataFrame:
+        """
+        Standardize raw supplier rows.
+
+        Args:
+            raw: Frame with the source columns
+            column_names: Output names for company, UPC, inventory, description and extended description
+
+        Returns:
+            Standardized frame without rows missing a UPC or an inventory value
+        """
+        company_col, upc_col, inv_col, desc_col, ext_col = column_names
+        upc, inventory, description, extended = (raw[column] for column in self.source_columns)
+
+        if self.upc_type == 'int64':
+            # non-numeric barcodes become NA and are dropped with the other incomplete rows
+            upc = pd.to_numeric(upc, errors='coerce')
+        if self.inventory_mapping:
+            inventory = inventory.replace(self.inventory_mapping).infer_objects()
+
+        data = pd.DataFrame({company_col: self.code, upc_col: upc, inv_col: inventory,
+                             desc_col: description, ext_col: extended}).dropna(subset=[upc_col, inv_col])
+
+        if self.upc_type == 'int64':
+            data[upc_col] = data[upc_col].astype('int64')
+        if self.inventory_type == 'int' or self.min_inventory_threshold is not None:
+            data[inv_col] = data[inv_col].astype('int')
+        if self.min_inventory_threshold is not None:
+            data[inv_col] = data[inv_col].where(data[inv_col] >= self.min_inventory_threshold, 0)
+
+        return data.reset_index(drop=True)
+
+    def execute(self, root_path: str = '', file_paths: Optional[List[str]] = None,
+                column_names: List[str] = STANDARD_COLUMNS) -> pd.DataFrame:
+        """
+        Read and standardize the supplier's inventory.
+
+        Args:
+            root_path: Root of inv_data/
+            file_paths: Files to read instead of the configured file_names
+            column_names: Output column names, STANDARD_COLUMNS by default
+
+        Returns:
+            Standardized inventory frame
+        """
+        data = self.transform(self.read(file_paths or self.file_paths(root_path)), column_names)
+        logger.info(f"Processed {self.code} inventory: {len(data)} records")
+        return data
+
+
+def validate_supplier_rules(code: str, file_format: str, column_mapping: Dict[str, str],
+                            processing_rules: Dict[str, Any]) -> List[str]:
+    """
+    Check a supplier configuration before it is compiled.
+
+    Returns:
+        List of problems, empty if the configuration compiles
+    """
+    errors = []
+    missing = [key for key in MAPPING_KEYS if not column_mapping.get(key)]
+    if missing:
+        errors.append(f"{code}: column_mapping is missing {missing}")
+    if file_format not in FILE_FORMATS:
+        errors.append(f"{code}: unsupported file format '{file_format}'")
+
+    file_names = processing_rules.get('file_names') or []
+    if not file_names:
+        errors.append(f"{code}: processing_rules.file_names is empty")
+    elif len(file_names) > 1 and not processing_rules.get('concat_files'):
+        errors.append(f"{code}: several file_names need concat_files")
+
+    if processing_rules.get('inventory_type') not in INVENTORY_TYPES:
+        errors.append(f"{code}: unsupported inventory_type '{processing_rules.get('inventory_type')}'")
+    if processing_rules.get('upc_type') not in UPC_TYPES:
+        errors.append(f"{code}: unsupported upc_type '{processing_rules.get('upc_type')}'")
+
+    threshold = processing_rules.get('min_inventory_threshold')
+    if threshold is not None and (not isinstance(threshold, int) or threshold < 0):
+        errors.append(f"{code}: min_inventory_threshold must be a non-negative integer")
+
+    mapping = processing_rules.get('inventory_mapping') or {}
+    if any(not isinstance(value, (int, float)) for value in mapping.values()):
+        errors.append(f"{code}: inventory_mapping values must be numbers")
+
+    attachments = processing_rules.get('attachments') or []
+    if not attachments:
+        errors.append(f"{code}: processing_rules.attachments is empty")
+    elif any(len(attachment) != 2 for attachment in attachments):
+        errors.append(f"{code}: attachments must be [pattern, file name] pairs")
+    else:
+        unsaved = [name for name in file_names if name not in [file_name for _, file_name in attachments]]
+        if unsaved:
+            errors.append(f"{code}: no attachment is saved to {unsaved}")
+
+    header_names = processing_rules.get('header_names')
+    if header_names and not missing:
+        unknown = [column_mapping[key] for key in MAPPING_KEYS if column_mapping[key] not in header_names]
+        if unknown:
+            errors.append(f"{code}: mapped columns {unknown} are not in header_names")
+
+    return errors
+
+
+def compile_supplier_plan(code: str, file_format: str, column_mapping: Dict[str, str],
+                          processing_rules: Dict[str, Any], dtypes: Optional[Dict[str, Any]] = None,
+                          encoding: str = 'utf-8', email_subject: str = '',
+                          email_from: Optional[str] = None) -> SupplierPlan:
+    """
+    Compile a supplier configuration into a SupplierPlan.
+
+    The mail is searched by subject, and by sender too unless processing_rules sets
+    mail_search_from to False.
+
+    Raises:
+        ValueError: The configuration does not validate; all problems are listed
+    """
+    errors = validate_supplier_rules(code, file_format, column_mapping, processing_rules)
+    if errors:
+        raise ValueError('; '.join(errors))
+
+    read_options = {}
+    if dtypes:
+        read_options['dtype'] = dict(dtypes)
+    if processing_rules.get('skiprows') is not None:
+        read_options['skiprows'] = processing_rules['skiprows']
+    if file_format == 'csv':
+        read_options['sep'] = processing_rules.get('csv_separator', ',')
+        read_options['encoding'] = encoding
+        read_options['skipfooter'] = processing_rules.get('skipfooter', 0)
+
+    mail_search = f'SUBJECT {email_subject}'
+    if email_from and processing_rules.get('mail_search_from', True):
+        mail_search += f' FROM {email_from}'
+
+    header_names = processing_rules.get('header_names')
+    return SupplierPlan(
+        code=code,
+        file_format=file_format,
+        file_names=tuple(processing_rules['file_names']),
+        source_columns=tuple(column_mapping[key] for key in MAPPING_KEYS),
+        read_options=read_options,
+        header_names=tuple(header_names) if header_names else None,
+        inventory_mapping=processing_rules.get('inventory_mapping'),
+        inventory_type=processing_rules.get('inventory_type'),
+        upc_type=processing_rules.get('upc_type'),
+        min_inventory_threshold=processing_rules.get('min_inventory_threshold'),
+        mail_folder=processing_rules.get('email_folder', DEFAULT_MAIL_FOLDER),
+        mail_search=mail_search,
+        attachments=tuple(tuple(attachment) for attachment in processing_rules['attachments']),
+        search_backwards=processing_rules.get('email_search_backwards', False),
+        record_received=processing_rules.get('record_received', True)
+    )
@@ -3,11 +3,29 @@ Amazon Orders page - Order analysis and inventory planning interface.
 """
 
 import streamlit as st
+from services.amazon_service import AmazonService
+from utils.helpers import handle_error
 
 def show_amazon_orders():
     """Display the Amazon order analysis interface."""
     st.title("📋 Amazon Order Analysis")
-    st.write("Amazon order analysis functionality will be implemented in later tasks.")
-    
-    # Placeholder for future implementation
-    st.info("🚧 Amazon order analysis functionality will be implemented in task 7.1")
\ No newline at end of file
+
+    st.subheader("Unshipped Orders")
+    if not st.button("Load unshipped orders"):
+        return
+
+    status_container = st.empty()
+    table = st.empty()
+    status_container.info("🔄 Loading unshipped orders...")
+
+    try:
+        # Rows are shown as soon as each chunk of order items arrives
+        order_data = None
+        for order_data in AmazonService().iter_unshipped_orders():
+            table.dataframe(order_data, use_container_width=True)
+            status_container.info(f"🔄 Loaded {len(order_data)} order items...")
+    except Exception as e:
+        handle_error(e, "Amazon unshipped orders")
+        return
+
+    status_container.success(f"✅ {0 if order_data is None else len(order_data)} unshipped order items")
@@ -3,11 +3,48 @@ Dashboard page - System status overview and quick actions.
 """
 
 import streamlit as st
+from services.metrics_service import load_run_manifests, StageMetrics
+
+METRIC_COLUMNS = list(StageMetrics.__dataclass_fields__)
 
 def show_dashboard():
     """Display the main dashboard with system status and quick actions."""
     st.title("📊 Dashboard")
-    st.write("System overview and quick actions will be implemented in later tasks.")
-    
-    # Placeholder for future implementation
-    st.info("🚧 Dashboard functionality will be implemented in task 5.2")
\ No newline at end of file
+    show_update_runs()
+
+def show_update_runs(root_path: str = ''):
+    """Time, memory, I/O and rows of recent inventory updates (desktop and Streamlit) by stage."""
+    st.subheader("Inventory update runs")
+
+    runs = load_run_manifests(root_path)
+    if runs.empty:
+        st.info("No inventory update has been recorded yet.")
+        return
+
+    # steps measured inside a stage (supplier parse) are already part of the stage time
+    stages = runs[runs['parent'].isna()]
+    summary = stages.groupby('run_id', sort=False).agg(
+        started=('started', 'first'), source=('source', 'first'), status=('run_status', 'first'),
+        wall_s=('wall_s', 'sum'), cpu_s=('cpu_s', 'sum'),
+        ran=('status', lambda status: int((status == 'ran').sum())),
+        reused=('status', lambda status: int((status == 'cached').sum()))
+    ).reset_index()
+    st.dataframe(summary, use_container_width=True, hide_index=True)
+
+    run_id = st.selectbox(
+        "Run",
+        options=list(summary['run_id']),
+        format_func=lambda run_id: f"{run_id} ({summary.loc[summary['run_id'] == run_id, 'status'].iloc[0]})"
+    )
+    run = runs[runs['run_id'] == run_id]
+    measured = run[run['status'].isin(['ran', 'failed'])]
+    if not measured.empty:
+        st.bar_chart(measured.set_index('stage')['wall_s'])
+    st.dataframe(run[METRIC_COLUMNS], use_container_width=True, hide_index=True)
+
+    st.subheader("Stage time across runs")
+    trend = runs[runs['status'] == 'ran'].pivot_table(index='started', columns='stage', values='wall_s', aggfunc='sum')
+    slowest = list(trend.mean().sort_values(ascending=False).index[:5])
+    selected = st.multiselect("Stages", options=list(trend.columns), default=slowest)
+    if selected:
+        st.line_chart(trend[selected])
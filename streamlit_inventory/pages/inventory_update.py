@@ -3,11 +3,123 @@ Inventory Update page - Supplier inventory processing interface.
 """
 
 import streamlit as st
+from services.inventory_service import InventoryService
+from services.pipeline_service import StageCache
+from models.config import ConfigManager
+from utils.helpers import create_progress_callback, handle_error
 
 def show_inventory_update():
     """Display the inventory update interface."""
     st.title("📦 Inventory Update")
-    st.write("Inventory update functionality will be implemented in later tasks.")
-    
-    # Placeholder for future implementation
-    st.info("🚧 Inventory update functionality will be implemented in task 6.1")
\ No newline at end of file
+
+    # every supplier configured in keyword_mailadd.json
+    suppliers = {code: f"{code} - {config.name}" for code, config in ConfigManager().get_supplier_configs().items()}
+    selected_suppliers = st.multiselect(
+        "Suppliers to update",
+        options=list(suppliers),
+        default=list(suppliers),
+        format_func=suppliers.get
+    )
+    sync_square = st.checkbox(
+        "Push to Square",
+        help="Push store quantities to Square from the same POS snapshot. Only changed counts are sent."
+    )
+
+    update_amazon = st.checkbox(
+        "Update Amazon listings and unshipped orders",
+        help="Unshipped orders are read from Amazon directly; no report download is needed."
+    )
+
+    push_amazon = st.checkbox(
+        "Push quantity changes to Amazon",
+        disabled=not update_amazon,
+        help="Send inventory feeds for the listings whose Amazon quantity differs from the computed inventory."
+    )
+
+    refresh = st.checkbox(
+        "Run all stages again",
+        help="By default a rerun reuses the results of stages whose inputs did not change, "
+             "and POS and Amazon data read in the last 30 minutes."
+    )
+
+    if not st.button("Update", type="primary"):
+        return
+
+    progress_bar = st.progress(0.0)
+    status_container = st.empty()
+
+    try:
+        # stage results are kept in the session so a rerun resumes after a failed stage
+        stage_cache = st.session_state.setdefault('stage_cache', StageCache())
+        result = InventoryService(stage_cache=stage_cache).update_inventory(
+            selected_suppliers,
+            create_progress_callback(progress_bar, status_container),
+            sync_square=sync_square,
+            update_amazon=update_amazon,
+            push_amazon=push_amazon and update_amazon,
+            refresh=refresh
+        )
+    except Exception as e:
+        handle_error(e, "inventory update")
+        return
+
+    status_container.success("✅ Update finished")
+    st.metric("Inventory items", len(result['all_inventory']))
+    if result['pos_data'] is not None:
+        st.metric("POS items", len(result['pos_data']))
+
+    excluded = result['excluded_items']
+    if len(excluded):
+        counts = excluded['rule'].value_counts()
+        with st.expander(f"{counts.get('backorder', 0)} backordered items set to 0, "
+                         f"{counts.get('duplicate', 0)} duplicate items removed"):
+            st.dataframe(excluded, use_container_width=True, hide_index=True)
+
+    stages = result['stages']
+    reused = [name for name, status in stages.items() if status == 'cached']
+    failed = [name for name, status in stages.items() if status in ('failed', 'skipped')]
+    supplier_failed = any(name.startswith('supplier_') and status == 'failed' for name, status in stages.items())
+    if failed:
+        st.warning(f"Stages not completed: {', '.join(failed)}. Run the update again to retry them.")
+    with st.expander(f"Stages ({len(reused)} reused from the previous run)"):
+        # time, memory, I/O and rows per stage; earlier runs are compared on the Dashboard
+        st.dataframe(result['metrics'], use_container_width=True, hide_index=True)
+
+    with st.expander("Inventory memory by stage"):
+        st.dataframe(result['memory'], use_container_width=True, hide_index=True)
+
+    if sync_square:
+        summary = result['square']
+        if summary is None and supplier_failed:
+            st.warning("Square not updated: a selected supplier failed.")
+        elif summary is None:
+            st.error(f"❌ Square sync failed: {result['errors'].get('square', 'check the logs for details')}")
+        else:
+            st.write(f"Square: {summary['changed']} of {summary['total']} counts pushed "
+                     f"in {summary['batches']} batches")
+            for error in summary['errors']:
+                st.error(error)
+
+    if update_amazon:
+        if result['amazon_orders'] is None:
+            st.error("❌ Amazon update failed. Check the logs for details.")
+        else:
+            duplicates = result['duplicate_upcs']
+            if len(duplicates):
+                with st.expander(f"⚠️ {len(duplicates)} duplicate UPCs with conflicting quantities"):
+                    st.dataframe(duplicates, use_container_width=True)
+
+            if push_amazon:
+                feed = result['amazon_feed']
+                if feed is None and supplier_failed:
+                    st.warning("Amazon quantities not sent: a selected supplier failed.")
+                elif feed is None:
+                    st.error(f"❌ Amazon quantity feed failed: {result['errors'].get('amazon_feed', 'check the logs for details')}")
+                else:
+                    st.write(f"Amazon: {feed['changed']} of {feed['total']} quantities sent "
+                             f"in {feed['feeds']} feeds")
+                    for error in feed['errors']:
+                        st.error(error)
+
+            st.subheader("Amazon Unshipped Orders")
+            st.dataframe(result['amazon_orders'], use_container_width=True)
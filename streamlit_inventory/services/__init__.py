@@ -6,11 +6,21 @@ Contains all business logic services extracted from the original desktop applica
 from .database_service import DatabaseService
 from .email_service import EmailService
 from .amazon_service import AmazonService
+from .amazon_feed_service import AmazonFeedService
+from .allocation_service import AllocationService
+from .exclusion_service import ExclusionService
 from .data_service import DataService
+from .square_service import SquareService
+from .inventory_service import InventoryService
 
 __all__ = [
     'DatabaseService',
     'EmailService', 
     'AmazonService',
-    'DataService'
+    'AmazonFeedService',
+    'AllocationService',
+    'ExclusionService',
+    'DataService',
+    'SquareService',
+    'InventoryService'
 ]
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""
+Inventory allocation service for Amazon listings.
+Replaces the merge-and-assign logic of invUpdateWindow.py update_amazon() and
+DataService.process_amazon_listings() with lookups through deduplicated UPC indexes.
+"""
+
+import logging
+from typing import List, Optional, Tuple
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class AllocationService:
+    """Service computing inv_comp, inv_store and inv_Sum per listing."""
+
+    POLICIES = ('max', 'sum', 'prefer')
+    DIAGNOSTIC_COLUMNS = ['source', 'UPC', 'count', 'quantities', 'suppliers', 'resolved']
+
+    def __init__(self, policy: str = 'max', preferred_suppliers: Optional[List[str]] = None):
+        """
+        Initialize allocation service.
+
+        Args:
+            policy: How duplicate UPCs are resolved: 'max' takes the largest quantity,
+                'sum' adds them up, 'prefer' takes the first supplier in preferred_suppliers
+                (largest quantity among suppliers not in the list)
+            preferred_suppliers: Supplier codes (COMPAY) in order of preference, required for 'prefer'
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown allocation policy: {policy}")
+        if policy == 'prefer' and not preferred_suppliers:
+            raise ValueError("The 'prefer' allocation policy needs preferred_suppliers")
+        self.policy = policy
+        self.preferred_suppliers = preferred_suppliers or []
+
+    def company_index(self, all_inventory: pd.DataFrame) -> Tuple[pd.Series, pd.DataFrame]:
+        """
+        Company inventory per UPC with duplicates resolved.
+
+        Returns:
+            Tuple of quantities indexed by UPC string and the duplicate diagnostics
+        """
+        data = pd.DataFrame({
+            'UPC': all_inventory['UPC'].astype(str),
+            'quantity': pd.to_numeric(all_inventory['company Inventory'], errors='coerce').fillna(0),
+            'supplier': all_inventory['COMPAY'].astype(str)
+        })
+        if self.policy == 'prefer':
+            rank = {supplier: i for i, supplier in enumerate(self.preferred_suppliers)}
+            data['rank'] = data['supplier'].map(rank).fillna(len(rank))
+            data = data.sort_values(['rank', 'quantity'], ascending=[True, False], kind='stable')
+            resolved = data.drop_duplicates('UPC').set_index('UPC')['quantity']
+        else:
+            resolved = data.groupby('UPC', sort=False)['quantity'].agg(self.policy)
+
+        return resolved, self._diagnostics('company', data, resolved)
+
+    def store_index(self, pos_data: pd.DataFrame) -> Tuple[pd.Series, pd.DataFrame]:
+        """
+        Store quantity (FIN QTY) per Item Lookup Code with duplicates resolved.
+        POS duplicates are join artifacts of one item record, so they always resolve to the
+        largest quantity whatever the policy.
+
+        Returns:
+            Tuple of quantities indexed by UPC string and the duplicate diagnostics
+        """
+        data = pd.DataFrame({
+            'UPC': pos_data['Item Lookup Code'].astype(str),
+            'quantity': pd.to_numeric(pos_data['FIN QTY'], errors='coerce').fillna(0),
+            'supplier': ''
+        })
+        resolved = data.groupby('UPC', sort=False)['quantity'].max()
+        return resolved, self._diagnostics('store', data, resolved)
+
+    def _diagnostics(self, source: str, data: pd.DataFrame, resolved: pd.Series) -> pd.DataFrame:
+        """Duplicate UPCs whose quantities disagree, with the quantity that was used."""
+        duplicated = data[data['UPC'].duplicated(keep=False)]
+        if duplicated.empty:
+            return pd.DataFrame(columns=self.DIAGNOSTIC_COLUMNS)
+
+        groups = duplicated.groupby('UPC', sort=True)
+        diagnostics = pd.DataFrame({
+            'count': groups.size(),
+            'distinct': groups['quantity'].nunique(),
+            'quantities': groups['quantity'].agg(list),
+            'suppliers': groups['supplier'].agg(lambda s: [v for v in s if v])
+        })
+        diagnostics = diagnostics[diagnostics['distinct'] > 1].drop(columns='distinct')
+        diagnostics['resolved'] = resolved.reindex(diagnostics.index)
+        diagnostics.insert(0, 'source', source)
+        return diagnostics.reset_index()[self.DIAGNOSTIC_COLUMNS]
+
+    def allocate(self, listings: pd.DataFrame, all_inventory: pd.DataFrame,
+                 pos_data: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Compute inv_comp, inv_store and inv_Sum for every listing.
+
+        Quantities are looked up by product-id in UPC indexes that hold one row per UPC,
+        so listings are never duplicated or misaligned by duplicate UPCs.
+
+        Args:
+            listings: Amazon listings with a product-id column (returned as str)
+            all_inventory: Supplier inventory (all_upc_inv)
+            pos_data: POS snapshot (fromPOS) with FIN QTY
+
+        Returns:
+            Tuple of listings with the inventory columns and the duplicate UPC diagnostics
+        """
+        company, company_duplicates = self.company_index(all_inventory)
+        store, store_duplicates = self.store_index(pos_data)
+
+        product_id = listings['product-id'].astype(str)
+        inv_comp = product_id.map(company).fillna(0).astype(int)
+        inv_store = product_id.map(store).fillna(0).astype(int)
+
+        listings = listings.copy()
+        listings['product-id'] = product_id
+        listings['inv_Sum'] = inv_store + inv_comp
+        listings['inv_comp'] = inv_comp
+        listings['inv_store'] = inv_store
+
+        diagnostics = pd.concat([company_duplicates, store_duplicates], ignore_index=True)
+        if len(diagnostics):
+            logger.warning(f"{len(diagnostics)} duplicate UPCs with conflicting quantities "
+                           f"(resolved with '{self.policy}')")
+        return listings, diagnostics
@@ -0,0 +1,186 @@
+"""
+Amazon listing quantity feeds.
+Turns the inv_Sum computed per listing into inventory feeds that only carry the SKUs
+whose Amazon quantity has to change, instead of uploading the All_Amazon sheet by hand.
+"""
+
+import io
+import json
+import logging
+from typing import Dict, List, Optional, Any
+import pandas as pd
+from sp_api.api import Feeds
+
+from .amazon_service import AmazonService
+
+logger = logging.getLogger(__name__)
+
+
+class AmazonFeedService:
+    """Service building and submitting delta quantity feeds for merchant-fulfilled listings."""
+
+    JSON_FEED_TYPE = 'JSON_LISTINGS_FEED'
+    FLAT_FEED_TYPE = 'POST_FLAT_FILE_INVLOADER_DATA'
+    FEED_FORMATS = ('json', 'flat')
+
+    # JSON_LISTINGS_FEED accepts up to 10,000 messages; documents are kept under 10 MB
+    FEED_MAX_MESSAGES = 10000
+    FEED_MAX_BYTES = 10 * 1024 * 1024
+
+    MERCHANT_CHANNEL = 'DEFAULT'
+
+    def __init__(self, amazon_service: AmazonService, feed_format: str = 'json',
+                 max_messages: Optional[int] = None):
+        """
+        Initialize feed service.
+
+        Args:
+            amazon_service: Configured AmazonService (credentials, seller_id, endpoint)
+            feed_format: 'json' for JSON_LISTINGS_FEED (needs seller_id in api_keys.json)
+                or 'flat' for the tab-separated inventory loader file
+            max_messages: SKUs per feed, FEED_MAX_MESSAGES by default
+        """
+        if feed_format not in self.FEED_FORMATS:
+            raise ValueError(f"Unknown feed format: {feed_format}")
+        if feed_format == 'json' and not amazon_service.seller_id:
+            raise ValueError("seller_id missing in api_keys.json, required for JSON_LISTINGS_FEED")
+        self.amazon_service = amazon_service
+        self.feed_format = feed_format
+        self.max_messages = min(max_messages or self.FEED_MAX_MESSAGES, self.FEED_MAX_MESSAGES)
+
+    def compute_delta(self, listings: pd.DataFrame) -> pd.DataFrame:
+        """
+        SKUs whose Amazon quantity differs from inv_Sum.
+
+        Only merchant-fulfilled listings are considered; FBA quantities are managed by Amazon.
+        Negative inventory is sent as 0.
+
+        Args:
+            listings: Listings with seller-sku, quantity, fulfillment-channel and inv_Sum
+
+        Returns:
+            DataFrame with sku, current quantity and new quantity
+        """
+        merchant = listings[listings['fulfillment-channel'].fillna(self.MERCHANT_CHANNEL) == self.MERCHANT_CHANNEL]
+        merchant = merchant.drop_duplicates('seller-sku')
+
+        current = pd.to_numeric(merchant['quantity'], errors='coerce')
+        target = pd.to_numeric(merchant['inv_Sum'], errors='coerce').fillna(0).clip(lower=0).astype(int)
+        changed = current.isna() | (current != target)
+
+        delta = pd.DataFrame({
+            'sku': merchant['seller-sku'].astype(str),
+            'current': current.astype('Int64'),
+            'quantity': target
+        })[changed.to_numpy()].reset_index(drop=True)
+
+        logger.info(f"{len(delta)} of {len(merchant)} merchant listings need a quantity update")
+        return delta
+
+    def _json_message(self, message_id: int, sku: str, quantity: int) -> Dict[str, Any]:
+        return {
+            'messageId': message_id,
+            'sku': sku,
+            'operationType': 'PATCH',
+            'productType': 'PRODUCT',
+            'patches': [{
+                'op': 'replace',
+                'path': '/attributes/fulfillment_availability',
+                'value': [{'fulfillment_channel_code': self.MERCHANT_CHANNEL, 'quantity': quantity}]
+            }]
+        }
+
+    def _json_document(self, messages: List[bytes]) -> bytes:
+        header = json.dumps({'sellerId': self.amazon_service.seller_id, 'version': '2.0', 'issueLocale': 'en_US'})
+        return b'{"header":' + header.encode() + b',"messages":[' + b','.join(messages) + b']}'
+
+    def build_feeds(self, delta: pd.DataFrame) -> List[bytes]:
+        """
+        Feed documents for a delta, chunked to FEED_MAX_MESSAGES and FEED_MAX_BYTES.
+
+        Returns:
+            Encoded feed documents ready for upload
+        """
+        if self.feed_format == 'json':
+            encode = lambda message_id, sku, quantity: json.dumps(self._json_message(message_id, sku, quantity)).encode()
+            wrap = self._json_document
+        else:
+            encode = lambda message_id, sku, quantity: f'{sku}\t{quantity}'.encode('iso-8859-1', errors='replace')
+            wrap = lambda lines: b'\n'.join([b'sku\tquantity'] + lines) + b'\n'
+
+        # messages are numbered per document; +1 per message for the separator
+        feeds, chunk, size = [], [], len(wrap([]))
+        for sku, quantity in zip(delta['sku'], delta['quantity']):
+            message = encode(len(chunk) + 1, sku, int(quantity))
+            if chunk and (len(chunk) >= self.max_messages or size + len(message) + 1 > self.FEED_MAX_BYTES):
+                feeds.append(wrap(chunk))
+                chunk, size = [], len(wrap([]))
+                message = encode(1, sku, int(quantity))
+            chunk.append(message)
+            size += len(message) + 1
+        if chunk:
+            feeds.append(wrap(chunk))
+        return feeds
+
+    @property
+    def feed_type(self) -> str:
+        return self.JSON_FEED_TYPE if self.feed_format == 'json' else self.FLAT_FEED_TYPE
+
+    @property
+    def content_type(self) -> str:
+        if self.feed_format == 'json':
+            return 'application/json; charset=UTF-8'
+        return 'text/tab-separated-values; charset=iso-8859-1'
+
+    def submit_feed(self, document: bytes) -> str:
+        """
+        Upload one feed document and create the feed.
+
+        Returns:
+            feedId
+        """
+        limiter = self.amazon_service._rate_limiter
+        feeds_api = self.amazon_service._client(Feeds)
+        document_response = limiter.call('createFeedDocument', feeds_api.create_feed_document,
+                                         io.BytesIO(document), self.content_type)
+        feed_response = limiter.call('createFeed', feeds_api.create_feed, self.feed_type,
+                                     document_response.payload['feedDocumentId'],
+                                     marketplaceIds=AmazonService.MARKETPLACE_IDS)
+        return feed_response.payload['feedId']
+
+    def get_feed_status(self, feed_id: str) -> Optional[Dict[str, Any]]:
+        """Feed details (processingStatus, resultFeedDocumentId), None on failure."""
+        try:
+            feeds_api = self.amazon_service._client(Feeds)
+            return self.amazon_service._rate_limiter.call('getFeed', feeds_api.get_feed, feed_id).payload
+        except Exception as e:
+            logger.error(f"Error getting feed status for {feed_id}: {e}")
+            return None
+
+    def push_quantities(self, listings: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Submit feeds for every listing whose quantity must change.
+
+        Args:
+            listings: Listings with inv_Sum (AllocationService.allocate)
+
+        Returns:
+            Summary with total, changed, feeds, feed_ids, failed_feeds and errors
+        """
+        delta = self.compute_delta(listings)
+        summary = {'total': int((listings['fulfillment-channel'].fillna(self.MERCHANT_CHANNEL)
+                                 == self.MERCHANT_CHANNEL).sum()),
+                   'changed': len(delta), 'feeds': 0, 'feed_ids': [], 'failed_feeds': 0, 'errors': []}
+
+        for document in self.build_feeds(delta):
+            summary['feeds'] += 1
+            try:
+                feed_id = self.submit_feed(document)
+                summary['feed_ids'].append(feed_id)
+                logger.info(f"Submitted {self.feed_type} feed {feed_id} ({len(document)} bytes)")
+            except Exception as e:
+                summary['failed_feeds'] += 1
+                summary['errors'].append(f"Feed {summary['feeds']}: {e}")
+                logger.error(f"Error submitting {self.feed_type} feed: {e}")
+
+        return summary
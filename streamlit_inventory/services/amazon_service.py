@@ -3,16 +3,24 @@ Amazon API service for handling SP-API operations and report generation.
 Extracted from invUpdateWindow.py Worker class and amazonOrderWindow.py.
 """
 
+import io
+import gzip
 import json
+import codecs
+import random
 import datetime
 import logging
-from typing import Dict, List, Optional, Any
-from time import sleep
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Iterator
+from time import sleep, monotonic
 import pandas as pd
+import requests
 from sp_api.api import Reports, Orders
 from sp_api.base.reportTypes import ReportType
+from sp_api.base.exceptions import SellingApiRequestThrottledException
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +32,10 @@ class AmazonService:
         self.root_path = root_path
         self._load_config()
         self._rate_limiter = RateLimiter()
+        self._local = threading.local()
+        self._order_items_path = Path(f'{root_path}appdata/amazon_order_items.json')
+        self._order_items_cache = None
+        self._order_items_lock = threading.Lock()
     
     def _load_config(self):
         """Load Amazon API configuration from JSON file."""
@@ -32,6 +44,9 @@ class AmazonService:
                 config = json.load(f)
                 self.credentials = config['credentials']
                 self.refresh_token = config['refresh_token']
+                # Optional: seller_id for JSON_LISTINGS_FEED, endpoint for a local SP-API stand-in
+                self.seller_id = config.get('seller_id')
+                self.endpoint = config.get('endpoint')
         except FileNotFoundError:
             logger.error(f"Amazon API config file not found: {self.root_path}appdata/api_keys.json")
             raise
@@ -39,12 +54,26 @@ class AmazonService:
             logger.error(f"Missing Amazon API config key: {e}")
             raise
     
+    def _client(self, api_class):
+        """
+        SP-API client of api_class (Reports, Orders, Feeds, ...) for the configured account.
+        With an 'endpoint' in api_keys.json the client talks to that URL with a static token
+        instead of Amazon, see dev/sp_api_standin.py.
+        """
+        if not self.endpoint:
+            return api_class(credentials=self.credentials, refresh_token=self.refresh_token)
+        client = api_class(credentials=self.credentials, refresh_token=self.refresh_token,
+                           restricted_data_token='standin')
+        client.endpoint = self.endpoint.rstrip('/')
+        return client
+
     def test_connection(self) -> bool:
         """Test Amazon SP-API connection."""
         try:
-            reports_api = Reports(credentials=self.credentials, refresh_token=self.refresh_token)
+            reports_api = self._client(Reports)
             # Try to get a simple report to test connection
-            response = reports_api.get_reports(reportTypes=[ReportType.GET_MERCHANT_LISTINGS_ALL_DATA])
+            response = self._rate_limiter.call('getReports', reports_api.get_reports,
+                                               reportTypes=[ReportType.GET_MERCHANT_LISTINGS_ALL_DATA])
             return True
         except Exception as e:
             logger.error(f"Amazon API connection test failed: {e}")
@@ -56,17 +85,17 @@ class AmazonService:
         Extracted from invUpdateWindow.py Worker.run() method.
         """
         try:
-            with self._rate_limiter:
-                reports_api = Reports(credentials=self.credentials, refresh_token=self.refresh_token)
-                response = reports_api.create_report(reportType=ReportType.GET_MERCHANT_LISTINGS_ALL_DATA)
-                
-                if response and hasattr(response, 'payload') and 'reportId' in response.payload:
-                    report_id = response.payload['reportId']
-                    logger.info(f"Created Amazon inventory report: {report_id}")
-                    return report_id
-                else:
-                    logger.error("Failed to create Amazon inventory report")
-                    return None
+            reports_api = self._client(Reports)
+            response = self._rate_limiter.call('createReport', reports_api.create_report,
+                                               reportType=ReportType.GET_MERCHANT_LISTINGS_ALL_DATA)
+
+            if response and hasattr(response, 'payload') and 'reportId' in response.payload:
+                report_id = response.payload['reportId']
+                logger.info(f"Created Amazon inventory report: {report_id}")
+                return report_id
+            else:
+                logger.error("Failed to create Amazon inventory report")
+                return None
                     
         except Exception as e:
             logger.error(f"Error creating Amazon inventory report: {e}")
@@ -75,13 +104,12 @@ class AmazonService:
     def get_report_status(self, report_id: str) -> Optional[Dict[str, Any]]:
         """Get the status of a report."""
         try:
-            with self._rate_limiter:
-                reports_api = Reports(credentials=self.credentials, refresh_token=self.refresh_token)
-                response = reports_api.get_report(report_id)
-                
-                if response and hasattr(response, 'payload'):
-                    return response.payload
-                return None
+            reports_api = self._client(Reports)
+            response = self._rate_limiter.call('getReport', reports_api.get_report, report_id)
+
+            if response and hasattr(response, 'payload'):
+                return response.payload
+            return None
                 
         except Exception as e:
             logger.error(f"Error getting report status for {report_id}: {e}")
@@ -113,40 +141,187 @@ class AmazonService:
         logger.error(f"Report {report_id} did not complete within {max_wait_time} seconds")
         return None
     
+    LISTINGS_REPORT_MAX_AGE = datetime.timedelta(hours=2)
+
+    def find_recent_report(self, report_type=ReportType.GET_MERCHANT_LISTINGS_ALL_DATA,
+                           max_age: Optional[datetime.timedelta] = None) -> Optional[str]:
+        """
+        Find a report of this type that Amazon already finished recently.
+
+        Args:
+            report_type: Report type to look for
+            max_age: Oldest report creation time to accept, LISTINGS_REPORT_MAX_AGE by default
+
+        Returns:
+            reportDocumentId of the newest DONE report, None if there is none
+        """
+        max_age = self.LISTINGS_REPORT_MAX_AGE if max_age is None else max_age
+        try:
+            reports_api = self._client(Reports)
+            response = self._rate_limiter.call(
+                'getReports', reports_api.get_reports,
+                reportTypes=[report_type], processingStatuses=['DONE'],
+                createdSince=_iso(datetime.datetime.now(datetime.timezone.utc) - max_age)
+            )
+            reports = [r for r in response.payload.get('reports', []) if r.get('reportDocumentId')]
+            if not reports:
+                return None
+
+            newest = max(reports, key=lambda r: r.get('createdTime', ''))
+            logger.info(f"Reusing report {newest['reportId']} created at {newest.get('createdTime')}")
+            return newest['reportDocumentId']
+
+        except Exception as e:
+            logger.error(f"Error looking up recent reports: {e}")
+            return None
+
+    def _document_marker_path(self, file_path: str) -> Path:
+        """Sidecar recording which reportDocumentId a downloaded report file holds."""
+        return Path(f'{file_path}.document.json')
+
+    def _holds_document(self, file_path: str, document_id: str) -> bool:
+        """True if file_path was written from this report document."""
+        marker = self._document_marker_path(file_path)
+        try:
+            if Path(file_path).exists() and marker.exists():
+                with open(marker) as f:
+                    return json.load(f).get('reportDocumentId') == document_id
+        except (OSError, json.JSONDecodeError):
+            pass
+        return False
+
+    def _mark_document(self, file_path: str, document_id: str):
+        with open(self._document_marker_path(file_path), 'w') as f:
+            json.dump({'reportDocumentId': document_id, 'downloaded': datetime.datetime.now().isoformat()}, f)
+
+    # Columns of GET_MERCHANT_LISTINGS_ALL_DATA used by the inventory update, with their types
+    LISTINGS_DTYPES = {
+        'seller-sku': str, 'asin1': str, 'item-name': str, 'item-description': str, 'listing-id': str,
+        'price': 'float64', 'quantity': 'Int32', 'open-date': str, 'product-id-type': str, 'item-note': str,
+        'item-condition': str, 'will-ship-internationally': str, 'expedited-shipping': str,
+        'product-id': str, 'pending-quantity': 'Int32', 'fulfillment-channel': str, 'status': str
+    }
+
+    def read_listings_document(self, document_id: str, cache_path: Optional[str] = None) -> pd.DataFrame:
+        """
+        Stream a listings report document straight into a typed DataFrame.
+
+        The document is decompressed (GZIP) and decoded while it downloads, only the
+        LISTINGS_DTYPES columns are parsed, and the result is cached as Feather keyed by the
+        reportDocumentId, so the same document is never downloaded or parsed twice.
+
+        Args:
+            document_id: reportDocumentId of a GET_MERCHANT_LISTINGS_ALL_DATA report
+            cache_path: Feather cache, inv_data/Amazon_All+Listings+Report.feather by default
+
+        Returns:
+            Listings with the LISTINGS_DTYPES columns
+        """
+        cache_path = cache_path or f'{self.root_path}inv_data/Amazon_All+Listings+Report.feather'
+        if self._holds_document(cache_path, document_id):
+            try:
+                return pd.read_feather(cache_path)
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable listings cache {cache_path}: {e}")
+
+        reports_api = self._client(Reports)
+        document = self._rate_limiter.call('getReportDocument', reports_api.get_report_document, document_id).payload
+
+        with requests.get(document['url'], stream=True, timeout=300) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            stream = response.raw
+            if document.get('compressionAlgorithm') == 'GZIP':
+                stream = gzip.GzipFile(fileobj=stream)
+            stream = io.BufferedReader(stream, buffer_size=1 << 20)
+            encoding = _report_encoding(response.headers.get('Content-Type', ''), stream.peek(1 << 16))
+
+            listings = pd.read_csv(
+                stream, sep='\t', encoding=encoding,
+                usecols=lambda column: column in self.LISTINGS_DTYPES,
+                dtype=self.LISTINGS_DTYPES
+            )
+
+        listings = listings.reindex(columns=list(self.LISTINGS_DTYPES))
+        listings['product-id'] = _normalize_product_id(listings['product-id'])
+        logger.info(f"Parsed {len(listings)} listings from report document {document_id} ({encoding})")
+
+        try:
+            listings.to_feather(cache_path)
+            self._mark_document(cache_path, document_id)
+        except Exception as e:
+            logger.warning(f"Could not write listings cache {cache_path}: {e}")
+        return listings
+
+    def get_listings(self, max_age: Optional[datetime.timedelta] = None) -> Optional[pd.DataFrame]:
+        """
+        Typed listings frame from a recent DONE report, or from a newly created one.
+
+        Returns:
+            Listings with the LISTINGS_DTYPES columns, None on failure
+        """
+        try:
+            document_id = self.find_recent_report(max_age=max_age) if max_age != datetime.timedelta(0) else None
+            if not document_id:
+                report_id = self.create_inventory_report()
+                if not report_id:
+                    return None
+                document_id = self.wait_for_report_completion(report_id)
+                if not document_id:
+                    return None
+            return self.read_listings_document(document_id)
+
+        except Exception as e:
+            logger.error(f"Error getting Amazon listings: {e}")
+            return None
+
     def download_report_document(self, document_id: str, file_path: str) -> bool:
-        """Download report document to file."""
+        """Download report document to file, skipped if the file already holds this document."""
+        if self._holds_document(file_path, document_id):
+            logger.info(f"Report document {document_id} already downloaded to: {file_path}")
+            return True
+
         try:
-            with self._rate_limiter:
-                reports_api = Reports(credentials=self.credentials, refresh_token=self.refresh_token)
-                
-                with open(file_path, "w", encoding='utf-8') as f:
-                    reports_api.get_report_document(document_id, file=f)
-                
-                logger.info(f"Downloaded report document to: {file_path}")
-                return True
+            self._document_marker_path(file_path).unlink(missing_ok=True)
+            reports_api = self._client(Reports)
+
+            with open(file_path, "w", encoding='utf-8') as f:
+                self._rate_limiter.call('getReportDocument', reports_api.get_report_document, document_id, file=f)
+
+            self._mark_document(file_path, document_id)
+
+            logger.info(f"Downloaded report document to: {file_path}")
+            return True
                 
         except Exception as e:
             logger.error(f"Error downloading report document {document_id}: {e}")
             return False
     
-    def generate_and_download_inventory_report(self, output_path: Optional[str] = None) -> Optional[str]:
+    def generate_and_download_inventory_report(self, output_path: Optional[str] = None,
+                                               max_age: Optional[datetime.timedelta] = None) -> Optional[str]:
         """
         Complete workflow to generate and download inventory report.
         Combines the logic from invUpdateWindow.py Worker.run() method.
+
+        A DONE listings report younger than max_age is reused instead of creating a new one.
+        Pass max_age=datetime.timedelta(0) to always create a new report.
         """
         if output_path is None:
             output_path = f"{self.root_path}inv_data/Amazon_All+Listings+Report.txt"
         
         try:
-            # Create report
-            report_id = self.create_inventory_report()
-            if not report_id:
-                return None
-            
-            # Wait for completion
-            document_id = self.wait_for_report_completion(report_id)
+            document_id = self.find_recent_report(max_age=max_age) if max_age != datetime.timedelta(0) else None
+
             if not document_id:
-                return None
+                # Create report
+                report_id = self.create_inventory_report()
+                if not report_id:
+                    return None
+
+                # Wait for completion
+                document_id = self.wait_for_report_completion(report_id)
+                if not document_id:
+                    return None
             
             # Download report
             if self.download_report_document(document_id, output_path):
@@ -158,96 +333,308 @@ class AmazonService:
             logger.error(f"Error in complete inventory report workflow: {e}")
             return None
     
+    MARKETPLACE_IDS = ['ATVPDKIKX0DER']  # US marketplace
+    ORDER_WINDOW_DAYS = 30
+    ORDER_SYNC_OVERLAP = datetime.timedelta(minutes=5)
+
     def get_orders(self, created_after: datetime.datetime, created_before: Optional[datetime.datetime] = None) -> Optional[List[Dict]]:
         """
-        Get Amazon orders for specified date range.
+        Get Amazon orders for specified date range, following NextToken.
         Based on amazonOrderWindow.py functionality.
         """
         try:
-            with self._rate_limiter:
-                orders_api = Orders(credentials=self.credentials, refresh_token=self.refresh_token)
-                
-                # Build parameters
-                params = {
-                    'CreatedAfter': created_after.isoformat(),
-                    'MarketplaceIds': ['ATVPDKIKX0DER']  # US marketplace
-                }
-                
-                if created_before:
-                    params['CreatedBefore'] = created_before.isoformat()
-                
-                response = orders_api.get_orders(**params)
-                
-                if response and hasattr(response, 'payload') and 'Orders' in response.payload:
-                    orders = response.payload['Orders']
-                    logger.info(f"Retrieved {len(orders)} orders")
-                    return orders
-                
-                return []
-                
+            # Build parameters
+            params = {'CreatedAfter': created_after.isoformat()}
+
+            if created_before:
+                params['CreatedBefore'] = created_before.isoformat()
+
+            orders = self._get_all_orders(params)
+            logger.info(f"Retrieved {len(orders)} orders")
+            return orders
+
         except Exception as e:
             logger.error(f"Error getting Amazon orders: {e}")
             return None
-    
+
+    def _get_all_orders(self, params: Dict[str, Any]) -> List[Dict]:
+        """Call getOrders and follow NextToken until the last page."""
+        orders_api = self._orders_api()
+        params = dict(params, MarketplaceIds=self.MARKETPLACE_IDS)
+
+        response = self._rate_limiter.call('getOrders', orders_api.get_orders, **params)
+        orders = list(response.payload.get('Orders', []))
+        while response.next_token:
+            response = self._rate_limiter.call('getOrders', orders_api.get_orders,
+                                               NextToken=response.next_token, MarketplaceIds=self.MARKETPLACE_IDS)
+            orders.extend(response.payload.get('Orders', []))
+        return orders
+
+    def sync_orders(self, days: Optional[int] = None) -> List[Dict]:
+        """
+        Bring the local order cache up to date and return the orders of the last days.
+
+        The first sync pulls every order created in the window. Later syncs only ask for
+        orders updated after the stored LastUpdateDate high-water mark (minus a small
+        overlap) and merge them into appdata/amazon_orders.json.
+
+        Args:
+            days: Window of orders to keep, ORDER_WINDOW_DAYS by default
+
+        Returns:
+            Cached orders created within the window
+        """
+        days = days or self.ORDER_WINDOW_DAYS
+        now = datetime.datetime.now(datetime.timezone.utc)
+        window_start = now - datetime.timedelta(days=days)
+        cache = self._load_order_cache()
+
+        if cache['last_updated_after'] and cache['window_start'] <= _iso(window_start):
+            since = datetime.datetime.fromisoformat(cache['last_updated_after'].replace('Z', '+00:00'))
+            changed = self._get_all_orders({'LastUpdatedAfter': _iso(since - self.ORDER_SYNC_OVERLAP)})
+        else:
+            cache = {'window_start': _iso(window_start), 'last_updated_after': None, 'orders': {}}
+            changed = self._get_all_orders({'CreatedAfter': _iso(window_start)})
+
+        for order in changed:
+            cache['orders'][order['AmazonOrderId']] = order
+        update_dates = [order['LastUpdateDate'] for order in changed if order.get('LastUpdateDate')]
+        if update_dates:
+            cache['last_updated_after'] = max(update_dates + [cache['last_updated_after'] or ''])
+        elif not cache['last_updated_after']:
+            # Nothing in the window yet; LastUpdatedAfter must be at least two minutes in the past
+            cache['last_updated_after'] = _iso(now - datetime.timedelta(minutes=2))
+
+        # Drop orders that fell out of the window
+        cache['orders'] = {k: v for k, v in cache['orders'].items() if v.get('PurchaseDate', '') >= _iso(window_start)}
+        cache['window_start'] = _iso(window_start)
+        self._save_order_cache(cache)
+
+        logger.info(f"Order sync: {len(changed)} changed, {len(cache['orders'])} orders in the last {days} days")
+        return list(cache['orders'].values())
+
+    def _load_order_cache(self) -> Dict[str, Any]:
+        path = Path(f'{self.root_path}appdata/amazon_orders.json')
+        if path.exists():
+            try:
+                with open(path) as f:
+                    return json.load(f)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Ignoring unreadable order cache: {e}")
+        return {'window_start': '', 'last_updated_after': None, 'orders': {}}
+
+    def _save_order_cache(self, cache: Dict[str, Any]):
+        path = Path(f'{self.root_path}appdata/amazon_orders.json')
+        try:
+            tmp_path = path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(cache, f)
+            tmp_path.replace(path)
+        except OSError as e:
+            logger.warning(f"Could not write order cache: {e}")
+
     def get_order_items(self, order_id: str) -> Optional[List[Dict]]:
         """Get items for a specific order."""
         try:
-            with self._rate_limiter:
-                orders_api = Orders(credentials=self.credentials, refresh_token=self.refresh_token)
-                response = orders_api.get_order_items(order_id)
-                
-                if response and hasattr(response, 'payload') and 'OrderItems' in response.payload:
-                    return response.payload['OrderItems']
-                
-                return []
+            orders_api = self._client(Orders)
+            response = self._rate_limiter.call('getOrderItems', orders_api.get_order_items, order_id)
+
+            if response and hasattr(response, 'payload') and 'OrderItems' in response.payload:
+                return response.payload['OrderItems']
+
+            return []
                 
         except Exception as e:
             logger.error(f"Error getting order items for {order_id}: {e}")
             return None
     
+    ORDER_ITEMS_WORKERS = 4
+    ORDER_ITEMS_CACHE_DAYS = 60
+
+    def _orders_api(self) -> Orders:
+        """Orders client of the calling thread; clients are not shared between worker threads."""
+        if not hasattr(self._local, 'orders_api'):
+            self._local.orders_api = self._client(Orders)
+        return self._local.orders_api
+
+    def _load_order_items_cache(self) -> Dict[str, Dict[str, Any]]:
+        """Load cached order items, order_id -> {'fetched', 'items'}."""
+        if self._order_items_cache is None:
+            self._order_items_cache = {}
+            if self._order_items_path.exists():
+                try:
+                    with open(self._order_items_path) as f:
+                        self._order_items_cache = json.load(f)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Ignoring unreadable order items cache: {e}")
+        return self._order_items_cache
+
+    def _save_order_items_cache(self):
+        """Save cached order items, dropping entries older than ORDER_ITEMS_CACHE_DAYS."""
+        cutoff = (datetime.datetime.now() - datetime.timedelta(days=self.ORDER_ITEMS_CACHE_DAYS)).isoformat()
+        with self._order_items_lock:
+            cache = {k: v for k, v in self._load_order_items_cache().items() if v['fetched'] >= cutoff}
+            self._order_items_cache = cache
+            try:
+                tmp_path = self._order_items_path.with_suffix('.tmp')
+                with open(tmp_path, 'w') as f:
+                    json.dump(cache, f)
+                tmp_path.replace(self._order_items_path)
+            except OSError as e:
+                logger.warning(f"Could not write order items cache: {e}")
+
+    def _fetch_order_items(self, order_id: str) -> Optional[List[Dict]]:
+        """Fetch all items of an order on a worker thread, following NextToken."""
+        try:
+            response = self._rate_limiter.call('getOrderItems', self._orders_api().get_order_items, order_id)
+            items = list(response.payload.get('OrderItems', []))
+            while response.next_token:
+                response = self._rate_limiter.call('getOrderItems', self._orders_api().get_order_items,
+                                                   order_id, NextToken=response.next_token)
+                items.extend(response.payload.get('OrderItems', []))
+            return items
+        except Exception as e:
+            logger.error(f"Error getting order items for {order_id}: {e}")
+            return None
+
+    def iter_order_items(self, orders: List[Dict], max_workers: Optional[int] = None) -> Iterator[tuple]:
+        """
+        Fetch items for many orders concurrently.
+
+        Items of orders seen before come from the local cache. The rest are fetched on a
+        thread pool at the getOrderItems rate limit and cached, except for Pending orders
+        whose items are not final yet.
+
+        Args:
+            orders: Order dicts as returned by get_orders
+            max_workers: Number of concurrent getOrderItems calls
+
+        Yields:
+            (order, items) tuples as soon as each order's items are available
+        """
+        with self._order_items_lock:
+            cache = self._load_order_items_cache()
+            cached = [(order, cache[order['AmazonOrderId']]['items']) for order in orders
+                      if order['AmazonOrderId'] in cache]
+        to_fetch = [order for order in orders if order['AmazonOrderId'] not in cache]
+        logger.info(f"Order items: {len(cached)} cached, {len(to_fetch)} to fetch")
+
+        yield from cached
+        if not to_fetch:
+            return
+
+        fetched_any = False
+        with ThreadPoolExecutor(max_workers=max_workers or self.ORDER_ITEMS_WORKERS) as executor:
+            futures = {executor.submit(self._fetch_order_items, order['AmazonOrderId']): order for order in to_fetch}
+            for future in as_completed(futures):
+                order, items = futures[future], future.result()
+                if items is None:
+                    continue
+                if order.get('OrderStatus') != 'Pending':
+                    with self._order_items_lock:
+                        self._load_order_items_cache()[order['AmazonOrderId']] = {
+                            'fetched': datetime.datetime.now().isoformat(), 'items': items
+                        }
+                    fetched_any = True
+                yield order, items
+
+        if fetched_any:
+            self._save_order_items_cache()
+
+    def _unshipped_order_rows(self, order: Dict, items: List[Dict]) -> List[Dict]:
+        """Build unshipped order rows for one order."""
+        return [
+            {
+                'order-id': order['AmazonOrderId'],
+                'order-date': order.get('PurchaseDate', ''),
+                'sku': item.get('SellerSKU', ''),
+                'quantity': self._unshipped_quantity(item),
+                'item-name': item.get('Title', ''),
+                'order-status': order.get('OrderStatus', ''),
+                'ship-service-level': order.get('ShipServiceLevel', ''),
+                'buyer-email': order.get('BuyerInfo', {}).get('BuyerEmail', ''),
+                'ship-address': self._format_shipping_address(order.get('ShippingAddress', {}))
+            }
+            for item in items
+            if self._unshipped_quantity(item) > 0
+        ]
+
+    @staticmethod
+    def _unshipped_quantity(item: Dict) -> int:
+        """Units of an order line still to ship; lines of PartiallyShipped orders exclude the shipped units."""
+        return int(item.get('QuantityOrdered', 0)) - int(item.get('QuantityShipped', 0) or 0)
+
+    # Columns of the Seller Central unshipped orders report used by the inventory update
+    UNSHIPPED_COLUMNS = ['order-id', 'purchase-date', 'sku', 'quantity-purchased', 'ship-service-level', 'product-id']
+    # Order statuses counted as unshipped, by the inventory update and the Amazon Orders page alike
+    UNSHIPPED_STATUSES = ['Unshipped', 'PartiallyShipped']
+
+    def get_unshipped_feed(self) -> pd.DataFrame:
+        """
+        Unshipped order lines in the shape of inv_data/Amazon_unshipped_report.txt.
+        Replaces the manually downloaded report, built from the incremental order cache.
+
+        ship-service-level is the ShipmentServiceLevelCategory (Standard, Expedited, ...) as in
+        the report. product-id is the ASIN; consumers that need the UPC take it from the listings.
+
+        Returns:
+            DataFrame with UNSHIPPED_COLUMNS
+        """
+        orders = [order for order in self.sync_orders() if order.get('OrderStatus') in self.UNSHIPPED_STATUSES]
+
+        rows = [
+            (order['AmazonOrderId'], order.get('PurchaseDate', ''), item.get('SellerSKU', ''),
+             self._unshipped_quantity(item),
+             order.get('ShipmentServiceLevelCategory', ''), item.get('ASIN', ''))
+            for order, items in self.iter_order_items(orders)
+            for item in items
+            if self._unshipped_quantity(item) > 0
+        ]
+        feed = pd.DataFrame.from_records(rows, columns=self.UNSHIPPED_COLUMNS)
+        feed = feed.sort_values('purchase-date', ignore_index=True)
+        logger.info(f"Unshipped feed: {len(feed)} lines from {len(orders)} orders")
+        return feed
+
+    def iter_unshipped_orders(self, chunk_size: int = 20) -> Iterator[pd.DataFrame]:
+        """
+        Get unshipped orders incrementally.
+
+        Yields:
+            The DataFrame of all unshipped order rows collected so far, every chunk_size orders
+        """
+        # Orders from last 30 days, refreshed incrementally
+        orders = self.sync_orders()
+
+        # Filter for unshipped orders
+        unshipped_orders = [
+            order for order in orders
+            if order.get('OrderStatus') in self.UNSHIPPED_STATUSES
+        ]
+
+        rows = []
+        done = 0
+        for order, items in self.iter_order_items(unshipped_orders):
+            rows.extend(self._unshipped_order_rows(order, items))
+            done += 1
+            if done % chunk_size == 0:
+                yield pd.DataFrame(rows)
+        yield pd.DataFrame(rows)
+
     def get_unshipped_orders(self) -> Optional[pd.DataFrame]:
         """
         Get unshipped orders and create DataFrame.
         Based on amazonOrderWindow.py functionality.
         """
         try:
-            # Get orders from last 30 days
-            created_after = datetime.datetime.now() - datetime.timedelta(days=30)
-            orders = self.get_orders(created_after)
-            
-            if not orders:
-                return pd.DataFrame()
-            
-            # Filter for unshipped orders
-            unshipped_orders = [
-                order for order in orders 
-                if order.get('OrderStatus') in ['Pending', 'Unshipped']
-            ]
-            
-            # Convert to DataFrame format similar to existing code
-            order_data = []
-            for order in unshipped_orders:
-                order_items = self.get_order_items(order['AmazonOrderId'])
-                if order_items:
-                    for item in order_items:
-                        order_data.append({
-                            'order-id': order['AmazonOrderId'],
-                            'order-date': order.get('PurchaseDate', ''),
-                            'sku': item.get('SellerSKU', ''),
-                            'quantity': item.get('QuantityOrdered', 0),
-                            'item-name': item.get('Title', ''),
-                            'order-status': order.get('OrderStatus', ''),
-                            'ship-service-level': order.get('ShipServiceLevel', ''),
-                            'buyer-email': order.get('BuyerInfo', {}).get('BuyerEmail', ''),
-                            'ship-address': self._format_shipping_address(order.get('ShippingAddress', {}))
-                        })
-            
-            return pd.DataFrame(order_data)
-            
+            order_data = pd.DataFrame()
+            for order_data in self.iter_unshipped_orders():
+                pass
+            return order_data
+
         except Exception as e:
             logger.error(f"Error getting unshipped orders: {e}")
             return None
-    
+
     def _format_shipping_address(self, address: Dict) -> str:
         """Format shipping address for display."""
         if not address:
@@ -291,24 +678,164 @@ class AmazonService:
             }
 
 
+def _iso(value: datetime.datetime) -> str:
+    """UTC ISO 8601 timestamp in the format SP-API returns, e.g. 2024-05-01T12:00:00Z."""
+    return value.astimezone(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _report_encoding(content_type: str, head: bytes) -> str:
+    """
+    Encoding of a flat file report: the Content-Type charset if Amazon sends one,
+    otherwise UTF-8 if the first bytes decode as UTF-8, else Cp1252.
+    """
+    for part in content_type.split(';'):
+        name, _, value = part.strip().partition('=')
+        if name.lower() == 'charset' and value:
+            try:
+                return codecs.lookup(value.strip('"')).name
+            except LookupError:
+                break
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'cp1252'
+
+
+def _normalize_product_id(product_id: pd.Series) -> pd.Series:
+    """
+    product-id as a string key. When every id is numeric, leading zeros are dropped so keys
+    match the ones the old numeric read_csv produced.
+    """
+    product_id = product_id.astype(object).where(product_id.notna())
+    present = product_id.dropna()
+    if len(present) and present.str.fullmatch(r'\d+').all():
+        product_id = product_id.where(product_id.isna(), product_id.str.lstrip('0').replace('', '0'))
+    return product_id
+
+
+class TokenBucket:
+    """Thread-safe token bucket for one SP-API operation."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Take one token, sleeping until it is available. Tokens are reserved under the lock."""
+        with self._lock:
+            now = monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait_time = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait_time > 0:
+            sleep(wait_time)
+
+    def set_rate(self, rate: float):
+        with self._lock:
+            self._refill(monotonic())
+            self.rate = rate
+
+    def drain(self):
+        """Empty the bucket after a throttled call so concurrent callers slow down too."""
+        with self._lock:
+            self._refill(monotonic())
+            self.tokens = min(self.tokens, 0.0)
+
+
 class RateLimiter:
-    """Simple rate limiter for Amazon API calls."""
-    
-    def __init__(self, calls_per_second: float = 0.5):
-        self.calls_per_second = calls_per_second
-        self.last_call_time = 0
-    
-    def __enter__(self):
-        current_time = datetime.datetime.now().timestamp()
-        time_since_last_call = current_time - self.last_call_time
-        min_interval = 1.0 / self.calls_per_second
-        
-        if time_since_last_call < min_interval:
-            sleep_time = min_interval - time_since_last_call
-            sleep(sleep_time)
-        
-        self.last_call_time = datetime.datetime.now().timestamp()
-        return self
-    
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        pass
\ No newline at end of file
+    """
+    Per-operation rate limiter for Amazon SP-API calls.
+
+    Each operation gets a token bucket refilled at the documented rate and burst of its
+    usage plan. The rate follows the x-amzn-RateLimit-Limit header of responses, and
+    throttled (429) calls are retried with exponential backoff and jitter.
+    """
+
+    # operation: (requests per second, burst) from the SP-API usage plans
+    DEFAULT_LIMITS = {
+        'getOrders': (0.0167, 20),
+        'getOrder': (0.5, 30),
+        'getOrderItems': (0.5, 30),
+        'getReports': (0.0222, 10),
+        'getReport': (2.0, 15),
+        'createReport': (0.0167, 15),
+        'getReportDocument': (0.0167, 15),
+        'createFeedDocument': (0.5, 15),
+        'createFeed': (0.0083, 15),
+        'getFeed': (2.0, 15),
+    }
+    FALLBACK_LIMIT = (0.5, 1)
+
+    def __init__(self, limits: Optional[Dict[str, tuple]] = None, max_retries: int = 5,
+                 backoff_base: float = 2.0, backoff_max: float = 60.0):
+        self.limits = dict(self.DEFAULT_LIMITS, **(limits or {}))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, operation: str) -> TokenBucket:
+        with self._lock:
+            if operation not in self._buckets:
+                self._buckets[operation] = TokenBucket(*self.limits.get(operation, self.FALLBACK_LIMIT))
+            return self._buckets[operation]
+
+    def acquire(self, operation: str):
+        self.bucket(operation).acquire()
+
+    def update_from_headers(self, operation: str, headers: Optional[Dict[str, str]]):
+        """Adopt the rate Amazon reports for this operation."""
+        limit = (headers or {}).get('x-amzn-RateLimit-Limit')
+        if not limit:
+            return
+        try:
+            rate = float(limit)
+        except ValueError:
+            return
+        bucket = self.bucket(operation)
+        if rate > 0 and rate != bucket.rate:
+            logger.debug(f"{operation} rate limit is {rate}/s")
+            bucket.set_rate(rate)
+
+    def call(self, operation: str, func, *args, **kwargs):
+        """
+        Call an SP-API function within the limits of its operation.
+
+        Args:
+            operation: SP-API operation name, e.g. 'getOrderItems'
+            func: Bound sp_api client method
+            *args, **kwargs: Passed to func
+
+        Returns:
+            The ApiResponse of func
+
+        Raises:
+            SellingApiRequestThrottledException: Still throttled after max_retries
+        """
+        bucket = self.bucket(operation)
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            try:
+                response = func(*args, **kwargs)
+            except SellingApiRequestThrottledException as e:
+                self.update_from_headers(operation, getattr(e, 'headers', None))
+                if attempt == self.max_retries:
+                    raise
+                bucket.drain()
+                delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.5)
+                logger.warning(f"{operation} throttled, retrying in {delay:.1f}s (attempt {attempt + 1})")
+                sleep(delay)
+                continue
+            self.update_from_headers(operation, getattr(response, 'headers', None))
+            return response
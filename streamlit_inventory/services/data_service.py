@@ -6,9 +6,29 @@ Extracted from invUpdateWindow.py various update methods and data processing log
 import pandas as pd
 import datetime
 import logging
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Callable, Dict, List, Optional, Any, Tuple, Union
 from pathlib import Path
+import os
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory, resource_tracker
 import numpy as np
+import pyarrow as pa
+
+from .allocation_service import AllocationService
+from .exclusion_service import ExclusionService
+from .metrics_service import RunMonitor, StageMetrics
+
+try:
+    from ..models.config import ConfigManager
+    from ..models.supplier_plan import SupplierPlan
+    from ..models.inventory_schema import enforce_inventory_schema, memory_bytes
+except ImportError:
+    # services is imported as a top-level package by the Streamlit pages
+    from models.config import ConfigManager
+    from models.supplier_plan import SupplierPlan
+    from models.inventory_schema import enforce_inventory_schema, memory_bytes
 
 logger = logging.getLogger(__name__)
 
@@ -16,29 +36,37 @@ logger = logging.getLogger(__name__)
 class DataService:
     """Service for standardized data processing and transformation."""
     
-    def __init__(self, root_path: str = ''):
+    def __init__(self, root_path: str = '', allocation_service: Optional[AllocationService] = None):
         self.root_path = root_path
         self.column_names = ['COMPAY', 'UPC', 'company Inventory', 'DESCRIPTION', 'EXTENDED DESCRIPTION']
-        self._supplier_processors = self._initialize_processors()
-    
-    def _initialize_processors(self) -> Dict[str, 'SupplierProcessor']:
-        """Initialize supplier-specific processors."""
-        return {
-            'AL': AliciaProcessor(self.root_path, self.column_names),
-            'VF': AmekorProcessor(self.root_path, self.column_names),
-            'BY': BoyangProcessor(self.root_path, self.column_names),
-            'NBF': ChadeProcessor(self.root_path, self.column_names),
-            'OUTRE': OutreProcessor(self.root_path, self.column_names),
-            'HZ': SensationnelProcessor(self.root_path, self.column_names),
-            'SNG': ShakeNGoProcessor(self.root_path, self.column_names),
-            'MANE': ManeProcessor(self.root_path, self.column_names)
-        }
+        self._allocation_service = allocation_service
+        self.duplicate_upcs = pd.DataFrame(columns=AllocationService.DIAGNOSTIC_COLUMNS)
+        self.exclusion_service = ExclusionService(root_path, self.column_names)
+        self.excluded_items = pd.DataFrame(columns=['rule'] + self.column_names)
+        self._supplier_plans = None
+    
+    @property
+    def supplier_plans(self) -> Dict[str, SupplierPlan]:
+        """Compiled supplier plans from ConfigManager, validated together on first use."""
+        if self._supplier_plans is None:
+            self._supplier_plans = ConfigManager(self.root_path).get_supplier_plans()
+        return self._supplier_plans
+    
+    @property
+    def allocation_service(self) -> AllocationService:
+        """Allocation policy and preferred suppliers from ConfigManager (allocation.json), loaded on first use."""
+        if self._allocation_service is None:
+            config = ConfigManager(self.root_path).get_allocation_config()
+            self._allocation_service = AllocationService(config.policy, config.preferred_suppliers)
+        return self._allocation_service
     
     def load_base_inventory(self) -> pd.DataFrame:
         """
         Load base inventory data.
         Extracted from invUpdateWindow.py load_all_upc_inv() method.
         """
+        # an update starts from the base inventory, so exclusions of a previous update are dropped
+        self.excluded_items = self.excluded_items.iloc[0:0]
         try:
             all_upc_inv = pd.read_excel(f"{self.root_path}appdata/all_upc_inv.xlsx")
             
@@ -47,47 +75,47 @@ class DataService:
             
             # Ensure column names match expected format
             all_upc_inv.columns = self.column_names
+            all_upc_inv = enforce_inventory_schema(all_upc_inv, self.column_names)
             
             logger.info(f"Loaded base inventory with {len(all_upc_inv)} records")
             return all_upc_inv
             
         except FileNotFoundError:
             logger.warning("Base inventory file not found, creating empty DataFrame")
-            return pd.DataFrame(columns=self.column_names)
+            return enforce_inventory_schema(pd.DataFrame(columns=self.column_names), self.column_names)
         except Exception as e:
             logger.error(f"Error loading base inventory: {e}")
             raise
     
     def process_supplier_file(self, supplier_code: str, file_path: Optional[str] = None) -> pd.DataFrame:
         """
-        Process supplier inventory file using supplier-specific processor.
+        Process supplier inventory file through the supplier's compiled plan.
         Includes validation and standardization.
         """
-        if supplier_code not in self._supplier_processors:
+        if supplier_code not in self.supplier_plans:
             raise ValueError(f"Unknown supplier code: {supplier_code}")
         
         try:
-            # Process file using supplier-specific processor
-            processor = self._supplier_processors[supplier_code]
-            processed_data = processor.process_file(file_path)
-            
-            # Apply additional standardization
-            processed_data = self.standardize_supplier_data(processed_data, supplier_code)
+            # Read only the mapped columns, then mapping and threshold rules of the plan
+            plan = self.supplier_plans[supplier_code]
+            processed_data = plan.execute(self.root_path, [file_path] if file_path else None, self.column_names)
             
             # Clean the data
             processed_data = self.clean_data(processed_data)
             
-            # Validate the processed data
-            is_valid, errors = self.validate_data(processed_data, self.column_names)
-            if not is_valid:
-                logger.warning(f"Data validation issues for {supplier_code}: {errors}")
-            
+            self._log_validation(supplier_code, processed_data)
             return processed_data
             
         except Exception as e:
             logger.error(f"Error processing supplier file for {supplier_code}: {e}")
             raise
     
+    def _log_validation(self, supplier_code: str, data: pd.DataFrame):
+        """Validate processed supplier data and log any issues."""
+        is_valid, errors = self.validate_data(data, self.column_names)
+        if not is_valid:
+            logger.warning(f"Data validation issues for {supplier_code}: {errors}")
+    
     def transform_data_types(self, data: pd.DataFrame, type_mappings: Dict[str, str]) -> pd.DataFrame:
         """
         Transform data types based on mapping specifications.
@@ -124,29 +152,128 @@ class DataService:
         
         return transformed_data
     
+    # Suppliers whose input files are smaller than this are parsed in-process
+    PARALLEL_MIN_BYTES = 1024 * 1024
+    PARSE_WORKERS = 4
+    
+    def _supplier_input_bytes(self, supplier_code: str) -> int:
+        """Total size of the supplier's input files."""
+        paths = self.supplier_plans[supplier_code].file_paths(self.root_path)
+        return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+    
+    def _parse_in_pool(self, supplier_codes: List[str], max_workers: Optional[int] = None,
+                       clean: bool = True, monitor: Optional[RunMonitor] = None) -> Dict[str, Any]:
+        """
+        Parse suppliers in worker processes.
+        Each worker returns its frame as an Arrow IPC stream in shared memory, which the
+        parent maps and converts without copying the stream or unpickling the frame.
+        
+        Args:
+            monitor: Receives the parse_<code> step each worker measured
+        
+        Returns:
+            Dictionary of supplier code to DataFrame or the exception it raised.
+            Suppliers missing from it (pool unavailable or broken) should be parsed in-process.
+        """
+        results = {}
+        try:
+            with ProcessPoolExecutor(max_workers=min(len(supplier_codes), max_workers or self.PARSE_WORKERS)) as pool:
+                futures = {
+                    code: pool.submit(_parse_supplier_to_shared_memory, self.supplier_plans[code],
+                                      self.root_path, self.column_names, clean)
+                    for code in supplier_codes
+                }
+                # collected in the order requested, read while the workers still hold the segments
+                for code, future in futures.items():
+                    try:
+                        metrics, result = future.result()
+                        results[code] = result if isinstance(result, pd.DataFrame) else _read_shared_memory(*result)
+                        if monitor:
+                            monitor.add(metrics)
+                    except BrokenProcessPool as e:
+                        logger.warning(f"Parse pool broke while parsing {code}, parsing in-process: {e}")
+                    except Exception as e:
+                        results[code] = e
+                        if monitor:
+                            monitor.record(f'parse_{code}', 'failed')
+        except (OSError, NotImplementedError, BrokenProcessPool) as e:
+            logger.warning(f"Parse pool unavailable, parsing in-process: {e}")
+        return results
+    
+    def parse_suppliers(self, supplier_codes: List[str], max_workers: Optional[int] = None,
+                        clean: bool = True, progress_callback: Optional[callable] = None,
+                        monitor: Optional[RunMonitor] = None) -> Dict[str, Any]:
+        """
+        Parse several suppliers.
+        
+        When two or more suppliers have at least PARALLEL_MIN_BYTES of input, those are
+        parsed in a process pool; the others are parsed in-process. The result does not
+        depend on where a supplier was parsed.
+        
+        Args:
+            supplier_codes: Suppliers to parse
+            max_workers: Pool size, PARSE_WORKERS by default
+            clean: Apply clean_data as process_supplier_file does; the desktop window uses
+                the plan output as is
+            progress_callback: Called with (step description, progress 0..1)
+            monitor: Records a parse_<code> step per supplier, measured in the process that parsed it
+        
+        Returns:
+            Dictionary of supplier code to DataFrame or the exception its parse raised,
+            in supplier_codes order
+        """
+        large = [code for code in supplier_codes
+                 if code in self.supplier_plans and self._supplier_input_bytes(code) >= self.PARALLEL_MIN_BYTES]
+        pooled = self._parse_in_pool(large, max_workers, clean, monitor) if len(large) > 1 else {}
+        
+        results = {}
+        for i, supplier_code in enumerate(supplier_codes):
+            if progress_callback:
+                progress_callback(f"Processing {supplier_code}", i / len(supplier_codes))
+            try:
+                if supplier_code in pooled:
+                    supplier_data = pooled.pop(supplier_code)
+                    if isinstance(supplier_data, Exception):
+                        raise supplier_data
+                    if clean:
+                        self._log_validation(supplier_code, supplier_data)
+                else:
+                    with monitor.measure(f'parse_{supplier_code}') if monitor else nullcontext() as metrics:
+                        supplier_data = self._parse_supplier(supplier_code, clean)
+                        if metrics:
+                            metrics.rows_out = len(supplier_data)
+                results[supplier_code] = supplier_data
+            except Exception as e:
+                results[supplier_code] = e
+        return results
+    
+    def _parse_supplier(self, supplier_code: str, clean: bool) -> pd.DataFrame:
+        if clean:
+            return self.process_supplier_file(supplier_code)
+        if supplier_code not in self.supplier_plans:
+            raise ValueError(f"Unknown supplier code: {supplier_code}")
+        return self.supplier_plans[supplier_code].execute(self.root_path, column_names=self.column_names)
+    
     def process_multiple_suppliers(self, supplier_codes: List[str], 
-                                 progress_callback: Optional[callable] = None) -> pd.DataFrame:
+                                 progress_callback: Optional[callable] = None,
+                                 max_workers: Optional[int] = None) -> pd.DataFrame:
         """
         Process multiple suppliers and combine their data.
         Useful for batch processing operations.
+        
+        Suppliers are parsed by parse_suppliers (large files in a process pool) and
+        combined in supplier_codes order.
         """
         all_supplier_data = []
-        total_suppliers = len(supplier_codes)
         
-        for i, supplier_code in enumerate(supplier_codes):
-            try:
-                if progress_callback:
-                    progress_callback(f"Processing {supplier_code}", i / total_suppliers)
-                
-                supplier_data = self.process_supplier_file(supplier_code)
-                all_supplier_data.append(supplier_data)
-                
-                logger.info(f"Successfully processed {supplier_code}: {len(supplier_data)} records")
-                
-            except Exception as e:
-                logger.error(f"Failed to process {supplier_code}: {e}")
+        parsed = self.parse_suppliers(supplier_codes, max_workers, progress_callback=progress_callback)
+        for supplier_code, supplier_data in parsed.items():
+            if isinstance(supplier_data, Exception):
+                logger.error(f"Failed to process {supplier_code}: {supplier_data}")
                 # Continue with other suppliers even if one fails
                 continue
+            all_supplier_data.append(supplier_data)
+            logger.info(f"Successfully processed {supplier_code}: {len(supplier_data)} records")
         
         if not all_supplier_data:
             logger.warning("No supplier data was successfully processed")
@@ -194,11 +321,9 @@ class DataService:
                 inplace=True
             )
             
-            # Append new data
+            # Append new data; the concat falls back to object columns, so the schema is re-applied
             updated_inventory = pd.concat([all_inventory, new_data], ignore_index=True)
-            
-            # Reset index
-            updated_inventory.reset_index(drop=True, inplace=True)
+            updated_inventory = enforce_inventory_schema(updated_inventory, self.column_names)
             
             logger.info(f"Updated inventory for {supplier_code}: {len(new_data)} records")
             return updated_inventory
@@ -207,34 +332,36 @@ class DataService:
             logger.error(f"Error updating supplier inventory for {supplier_code}: {e}")
             raise
     
+    def _record_exclusions(self, matches: pd.DataFrame):
+        """Keep the rows matched by the exclusion rules for the update summary."""
+        if self.excluded_items.empty:
+            self.excluded_items = matches.reset_index(drop=True)
+        elif not matches.empty:
+            self.excluded_items = pd.concat([self.excluded_items, matches], ignore_index=True)
+    
+    def apply_exclusions(self, all_inventory: pd.DataFrame, backorder: bool = True,
+                         duplicate: bool = True) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Apply backorder_list.xlsx and duplicate_list.xlsx (ExclusionService).
+        
+        Returns:
+            Tuple of the updated inventory and the matched rows with their rule
+        """
+        all_inventory = enforce_inventory_schema(all_inventory, self.column_names)
+        all_inventory, matches = self.exclusion_service.apply(all_inventory, backorder=backorder, duplicate=duplicate)
+        self._record_exclusions(matches)
+        return all_inventory, matches
+    
     def update_backorder_items(self, all_inventory: pd.DataFrame) -> pd.DataFrame:
         """
         Update backorder items to zero inventory.
         Extracted from invUpdateWindow.py update_backord() method.
         """
         try:
-            backorder_list = pd.read_excel(
-                f'{self.root_path}appdata/backorder_list.xlsx', 
-                dtype={'upc': str}
-            )
-            
-            # Ensure UPC columns are strings for comparison
-            all_inventory['UPC'] = all_inventory['UPC'].astype(str)
-            all_inventory['DESCRIPTION'] = all_inventory['DESCRIPTION'].astype(str)
-            all_inventory['EXTENDED DESCRIPTION'] = all_inventory['EXTENDED DESCRIPTION'].astype(str)
-            
-            # Set inventory to 0 for backorder items
-            backorder_mask = all_inventory["UPC"].isin(backorder_list['upc'])
-            all_inventory.loc[backorder_mask, "company Inventory"] = 0
-            
-            backorder_count = backorder_mask.sum()
-            logger.info(f"Updated {backorder_count} backorder items")
-            
+            all_inventory, matches = self.apply_exclusions(all_inventory, duplicate=False)
+            logger.info(f"Updated {len(matches)} backorder items")
             return all_inventory
             
-        except FileNotFoundError:
-            logger.warning("Backorder list file not found, skipping backorder update")
-            return all_inventory
         except Exception as e:
             logger.error(f"Error updating backorder items: {e}")
             return all_inventory
@@ -243,44 +370,36 @@ class DataService:
         """
         Remove duplicate items from inventory.
         Extracted from invUpdateWindow.py update_duplicate() method.
+        A row is removed only when its (UPC, DESCRIPTION, EXTENDED DESCRIPTION) is one entry of the list.
         """
         try:
-            duplicate_list = pd.read_excel(
-                f'{self.root_path}appdata/duplicate_list.xlsx',
-                dtype={'UPC': str, 'DESCRIPTION': str, 'EXTENDED DESCRIPTION': str}
-            )
-            
-            # Find duplicate indices
-            duplicate_mask = (
-                all_inventory['UPC'].isin(duplicate_list['UPC']) &
-                all_inventory['DESCRIPTION'].isin(duplicate_list['DESCRIPTION']) &
-                all_inventory['EXTENDED DESCRIPTION'].isin(duplicate_list['EXTENDED DESCRIPTION'])
-            )
-            
-            duplicate_indices = all_inventory[duplicate_mask].index
-            all_inventory.drop(duplicate_indices, inplace=True)
-            
-            logger.info(f"Removed {len(duplicate_indices)} duplicate items")
+            all_inventory, matches = self.apply_exclusions(all_inventory, backorder=False)
+            logger.info(f"Removed {len(matches)} duplicate items")
             return all_inventory
             
-        except FileNotFoundError:
-            logger.warning("Duplicate list file not found, skipping duplicate removal")
-            return all_inventory
         except Exception as e:
             logger.error(f"Error removing duplicate items: {e}")
             return all_inventory
     
-    def process_amazon_listings(self, all_inventory: pd.DataFrame, pos_data: pd.DataFrame) -> pd.DataFrame:
+    def process_amazon_listings(self, all_inventory: pd.DataFrame, pos_data: pd.DataFrame,
+                                listings: Optional[pd.DataFrame] = None) -> pd.DataFrame:
         """
         Process Amazon listings with inventory data.
         Extracted from invUpdateWindow.py update_amazon() method.
+
+        Args:
+            listings: Typed listings (AmazonService.get_listings);
+                read from inv_data/Amazon_All+Listings+Report.txt when omitted
         """
         try:
             # Load Amazon listings report
-            all_amazon = pd.read_csv(
-                f'{self.root_path}inv_data/Amazon_All+Listings+Report.txt', 
-                sep='\t'
-            )
+            if listings is None:
+                all_amazon = pd.read_csv(
+                    f'{self.root_path}inv_data/Amazon_All+Listings+Report.txt', 
+                    sep='\t'
+                )
+            else:
+                all_amazon = listings.copy()
             
             # Select relevant columns
             amazon_columns = [
@@ -291,34 +410,8 @@ class DataService:
             ]
             all_amazon = all_amazon[amazon_columns]
             
-            # Initialize inventory columns
-            all_amazon['product-id'] = all_amazon['product-id'].astype(str)
-            all_amazon['inv_Sum'] = 0
-            all_amazon['inv_comp'] = 0
-            all_amazon['inv_store'] = 0
-            
-            # Merge company inventory
-            comp_inv_data = all_inventory[['UPC', 'company Inventory']].rename(
-                columns={'UPC': 'product-id'}
-            )
-            comp_inv_data['product-id'] = comp_inv_data['product-id'].astype(str)
-            
-            all_amazon = all_amazon.merge(comp_inv_data, how='left', on='product-id')
-            all_amazon['inv_comp'] = all_amazon['company Inventory'].fillna(0).astype(int)
-            all_amazon.drop('company Inventory', axis=1, inplace=True)
-            
-            # Merge store inventory
-            store_inv_data = pos_data[['Item Lookup Code', 'FIN QTY']].rename(
-                columns={'Item Lookup Code': 'product-id'}
-            )
-            store_inv_data['product-id'] = store_inv_data['product-id'].astype(str)
-            
-            all_amazon = all_amazon.merge(store_inv_data, how='left', on='product-id')
-            all_amazon['inv_store'] = all_amazon['FIN QTY'].fillna(0).astype(int)
-            all_amazon.drop('FIN QTY', axis=1, inplace=True)
-            
-            # Calculate total inventory
-            all_amazon['inv_Sum'] = all_amazon['inv_store'] + all_amazon['inv_comp']
+            # Inventory columns through one row per UPC, duplicate UPCs resolved by the allocation policy
+            all_amazon, self.duplicate_upcs = self.allocation_service.allocate(all_amazon, all_inventory, pos_data)
             
             logger.info(f"Processed {len(all_amazon)} Amazon listings")
             return all_amazon
@@ -328,19 +421,28 @@ class DataService:
             raise
     
     def process_amazon_orders(self, amazon_listings: pd.DataFrame, pos_data: pd.DataFrame, 
-                            all_inventory: pd.DataFrame) -> pd.DataFrame:
+                            all_inventory: pd.DataFrame,
+                            unshipped_data: Optional[pd.DataFrame] = None) -> pd.DataFrame:
         """
         Process Amazon unshipped orders.
         Extracted from invUpdateWindow.py update_amazon_ord() method.
+
+        Args:
+            unshipped_data: Unshipped order lines (AmazonService.get_unshipped_feed);
+                read from inv_data/Amazon_unshipped_report.txt when omitted
         """
         try:
             # Load unshipped orders
-            unshipped_data = pd.read_csv(
-                f'{self.root_path}inv_data/Amazon_unshipped_report.txt',
-                sep='\t',
-                dtype={'product-id': str}
-            )
-            
+            if unshipped_data is None:
+                unshipped_data = pd.read_csv(
+                    f'{self.root_path}inv_data/Amazon_unshipped_report.txt',
+                    sep='\t',
+                    dtype={'product-id': str}
+                )
+            
+            # product-id (UPC) comes from the listings
+            unshipped_data = unshipped_data.drop(columns='product-id', errors='ignore')
+
             # Merge with Amazon listings
             amazon_subset = amazon_listings[['seller-sku', 'inv_comp', 'inv_store', 'product-id', 'item-name']]
             merged_data = unshipped_data.merge(amazon_subset, how='left', left_on='sku', right_on='seller-sku')
@@ -514,31 +616,6 @@ class DataService:
         
         return cleaned_data
     
-    def standardize_supplier_data(self, data: pd.DataFrame, supplier_code: str) -> pd.DataFrame:
-        """
-        Apply supplier-specific data standardization rules.
-        Extracted from common patterns in update_XX() methods.
-        """
-        standardized_data = data.copy()
-        
-        # Apply supplier-specific rules based on original logic
-        if supplier_code in ['VF', 'BY', 'MANE']:
-            # These suppliers set inventory to 0 if less than 10
-            mask = standardized_data['company Inventory'] < 10
-            standardized_data.loc[mask, 'company Inventory'] = 0
-        
-        elif supplier_code == 'NBF':
-            # NBF uses letter codes for inventory levels
-            inventory_mapping = {'A': 20, 'B': 5, 'C': 0, 'X': 0}
-            standardized_data['company Inventory'] = standardized_data['company Inventory'].replace(inventory_mapping).infer_objects(copy=False)
-        
-        elif supplier_code in ['OUTRE', 'HZ', 'SNG']:
-            # These suppliers use Y/N for availability
-            availability_mapping = {'Y': 20, 'N': 0}
-            standardized_data['company Inventory'] = standardized_data['company Inventory'].replace(availability_mapping).infer_objects(copy=False)
-        
-        return standardized_data
-    
     def process_pos_data(self, pos_data: pd.DataFrame, all_inventory: pd.DataFrame) -> pd.DataFrame:
         """
         Process POS data with inventory integration.
@@ -603,6 +680,7 @@ class DataService:
             'columns': list(data.columns),
             'missing_values': data.isnull().sum().to_dict(),
             'data_types': data.dtypes.to_dict(),
+            'memory_bytes': memory_bytes(data),
         }
         
         # Add specific checks for inventory data
@@ -624,237 +702,144 @@ class DataService:
         return report
 
 
-class SupplierProcessor:
-    """Base class for supplier-specific data processing."""
+
+class SupplierBatch:
+    """
+    Parses the suppliers of one pipeline run together.
     
-    def __init__(self, root_path: str, column_names: List[str]):
-        self.root_path = root_path
-        self.column_names = column_names
+    A pipeline runs its supplier stages one at a time; on the first take() the batch
+    parses every supplier that is due this run with DataService.parse_suppliers, so
+    large files are parsed in the process pool, and each stage then takes its own frame.
+    The fetch_<code> (prepare) and parse_<code> steps of each supplier are measured when
+    they run and recorded under that supplier's stage when it takes its frame.
+    """
     
-    def process_file(self, file_path: Optional[str] = None) -> pd.DataFrame:
-        """Process supplier file and return standardized DataFrame."""
-        raise NotImplementedError
-
-
-class AliciaProcessor(SupplierProcessor):
-    """Processor for Alicia (AL) supplier files."""
+    def __init__(self, data_service: DataService, due: Callable[[], List[str]],
+                 prepare: Optional[Callable[[str], Any]] = None, clean: bool = True,
+                 monitor: Optional[RunMonitor] = None):
+        """
+        Args:
+            data_service: Service whose plans parse the suppliers
+            due: Returns the supplier codes the run will parse (e.g. those not cached)
+            prepare: Called with each due supplier code before parsing, such as a download;
+                a supplier whose prepare raises fails with that error
+            clean: Passed to parse_suppliers
+            monitor: Monitor of the pipeline run, receives the steps of each supplier
+        """
+        self.data_service = data_service
+        self.due = due
+        self.prepare = prepare
+        self.clean = clean
+        self.monitor = monitor
+        self._steps = RunMonitor()
+        self._results: Optional[Dict[str, Any]] = None
     
-    def process_file(self, file_path: Optional[str] = None) -> pd.DataFrame:
-        """
-        Process AL inventory files (both brs and regular inv).
-        Extracted from invUpdateWindow.py update_AL() method.
-        """
-        try:
-            # Load both files - exact pattern from original code
-            temp1 = pd.read_excel(f'{self.root_path}inv_data/AL_brs inv.xls')
-            temp2 = pd.read_excel(f'{self.root_path}inv_data/AL_inv.xls')
-            
-            # Combine files
-            new_inv = pd.concat([temp1, temp2], ignore_index=True)
-            
-            # Select and rename columns - exact mapping from original
-            new_inv = new_inv[['AliasItemNo', 'OnHand Customer', 'ItemCode', 'ItemCodeDesc']]
-            new_inv.insert(0, 'Company', 'AL')
-            new_inv.columns = self.column_names
-            
-            # Pre-processing - exact pattern from original code
-            new_inv = new_inv.dropna(subset=['UPC', 'company Inventory'])
-            new_inv['company Inventory'] = new_inv['company Inventory'].astype('int')
-            
-            logger.info(f"Processed AL inventory: {len(new_inv)} records")
-            return new_inv
-            
-        except Exception as e:
-            logger.error(f"Error processing AL files: {e}")
-            raise
-
-
-class AmekorProcessor(SupplierProcessor):
-    """Processor for Amekor (VF) supplier files."""
+    def _parse(self, supplier_codes: List[str]) -> Dict[str, Any]:
+        results = {}
+        for code in supplier_codes if self.prepare else []:
+            try:
+                with self._steps.measure(f'fetch_{code}'):
+                    self.prepare(code)
+            except Exception as e:
+                results[code] = e
+        results.update(self.data_service.parse_suppliers(
+            [code for code in supplier_codes if code not in results], clean=self.clean, monitor=self._steps))
+        return results
     
-    def process_file(self, file_path: Optional[str] = None) -> pd.DataFrame:
+    def take(self, supplier_code: str) -> pd.DataFrame:
         """
-        Process VF inventory file.
-        Extracted from invUpdateWindow.py update_VF() method.
+        Parsed frame of a supplier, parsing the due suppliers on the first call.
+        A supplier that was not due is prepared and parsed on its own.
+        
+        Raises:
+            Exception: Whatever preparing or parsing the supplier raised
         """
-        try:
-            # Load file with specific dtype - exact pattern from original
-            new_inv = pd.read_excel(f'{self.root_path}inv_data/VF_Inventory.xls', dtype={'Barcode': str})
-            
-            # Select and rename columns - exact mapping from original
-            new_inv = new_inv[['Barcode', 'On hand', 'Product ID', 'SKU']]
-            new_inv.insert(0, 'Company', 'VF')
-            
-            # Clean barcode data - exact logic from original
-            new_inv.loc[new_inv['Barcode'].str.isnumeric() == False, 'Barcode'] = pd.NA
-            new_inv['Barcode'] = pd.to_numeric(new_inv['Barcode'], downcast='integer')
-            
-            new_inv.columns = self.column_names
-            
-            # Pre-processing - exact pattern from original code
-            new_inv = new_inv.dropna(subset=['UPC', 'company Inventory'])
-            new_inv['company Inventory'] = new_inv['company Inventory'].astype('int')
-            new_inv['UPC'] = new_inv['UPC'].astype('int64')
-            new_inv.loc[new_inv['company Inventory'] < 10, 'company Inventory'] = 0
-            
-            logger.info(f"Processed VF inventory: {len(new_inv)} records")
-            return new_inv
-            
-        except Exception as e:
-            logger.error(f"Error processing VF file: {e}")
-            raise
+        if self._results is None:
+            self._results = self._parse(self.due())
+        results = self._results if supplier_code in self._results else self._parse([supplier_code])
+        
+        steps = (f'fetch_{supplier_code}', f'parse_{supplier_code}')
+        if self.monitor:
+            for metrics in self._steps.stages:
+                if metrics.stage in steps:
+                    self.monitor.add(metrics)
+        self._steps.stages = [metrics for metrics in self._steps.stages if metrics.stage not in steps]
+        
+        result = results.pop(supplier_code)
+        if isinstance(result, Exception):
+            raise result
+        return result
 
 
-class BoyangProcessor(SupplierProcessor):
-    """Processor for Boyang (BY) supplier files."""
-    
-    def process_file(self, file_path: Optional[str] = None) -> pd.DataFrame:
-        """Process BY inventory file."""
-        try:
-            new_inv = pd.read_excel(f'{self.root_path}inv_data/BY_InventoryListAll.xls', skiprows=3)
-            
-            # Select and rename columns
-            new_inv = new_inv[['Barcode', 'O/H', 'Item Name', 'Color']]
-            new_inv.insert(0, 'Company', 'BY')
-            new_inv.columns = self.column_names
-            
-            # Clean data
-            new_inv = new_inv.dropna(subset=['UPC', 'company Inventory'])
-            new_inv['company Inventory'] = new_inv['company Inventory'].astype('int')
-            new_inv.loc[new_inv['company Inventory'] < 10, 'company Inventory'] = 0
-            
-            return new_inv
-            
-        except Exception as e:
-            logger.error(f"Error processing BY file: {e}")
-            raise
+# Segments created by this worker process. They stay open until the worker exits so the
+# parent can attach to them (on Windows a segment is freed with its last open handle).
+_exported_segments = []
 
 
-class ChadeProcessor(SupplierProcessor):
-    """Processor for Chade (NBF) supplier files."""
+def _parse_supplier_to_shared_memory(plan: SupplierPlan, root_path: str, column_names: List[str],
+                                     clean: bool = True) -> Tuple[StageMetrics, Union[Tuple[str, int], pd.DataFrame]]:
+    """
+    Parse (and clean) one supplier in a worker process.
     
-    def process_file(self, file_path: Optional[str] = None) -> pd.DataFrame:
-        """Process NBF inventory file."""
-        try:
-            new_inv = pd.read_excel(f'{self.root_path}inv_data/NBF_Chade Fashions.xlsx')
-            
-            # Select and rename columns
-            new_inv = new_inv[['UPC Code', 'Unnamed: 6', 'No.', 'Description']]
-            new_inv.insert(0, 'Company', 'NBF')
-            new_inv.columns = self.column_names
-            
-            # Clean data
-            new_inv = new_inv.dropna(subset=['UPC', 'company Inventory'])
-            new_inv[['company Inventory']] = new_inv[['company Inventory']].replace({'A': 20, 'B': 5, 'C': 0, 'X': 0})
-            
-            return new_inv
-            
-        except Exception as e:
-            logger.error(f"Error processing NBF file: {e}")
-            raise
-
-
-class OutreProcessor(SupplierProcessor):
-    """Processor for Outre supplier files."""
+    Returns:
+        Tuple of the parse_<code> step measured in the worker, and the name and size of the
+        shared memory segment holding the frame as an Arrow IPC stream, or the frame itself
+        (pickled) if Arrow cannot hold it, such as a column of mixed types
+    """
+    with RunMonitor().measure(f'parse_{plan.code}') as metrics:
+        data = plan.execute(root_path, column_names=column_names)
+        if clean:
+            data = DataService(root_path).clean_data(data)
+        metrics.rows_out = len(data)
+    try:
+        table = pa.Table.from_pandas(data, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return metrics, data
     
-    def process_file(self, file_path: Optional[str] = None) -> pd.DataFrame:
-        """Process OUTRE inventory file."""
-        try:
-            new_inv = pd.read_csv(
-                f'{self.root_path}inv_data/OUTRE_StockAvailability.csv',
-                sep='\t', encoding='utf_16', on_bad_lines='warn',
-                skiprows=[1], skipfooter=1, engine='python'
-            )
-            
-            # Select and rename columns
-            new_inv = new_inv[['BARCODE', 'AVAIL', 'ITEM', 'COLOR']]
-            new_inv.insert(0, 'Company', 'OUTRE')
-            new_inv.columns = self.column_names
-            
-            # Clean data
-            new_inv = new_inv.dropna(subset=['UPC', 'company Inventory'])
-            new_inv[['company Inventory']] = new_inv[['company Inventory']].replace({'Y': 20, 'N': 0})
-            
-            return new_inv
-            
-        except Exception as e:
-            logger.error(f"Error processing OUTRE file: {e}")
-            raise
-
-
-class SensationnelProcessor(SupplierProcessor):
-    """Processor for Sensationnel (HZ) supplier files."""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    stream = sink.getvalue()
     
-    def process_file(self, file_path: Optional[str] = None) -> pd.DataFrame:
-        """Process HZ inventory file."""
-        try:
-            new_inv = pd.read_csv(
-                f'{self.root_path}inv_data/HZ_StockAvailability.csv',
-                sep='\t', encoding='utf_16', on_bad_lines='warn',
-                skiprows=[1], skipfooter=1, engine='python'
-            )
-            
-            # Select and rename columns
-            new_inv = new_inv[['BARCODE', 'AVAIL', 'ITEM', 'COLOR']]
-            new_inv.insert(0, 'Company', 'HZ')
-            new_inv.columns = self.column_names
-            
-            # Clean data
-            new_inv = new_inv.dropna(subset=['UPC', 'company Inventory'])
-            new_inv[['company Inventory']] = new_inv[['company Inventory']].replace({'Y': 20, 'N': 0})
-            
-            return new_inv
-            
-        except Exception as e:
-            logger.error(f"Error processing HZ file: {e}")
-            raise
+    segment = shared_memory.SharedMemory(create=True, size=max(stream.size, 1))
+    segment.buf[:stream.size] = memoryview(stream).cast('B')
+    if os.name == 'posix':
+        # the parent unlinks the segment once attached; keep the worker's tracker from unlinking it again
+        resource_tracker.unregister(segment._name, 'shared_memory')
+    _exported_segments.append(segment)
+    return metrics, (segment.name, stream.size)
 
 
-class ShakeNGoProcessor(SupplierProcessor):
-    """Processor for Shake-N-Go (SNG) supplier files."""
+class _AttachedSegment:
+    """
+    A worker's shared memory segment, mapped by the parent.
     
-    def process_file(self, file_path: Optional[str] = None) -> pd.DataFrame:
-        """Process SNG inventory file."""
-        try:
-            new_inv = pd.read_excel(f'{self.root_path}inv_data/SNG_inv.xlsx')
-            
-            # Select and rename columns
-            new_inv = new_inv[['Barcode', 'Available', 'Item', 'Descrip']]
-            new_inv.insert(0, 'Company', 'SNG')
-            new_inv.columns = self.column_names
-            
-            # Clean data
-            new_inv = new_inv.dropna(subset=['UPC', 'company Inventory'])
-            new_inv[['company Inventory']] = new_inv[['company Inventory']].replace({'Y': 20, 'N': 0})
-            
-            return new_inv
-            
-        except Exception as e:
-            logger.error(f"Error processing SNG file: {e}")
-            raise
+    Arrow buffers wrapping it hold this object as their base, so the mapping lives as long
+    as any column read from it (string columns stay Arrow-backed in the DataFrame) and is
+    closed when the last of them is released.
+    """
+    
+    def __init__(self, name: str, size: int):
+        self._segment = shared_memory.SharedMemory(name=name)
+        # the mapping stays valid after unlink; the name is not needed anymore
+        self._segment.unlink()
+        self._view = pa.py_buffer(self._segment.buf[:size])
+    
+    @property
+    def address(self) -> int:
+        return self._view.address
+    
+    def __del__(self):
+        # release the view of the mapping before closing it
+        self._view = None
+        self._segment.close()
 
 
-class ManeProcessor(SupplierProcessor):
-    """Processor for Mane supplier files."""
-    
-    def process_file(self, file_path: Optional[str] = None) -> pd.DataFrame:
-        """Process MANE inventory file."""
-        try:
-            new_inv = pd.read_excel(f'{self.root_path}inv_data/MANE_inv.xlsx', dtype={'Barcode': str})
-            
-            # Select and rename columns
-            new_inv = new_inv[['Barcode', 'AQOH', 'Item', 'Color']]
-            new_inv.insert(0, 'Company', 'MANE')
-            new_inv.columns = self.column_names
-            
-            # Clean data
-            new_inv = new_inv.dropna(subset=['UPC', 'company Inventory'])
-            new_inv['company Inventory'] = new_inv['company Inventory'].astype('int')
-            new_inv['UPC'] = new_inv['UPC'].astype('int64')
-            new_inv.loc[new_inv['company Inventory'] < 10, 'company Inventory'] = 0
-            
-            return new_inv
-            
-        except Exception as e:
-            logger.error(f"Error processing MANE file: {e}")
-            raise
\ No newline at end of file
+def _read_shared_memory(name: str, size: int) -> pd.DataFrame:
+    """
+    Read an Arrow IPC stream from shared memory into a DataFrame without copying the stream.
+    The segment is unmapped once the frame (and every column still backed by it) is released.
+    """
+    segment = _AttachedSegment(name, size)
+    stream = pa.foreign_buffer(segment.address, size, base=segment)
+    return pa.ipc.open_stream(stream).read_all().to_pandas()
@@ -16,6 +16,36 @@ from contextlib import contextmanager
 logger = logging.getLogger(__name__)
 
 
+# Active items of the hair departments with their reorder number, department and supplier.
+# Plain SQL over dbo.<table> names, so the benchmarks can run it on SQLite (benchmarks/fixtures.py).
+POS_INVENTORY_QUERY = """
+    SELECT 
+        Item.ItemLookupCode AS 'Item Lookup Code',
+        Item.Price AS 'Price',
+        Item.Quantity AS 'Qty On Hand',
+        Item.SubDescription3 AS 'Display',
+        Item.SubDescription2 AS 'Comp Inv {comp_inv_date}',
+        Item.Description AS 'Description',
+        Item.ExtendedDescription AS 'Extended Description',
+        Item.BinLocation AS 'Bin Location',
+        sl.ReorderNumber AS 'Reorder Number',
+        Item.SubDescription1 AS 'BRAND',
+        dp.Name AS 'Departments',
+        sp.Code AS 'Supplier Code',
+        sp.SupplierName AS 'Supplier Name'
+    FROM
+        dbo.Item Item
+        LEFT JOIN dbo.SupplierList sl ON Item.ID=sl.ItemID AND Item.SupplierID=sl.SupplierID
+        LEFT JOIN dbo.Department dp ON Item.DepartmentID=dp.ID
+        LEFT JOIN dbo.Supplier sp ON Item.SupplierID=sp.ID
+    WHERE
+        Item.DepartmentID IN (2, 4, 6) 
+        AND Item.Inactive = 0
+    ORDER BY
+        ItemLookupCode;
+"""
+
+
 class DatabaseService:
     """
     READ-ONLY Service for managing POS database connections and operations.
@@ -31,10 +61,21 @@ class DatabaseService:
     - Get connection status
     """
     
-    def __init__(self, root_path: str = ''):
+    def __init__(self, root_path: str = '', engine=None):
+        """
+        Initialize database service.
+
+        Args:
+            root_path: Root path for appdata/db_auth.json
+            engine: SQLAlchemy engine to read from instead of the POS server (the benchmarks'
+                SQLite stand-in); db_auth.json is not needed then
+        """
         self.root_path = root_path
-        self._engine = None
-        self._load_config()
+        self._engine = engine
+        if engine is None:
+            self._load_config()
+        else:
+            self.server, self.database = engine.url.host, engine.url.database
     
     def _load_config(self):
         """Load database configuration from JSON file."""
@@ -96,32 +137,7 @@ class DatabaseService:
         Get POS inventory data.
         Extracted from salesUpdateWindow.py Worker.run() method.
         """
-        query = """
-        SELECT 
-            Item.ItemLookupCode AS 'Item Lookup Code',
-            Item.Price AS 'Price',
-            Item.Quantity AS 'Qty On Hand',
-            Item.SubDescription3 AS 'Display',
-            Item.SubDescription2 AS 'Comp Inv {comp_inv_date}',
-            Item.Description AS 'Description',
-            Item.ExtendedDescription AS 'Extended Description',
-            Item.BinLocation AS 'Bin Location',
-            sl.ReorderNumber AS 'Reorder Number',
-            Item.SubDescription1 AS 'BRAND',
-            dp.Name AS 'Departments',
-            sp.Code AS 'Supplier Code',
-            sp.SupplierName AS 'Supplier Name'
-        FROM
-            dbo.Item Item
-            LEFT JOIN dbo.SupplierList sl ON Item.ID=sl.ItemID AND Item.SupplierID=sl.SupplierID
-            LEFT JOIN dbo.Department dp ON Item.DepartmentID=dp.ID
-            LEFT JOIN dbo.Supplier sp ON Item.SupplierID=sp.ID
-        WHERE
-            Item.DepartmentID IN (2, 4, 6) 
-            AND Item.Inactive = 0
-        ORDER BY
-            ItemLookupCode;
-        """.format(comp_inv_date=datetime.date.today().strftime("%m%d"))
+        query = POS_INVENTORY_QUERY.format(comp_inv_date=datetime.date.today().strftime("%m%d"))
         
         try:
             with self.get_connection() as conn:
@@ -1,12 +1,11 @@
 """
 Email service for handling Gmail IMAP operations and supplier file downloads.
-Extracted from invUpdateWindow.py update methods (update_AL, update_VF, etc.).
+Supplier mail is downloaded through the compiled supplier plans shared with invUpdateWindow.py.
 Updated to use OAuth2 authentication instead of deprecated username/password.
 """
 
 import json
 import imaplib
-import email
 import datetime
 import os
 import logging
@@ -19,6 +18,14 @@ from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 
+try:
+    from ..models.config import ConfigManager
+    from ..models.supplier_plan import SupplierPlan
+except ImportError:
+    # services is imported as a top-level package by the Streamlit pages
+    from models.config import ConfigManager
+    from models.supplier_plan import SupplierPlan
+
 logger = logging.getLogger(__name__)
 
 # Gmail OAuth2 scope for full access
@@ -30,6 +37,7 @@ class EmailService:
     
     def __init__(self, root_path: str = ''):
         self.root_path = root_path
+        self._supplier_plans = None
         self._load_configs()
     
     def _load_configs(self):
@@ -136,142 +144,46 @@ class EmailService:
                               streamlit_mode: bool = False) -> List[str]:
         """
         Download files for specific supplier.
-        Extracted and generalized from individual update_XX() methods.
+        The mail folder, search criteria and attachment to file mapping come from the
+        supplier's compiled plan (see models/supplier_plan.py), so every supplier,
+        including ones added in keyword_mailadd.json, is downloaded the same way.
         
         Args:
             supplier_code: Code for the supplier (AL, VF, etc.)
             update_history: Optional history object to update
             streamlit_mode: If True, uses Streamlit-compatible authentication
         """
-        if supplier_code not in self.supplier_configs:
+        plans = self._get_supplier_plans()
+        if supplier_code not in plans:
             raise ValueError(f"Unknown supplier code: {supplier_code}")
         
-        supplier_config = self.supplier_configs[supplier_code]
-        downloaded_files = []
+        plan = plans[supplier_code]
         
         try:
+            os.makedirs(f'{self.root_path}inv_data', exist_ok=True)
             mail = self._connect_to_gmail(streamlit_mode=streamlit_mode)
-            
-            # Select appropriate mailbox based on supplier
-            if supplier_code in ['OUTRE']:
-                mail.select('Company/Outre')
-            elif supplier_code in ['HZ']:
-                mail.select('Company/Sensationnel')
-            else:
-                mail.select('"[Gmail]/All Mail"')
-            
-            # Build search criteria
-            search_criteria = self._build_search_criteria(supplier_code, supplier_config)
-            status, messages = mail.search(None, search_criteria)
-            
-            if status == 'OK' and messages[0]:
-                messages = messages[0].split()
-                downloaded_files = self._process_emails(
-                    mail, messages, supplier_code, supplier_config, update_history
-                )
-            else:
-                logger.warning(f"No emails found for supplier {supplier_code}")
-            
-            mail.close()
-            mail.logout()
+            try:
+                downloaded_files, date_received = plan.download(mail, self.root_path)
+                mail.close()
+            finally:
+                mail.logout()
             
         except Exception as e:
             logger.error(f"Error downloading files for supplier {supplier_code}: {e}")
             raise
         
-        return downloaded_files
-    
-    def _build_search_criteria(self, supplier_code: str, config: Dict) -> str:
-        """Build IMAP search criteria based on supplier configuration."""
-        if supplier_code in ['OUTRE', 'HZ']:
-            # These suppliers only use SUBJECT
-            return f'SUBJECT {config["SUBJECT"]}'
-        else:
-            # Most suppliers use both SUBJECT and FROM
-            return f'SUBJECT {config["SUBJECT"]} FROM {config["FROM"]}'
-    
-    def _process_emails(self, mail: imaplib.IMAP4_SSL, messages: List[bytes], 
-                       supplier_code: str, config: Dict, update_history: Optional[object]) -> List[str]:
-        """Process emails and download attachments."""
-        downloaded_files = []
-        
-        if supplier_code == 'SNG':
-            # Special handling for SNG - search for specific filename pattern
-            downloaded_files = self._process_sng_emails(mail, messages, update_history)
-        else:
-            # Standard processing for other suppliers
-            if messages:
-                # Get the latest email
-                res, msg = mail.fetch(messages[-1], '(RFC822)')
-                decoded_msg = email.message_from_bytes(msg[0][1])
-                
-                # Update history if provided
-                if update_history is not None:
-                    date_received = self._parse_email_date(decoded_msg.get('Date'), supplier_code)
-                    self._update_history_date(update_history, supplier_code, date_received)
-                
-                # Download attachments
-                downloaded_files = self._download_attachments(decoded_msg, supplier_code)
-        
-        return downloaded_files
-    
-    def _process_sng_emails(self, mail: imaplib.IMAP4_SSL, messages: List[bytes], 
-                           update_history: Optional[object]) -> List[str]:
-        """Special processing for SNG emails - search for specific filename pattern."""
-        downloaded_files = []
-        downloaded = False
-        
-        # Start from the most recent email and work backwards
-        for i in range(len(messages) - 1, -1, -1):
-            if downloaded:
-                break
-                
-            try:
-                res, msg = mail.fetch(messages[i], '(RFC822)')
-                decoded_msg = email.message_from_bytes(msg[0][1])
-                
-                # Update history (only for the first/most recent email processed)
-                if update_history is not None and i == len(messages) - 1:
-                    date_received = self._parse_email_date(decoded_msg.get('Date'), 'SNG')
-                    self._update_history_date(update_history, 'SNG', date_received)
-                
-                # Look for attachment with specific filename pattern
-                for part in decoded_msg.walk():
-                    if part.get('Content-Disposition'):
-                        filename = part.get_filename()
-                        # SNG specific condition: look for Excel files with specific naming pattern
-                        if filename and (len(filename) == 9 or filename.endswith('.xlsx')):
-                            # Create inv_data directory if it doesn't exist
-                            import os
-                            os.makedirs(f'{self.root_path}inv_data', exist_ok=True)
-                            
-                            file_path = f'{self.root_path}inv_data/SNG_inv.xlsx'
-                            with open(file_path, 'wb') as f:
-                                f.write(part.get_payload(decode=True))
-                            logger.info(f'SNG - {filename} downloaded to {file_path}')
-                            downloaded_files.append(file_path)
-                            downloaded = True
-                            break
-                            
-            except Exception as e:
-                logger.error(f"Error processing SNG email at position {i}: {e}")
-                continue
-        
         if not downloaded_files:
-            logger.info(f"No SNG files found with the expected filename pattern. Processed {len(messages)} emails.")
+            logger.warning(f"No files found for supplier {supplier_code}")
+        elif update_history is not None and plan.record_received:
+            self._update_history_date(update_history, supplier_code, date_received)
         
         return downloaded_files
     
-    def _parse_email_date(self, date_str: str, supplier_code: str) -> datetime.datetime:
-        """Parse email date string based on supplier format."""
-        try:
-            if supplier_code in ['OUTRE', 'HZ']:
-                return datetime.datetime.strptime(date_str, "%d %b %Y %X %z")
-            else:
-                return datetime.datetime.strptime(date_str, "%a, %d %b %Y %X %z")
-        except Exception as e:
-            logger.error(f"Error parsing date for {supplier_code}: {e}")
-            return datetime.datetime.now()
+    def _get_supplier_plans(self) -> Dict[str, SupplierPlan]:
+        """Compiled supplier plans, loaded on first use."""
+        if self._supplier_plans is None:
+            self._supplier_plans = ConfigManager(self.root_path).get_supplier_plans()
+        return self._supplier_plans
     
     def _update_history_date(self, update_history: object, supplier_code: str, date_received: datetime.datetime):
         """Update the history object with received date."""
@@ -281,74 +193,6 @@ class EmailService:
         except Exception as e:
             logger.error(f"Error updating history for {supplier_code}: {e}")
     
-    def _download_attachments(self, decoded_msg: email.message.Message, supplier_code: str) -> List[str]:
-        """Download attachments from email message."""
-        downloaded_files = []
-        
-        for part in decoded_msg.walk():
-            if part.get('Content-Disposition') or (supplier_code in ['OUTRE', 'HZ'] and 'name=' in part.get('Content-Type', '')):
-                filename = self._get_attachment_filename(part, supplier_code)
-                if filename and self._should_download_file(filename, supplier_code):
-                    file_path = self._get_file_path(filename, supplier_code)
-                    
-                    try:
-                        with open(file_path, 'wb') as f:
-                            f.write(part.get_payload(decode=True))
-                        logger.info(f'{supplier_code} - {filename} downloaded')
-                        downloaded_files.append(file_path)
-                    except Exception as e:
-                        logger.error(f"Error downloading {filename} for {supplier_code}: {e}")
-        
-        return downloaded_files
-    
-    def _get_attachment_filename(self, part: email.message.Message, supplier_code: str) -> Optional[str]:
-        """Extract filename from email part."""
-        if supplier_code in ['OUTRE', 'HZ']:
-            # Special handling for OUTRE and HZ
-            content_type = part.get('Content-Type', '')
-            if 'name=' in content_type:
-                return content_type.split('name=')[-1]
-        else:
-            return part.get_filename()
-        return None
-    
-    def _should_download_file(self, filename: str, supplier_code: str) -> bool:
-        """Determine if file should be downloaded based on supplier rules."""
-        if supplier_code == 'AL':
-            return 'brs' in filename or 'inv' in filename
-        elif supplier_code == 'VF':
-            return True  # Download all Excel files
-        elif supplier_code == 'NBF':
-            return filename.endswith('.xlsx')
-        elif supplier_code in ['OUTRE', 'HZ']:
-            return filename.endswith('.csv')
-        else:
-            return True
-    
-    def _get_file_path(self, filename: str, supplier_code: str) -> str:
-        """Get the file path where attachment should be saved."""
-        file_mapping = {
-            'AL': {
-                'brs': 'AL_brs inv.xls',
-                'inv': 'AL_inv.xls'
-            },
-            'VF': 'VF_Inventory.xls',
-            'BY': 'BY_InventoryListAll.xls',
-            'NBF': 'NBF_Chade Fashions.xlsx',
-            'OUTRE': 'OUTRE_StockAvailability.csv',
-            'HZ': 'HZ_StockAvailability.csv',
-            'SNG': 'SNG_inv.xlsx',
-            'MANE': 'MANE_inv.xlsx'
-        }
-        
-        if supplier_code == 'AL':
-            if 'brs' in filename:
-                return f'{self.root_path}inv_data/{file_mapping["AL"]["brs"]}'
-            else:
-                return f'{self.root_path}inv_data/{file_mapping["AL"]["inv"]}'
-        else:
-            return f'{self.root_path}inv_data/{file_mapping[supplier_code]}'
-    
     def setup_oauth2(self) -> bool:
         """
         Setup OAuth2 authentication for Gmail.
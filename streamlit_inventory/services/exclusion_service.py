@@ -0,0 +1,156 @@
+"""
+Backorder and duplicate exclusion rules.
+Replaces the isin() filters of invUpdateWindow.py update_backord() / update_duplicate()
+and DataService.update_backorder_items() / remove_duplicate_items().
+
+backorder_list.xlsx and duplicate_list.xlsx are compiled once per file version (mtime and
+size) into Arrow value sets: normalized UPCs for backorders and (UPC, DESCRIPTION,
+EXTENDED DESCRIPTION) keys for duplicates. The inventory is matched against them with a
+hash lookup per row, so the cost grows with table size plus list size, not their product.
+A duplicate rule only matches a row whose three values are the same entry of the list,
+not any mix of values from different entries.
+"""
+
+import os
+import logging
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+try:
+    from ..models.supplier_plan import STANDARD_COLUMNS
+    from ..models.inventory_schema import normalize_upc
+except ImportError:
+    # services is imported as a top-level package by the Streamlit pages
+    from models.supplier_plan import STANDARD_COLUMNS
+    from models.inventory_schema import normalize_upc
+
+logger = logging.getLogger(__name__)
+
+
+# path -> ((mtime_ns, size), compiled value set); shared by every ExclusionService of the process
+_compiled_lists: Dict[str, Tuple[Tuple[int, int], pa.Array]] = {}
+
+# Joins the parts of a composite key; a control character that Excel text cells do not hold
+KEY_SEPARATOR = '\x1f'
+
+
+def _text(values: pd.Series) -> pa.Array:
+    """Stripped text as an Arrow array, blanks and NaN as ''."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(object)
+    return pa.array(values.astype('string[pyarrow]').fillna('').str.strip(), type=pa.large_string())
+
+
+def _upc_key(upc: pd.Series) -> pa.Array:
+    return _text(normalize_upc(upc))
+
+
+def _composite_key(upc: pd.Series, description: pd.Series, extended: pd.Series) -> pa.Array:
+    """One key per (UPC, DESCRIPTION, EXTENDED DESCRIPTION) row."""
+    return pc.binary_join_element_wise(_upc_key(upc), _text(description), _text(extended),
+                                      pa.scalar(KEY_SEPARATOR, pa.large_string()))
+
+
+class ExclusionService:
+    """Service applying the backorder and duplicate lists to the combined inventory."""
+
+    BACKORDER_LIST = 'appdata/backorder_list.xlsx'
+    DUPLICATE_LIST = 'appdata/duplicate_list.xlsx'
+
+    def __init__(self, root_path: str = '', column_names: List[str] = STANDARD_COLUMNS):
+        """
+        Initialize exclusion service.
+
+        Args:
+            root_path: Root path for appdata files
+            column_names: Company, UPC, inventory, description and extended description columns
+        """
+        self.root_path = root_path
+        self.column_names = list(column_names)
+
+    def _compiled(self, relative_path: str, compile_list) -> Optional[pa.Array]:
+        """Compiled list of a file, recompiled when the file changes. None if the file is missing."""
+        path = f'{self.root_path}{relative_path}'
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            logger.warning(f"{path} not found, rule skipped")
+            return None
+
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = _compiled_lists.get(path)
+        if cached is None or cached[0] != version:
+            cached = (version, compile_list(path))
+            _compiled_lists[path] = cached
+            logger.info(f"Compiled {path}: {len(cached[1])} entries")
+        return cached[1]
+
+    @staticmethod
+    def _compile_backorders(path: str) -> pa.Array:
+        backorder_list = pd.read_excel(path, dtype={'upc': str})
+        upcs = _upc_key(backorder_list['upc'].dropna())
+        return pc.unique(pc.filter(upcs, pc.not_equal(upcs, '')))
+
+    @staticmethod
+    def _compile_duplicates(path: str) -> pa.Array:
+        duplicate_list = pd.read_excel(path, dtype={'UPC': str, 'DESCRIPTION': str, 'EXTENDED DESCRIPTION': str})
+        return pc.unique(_composite_key(duplicate_list['UPC'], duplicate_list['DESCRIPTION'],
+                                        duplicate_list['EXTENDED DESCRIPTION']))
+
+    def backorder_upcs(self) -> Optional[pa.Array]:
+        """Normalized UPCs of backorder_list.xlsx."""
+        return self._compiled(self.BACKORDER_LIST, self._compile_backorders)
+
+    def duplicate_keys(self) -> Optional[pa.Array]:
+        """(UPC, DESCRIPTION, EXTENDED DESCRIPTION) keys of duplicate_list.xlsx."""
+        return self._compiled(self.DUPLICATE_LIST, self._compile_duplicates)
+
+    def backorder_mask(self, inventory: pd.DataFrame) -> pd.Series:
+        """Rows whose UPC is on the backorder list."""
+        upcs = self.backorder_upcs()
+        if upcs is None or inventory.empty:
+            return pd.Series(False, index=inventory.index)
+        matched = pc.is_in(_upc_key(inventory[self.column_names[1]]), value_set=upcs)
+        return pd.Series(matched.to_numpy(zero_copy_only=False), index=inventory.index)
+
+    def duplicate_mask(self, inventory: pd.DataFrame) -> pd.Series:
+        """Rows whose (UPC, DESCRIPTION, EXTENDED DESCRIPTION) is an entry of the duplicate list."""
+        keys = self.duplicate_keys()
+        if keys is None or inventory.empty:
+            return pd.Series(False, index=inventory.index)
+        _, upc_col, _, desc_col, ext_col = self.column_names
+        rows = _composite_key(inventory[upc_col], inventory[desc_col], inventory[ext_col])
+        return pd.Series(pc.is_in(rows, value_set=keys).to_numpy(zero_copy_only=False), index=inventory.index)
+
+    def apply(self, inventory: pd.DataFrame, backorder: bool = True,
+              duplicate: bool = True) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Set backordered items to 0 and drop listed duplicates in one pass.
+
+        Args:
+            inventory: Combined inventory (all_upc_inv)
+            backorder: Apply backorder_list.xlsx
+            duplicate: Apply duplicate_list.xlsx
+
+        Returns:
+            Tuple of the updated inventory and the matched rows (as they were before the update)
+            with the rule that matched them
+        """
+        false = pd.Series(False, index=inventory.index)
+        backordered = self.backorder_mask(inventory) if backorder else false
+        duplicated = self.duplicate_mask(inventory) if duplicate else false
+
+        matches = pd.concat([
+            inventory[backordered].assign(rule='backorder'),
+            inventory[duplicated].assign(rule='duplicate')
+        ])
+        matches = matches[['rule'] + self.column_names]
+
+        inv_col = self.column_names[2]
+        updated = inventory[~duplicated].copy()
+        updated.loc[backordered[~duplicated], inv_col] = 0
+
+        logger.info(f"Exclusion rules: {int(backordered.sum())} backordered, {int(duplicated.sum())} duplicates removed")
+        return updated, matches
@@ -0,0 +1,301 @@
+"""
+Inventory update orchestration service.
+Refactored from invUpdateWindow.py Worker.run() for the Streamlit Inventory Update page.
+"""
+
+import logging
+from typing import Dict, List, Optional, Any, Callable
+import pandas as pd
+
+from .data_service import DataService, SupplierBatch
+from .database_service import DatabaseService
+from .square_service import SquareService
+from .amazon_service import AmazonService
+from .amazon_feed_service import AmazonFeedService
+from .pipeline_service import Pipeline, Stage, StageCache, file_key
+from .metrics_service import RunMonitor
+
+try:
+    from ..models.inventory_schema import MemoryReport
+except ImportError:
+    # services is imported as a top-level package by the Streamlit pages
+    from models.inventory_schema import MemoryReport
+
+logger = logging.getLogger(__name__)
+
+
+class InventoryService:
+    """Service orchestrating the inventory update pipeline."""
+
+    # Results read from the POS database and Amazon are reused by reruns for this long
+    EXTERNAL_MAX_AGE = 30 * 60
+
+    def __init__(self, root_path: str = '', stage_cache: Optional[StageCache] = None,
+                 database_service: Optional[DatabaseService] = None,
+                 amazon_service: Optional[AmazonService] = None):
+        """
+        Initialize inventory service.
+
+        Args:
+            root_path: Root path for appdata and inv_data files
+            stage_cache: Stage results of earlier updates to reuse (kept in the Streamlit session)
+            database_service: POS reader, DatabaseService(root_path) by default
+            amazon_service: Listings and unshipped orders source, AmazonService(root_path) by default
+                (the benchmarks pass offline stand-ins for both)
+        """
+        self.root_path = root_path
+        self.stage_cache = stage_cache if stage_cache is not None else StageCache()
+        self.data_service = DataService(root_path)
+        self.database_service = database_service or DatabaseService(root_path)
+        self._square_service = None
+        self._amazon_service = amazon_service
+        self._pipeline: Optional[Pipeline] = None
+
+    @property
+    def square_service(self) -> SquareService:
+        """Square service, created on first use since it needs square_auth.json."""
+        if self._square_service is None:
+            self._square_service = SquareService(self.root_path)
+        return self._square_service
+
+    @property
+    def amazon_service(self) -> AmazonService:
+        """Amazon service, created on first use since it needs api_keys.json."""
+        if self._amazon_service is None:
+            self._amazon_service = AmazonService(self.root_path)
+        return self._amazon_service
+
+    def update_inventory(self, selected_suppliers: List[str],
+                         progress_callback: Optional[Callable[[str, float], None]] = None,
+                         sync_square: bool = False, update_amazon: bool = False,
+                         push_amazon: bool = False, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Main inventory update orchestration.
+
+        Runs the update as a Pipeline; with the stage_cache of an earlier update, only the
+        stages whose inputs changed (or that failed) run again.
+
+        Args:
+            selected_suppliers: Supplier codes to refresh from their inventory files
+            progress_callback: Called with (step description, progress 0..1)
+            sync_square: Push POS quantities to Square from the same POS snapshot
+            update_amazon: Build Amazon listings and unshipped orders from the same POS snapshot
+            push_amazon: Send changed listing quantities to Amazon (requires update_amazon)
+                (Square and Amazon are not updated when a selected supplier fails)
+            refresh: Run every stage again instead of reusing cached results
+
+        Returns:
+            Dictionary with all_inventory, pos_data, the Square summary, amazon_listings,
+            amazon_orders, the Amazon feed summary (None when skipped or failed), the
+            duplicate UPC diagnostics, the rows matched by the backorder and duplicate lists,
+            the memory of all_inventory per stage, the status of every stage, the errors of
+            failed stages and the time, memory, I/O and rows of every stage (metrics)
+        """
+        monitor = RunMonitor('streamlit')
+        pipeline = Pipeline(self.build_stages(selected_suppliers, sync_square, update_amazon,
+                                              push_amazon and update_amazon, monitor), self.stage_cache)
+        self._pipeline = pipeline
+
+        def on_stage(stage: Stage, index: int, total: int, status: str):
+            if progress_callback:
+                suffix = '' if status == 'running' else f' ({status})'
+                progress_callback(f"{stage.description}{suffix}", (index + (status != 'running')) / total)
+
+        artifacts = pipeline.run(force=[stage.name for stage in pipeline.stages] if refresh else (),
+                                 on_stage=on_stage, monitor=monitor)
+        try:
+            monitor.save(self.root_path, 'failed' if pipeline.errors else 'completed', pipeline.errors)
+        except OSError as e:
+            logger.warning(f"Could not save run manifest: {e}")
+        if progress_callback:
+            progress_callback("Complete!", 1.0)
+
+        if 'all_inventory' not in artifacts:
+            failed = {name: str(error) for name, error in pipeline.errors.items()}
+            raise RuntimeError(f"Inventory update failed: {failed}")
+
+        memory = MemoryReport()
+        for stage, name in (('Base inventory', 'base_inventory'), ('Suppliers merged', 'merged_inventory'),
+                            ('Backorder items', 'backorder_inventory'), ('Duplicate items', 'all_inventory')):
+            memory.record(stage, artifacts[name])
+
+        excluded = [artifacts[name] for name in ('backordered_items', 'duplicate_items') if len(artifacts[name])]
+        return {'all_inventory': artifacts['all_inventory'], 'pos_data': artifacts.get('pos_data'),
+                'square': artifacts.get('square'), 'amazon_listings': artifacts.get('amazon_listings'),
+                'amazon_orders': artifacts.get('amazon_orders'), 'amazon_feed': artifacts.get('amazon_feed'),
+                'duplicate_upcs': artifacts.get('duplicate_upcs', self.data_service.duplicate_upcs),
+                'excluded_items': pd.concat(excluded, ignore_index=True) if excluded else self.data_service.excluded_items,
+                'memory': memory.to_dataframe(), 'stages': dict(pipeline.status),
+                'errors': {name: str(error) for name, error in pipeline.errors.items()},
+                'metrics': monitor.to_dataframe()}
+
+    def build_stages(self, selected_suppliers: List[str], sync_square: bool = False,
+                     update_amazon: bool = False, push_amazon: bool = False,
+                     monitor: Optional[RunMonitor] = None) -> List[Stage]:
+        """Stages of an update, in the order they are shown; monitor receives the parse step of each supplier."""
+        data = self.data_service
+        root = self.root_path
+        supplier_outputs = tuple(f'supplier_{code}' for code in selected_suppliers)
+        # the first supplier stage to run parses every supplier that is not cached, large files in a pool
+        suppliers = SupplierBatch(data, lambda: [
+            code for code in selected_suppliers
+            if self._pipeline is None or not self._pipeline.cached(f'supplier_{code}')], monitor=monitor)
+
+        def merge(base_inventory, **suppliers):
+            inventory = base_inventory.copy()
+            for code in selected_suppliers:
+                if suppliers[f'supplier_{code}'] is not None:
+                    inventory = data.update_supplier_inventory(inventory, code, suppliers[f'supplier_{code}'])
+            return {'merged_inventory': inventory}
+
+        # a broken list is reported and the inventory passes through, as before the pipeline
+        def backorder(merged_inventory):
+            try:
+                inventory, matches = data.apply_exclusions(merged_inventory, duplicate=False)
+            except Exception as e:
+                logger.error(f"Error updating backorder items: {e}")
+                inventory, matches = merged_inventory, data.excluded_items.iloc[0:0]
+            return {'backorder_inventory': inventory, 'backordered_items': matches}
+
+        def duplicate(backorder_inventory):
+            try:
+                inventory, matches = data.apply_exclusions(backorder_inventory, backorder=False)
+            except Exception as e:
+                logger.error(f"Error removing duplicate items: {e}")
+                inventory, matches = backorder_inventory, data.excluded_items.iloc[0:0]
+            return {'all_inventory': inventory, 'duplicate_items': matches}
+
+        stages = [Stage('load', lambda: {'base_inventory': data.load_base_inventory()},
+                        outputs=('base_inventory',), key=lambda: file_key(f'{root}appdata/all_upc_inv.xlsx'),
+                        label="Loading base inventory data")]
+        for code in selected_suppliers:
+            plan = data.supplier_plans.get(code)
+            stages.append(Stage(
+                f'supplier_{code}', lambda code=code: {f'supplier_{code}': suppliers.take(code)},
+                outputs=(f'supplier_{code}',),
+                key=lambda plan=plan: [repr(plan), file_key(*plan.file_paths(root)) if plan else None],
+                label=f"Updating {code} inventory"))
+        stages += [
+            Stage('merge', merge, inputs=('base_inventory',), optional=supplier_outputs,
+                  outputs=('merged_inventory',), label="Merging supplier inventory"),
+            Stage('backorder', backorder, inputs=('merged_inventory',),
+                  outputs=('backorder_inventory', 'backordered_items'),
+                  key=lambda: file_key(f'{root}{data.exclusion_service.BACKORDER_LIST}'), label="Updating backorder items"),
+            Stage('duplicate', duplicate, inputs=('backorder_inventory',),
+                  outputs=('all_inventory', 'duplicate_items'),
+                  key=lambda: file_key(f'{root}{data.exclusion_service.DUPLICATE_LIST}'), label="Updating duplicate items"),
+            Stage('pos', lambda all_inventory: {'pos_data': self.load_pos_snapshot(all_inventory)},
+                  inputs=('all_inventory',), outputs=('pos_data',), max_age=self.EXTERNAL_MAX_AGE,
+                  label="Loading POS inventory"),
+        ]
+        # quantities are pushed only when every selected supplier was read; the merge keeps a failed
+        # supplier's previous rows for all_inventory, but those must not reach Square or Amazon
+        if sync_square:
+            stages.append(Stage(
+                'square', self._push_square,
+                inputs=('pos_data',) + supplier_outputs, outputs=('square',), label="Updating Square inventory"))
+        if update_amazon:
+            stages += [
+                Stage('listings_report', lambda: {'listings': self._load_listings()}, outputs=('listings',),
+                      max_age=self.EXTERNAL_MAX_AGE, label="Loading Amazon listings report"),
+                Stage('amazon', self._allocate_listings, inputs=('all_inventory', 'pos_data', 'listings'),
+                      outputs=('amazon_listings', 'duplicate_upcs'),
+                      key=lambda: [data.allocation_service.policy, data.allocation_service.preferred_suppliers],
+                      label="Updating Amazon listings"),
+                Stage('amazon_ord', self._build_orders, inputs=('amazon_listings', 'pos_data', 'all_inventory'),
+                      outputs=('amazon_orders',), max_age=self.EXTERNAL_MAX_AGE,
+                      label="Updating Amazon unshipped orders"),
+            ]
+        if push_amazon:
+            stages.append(Stage(
+                'amazon_feed', self._push_amazon_feed,
+                inputs=('amazon_listings',) + supplier_outputs, outputs=('amazon_feed',), label="Pushing Amazon quantities"))
+        return stages
+
+    def load_pos_snapshot(self, all_inventory: pd.DataFrame) -> pd.DataFrame:
+        """
+        Read the POS item table once and process it.
+        The result is shared by every stage that needs POS quantities.
+        """
+        pos_data = self.database_service.get_pos_inventory_data()
+        pos_data = self.data_service.process_pos_data(pos_data, all_inventory)
+        pos_data['Item Lookup Code'] = pos_data['Item Lookup Code'].astype(str)
+        return pos_data
+
+    def sync_square(self, pos_data: pd.DataFrame, full: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Push quantities of a loaded POS snapshot to Square.
+
+        Returns:
+            Square push summary, or None if the sync could not run
+        """
+        try:
+            return self.square_service.push_pos_quantities(pos_data, full=full)
+        except Exception as e:
+            logger.error(f"Square sync failed: {e}")
+            return None
+
+    def _push_square(self, pos_data: pd.DataFrame, **suppliers) -> Dict[str, Any]:
+        # failed batches raise, so the stage fails instead of being cached and a rerun pushes again
+        summary = self.square_service.push_pos_quantities(pos_data)
+        if summary['failed_batches']:
+            raise RuntimeError(f"{summary['failed_batches']} of {summary['batches']} Square batches failed: "
+                               f"{'; '.join(summary['errors'])}")
+        return {'square': summary}
+
+    def _push_amazon_feed(self, amazon_listings: pd.DataFrame, **suppliers) -> Dict[str, Any]:
+        # failed feeds raise, so the stage fails instead of being cached and a rerun pushes again
+        summary = AmazonFeedService(self.amazon_service).push_quantities(amazon_listings)
+        if summary['failed_feeds']:
+            raise RuntimeError(f"{summary['failed_feeds']} of {summary['feeds']} Amazon feeds failed: "
+                               f"{'; '.join(summary['errors'])}")
+        return {'amazon_feed': summary}
+
+    def _load_listings(self) -> pd.DataFrame:
+        listings = self.amazon_service.get_listings()
+        if listings is None:
+            raise RuntimeError("Amazon listings report could not be loaded")
+        return listings
+
+    def _allocate_listings(self, all_inventory: pd.DataFrame, pos_data: pd.DataFrame,
+                           listings: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        amazon_listings = self.data_service.process_amazon_listings(all_inventory, pos_data, listings=listings)
+        return {'amazon_listings': amazon_listings, 'duplicate_upcs': self.data_service.duplicate_upcs}
+
+    def _build_orders(self, amazon_listings: pd.DataFrame, pos_data: pd.DataFrame,
+                      all_inventory: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        unshipped_data = self.amazon_service.get_unshipped_feed()
+        amazon_orders = self.data_service.process_amazon_orders(
+            amazon_listings, pos_data, all_inventory, unshipped_data=unshipped_data
+        )
+        return {'amazon_orders': amazon_orders}
+
+    def update_amazon(self, all_inventory: pd.DataFrame, pos_data: pd.DataFrame):
+        """
+        Build Amazon listings and unshipped orders.
+        Unshipped orders come from the SP-API order cache instead of Amazon_unshipped_report.txt.
+
+        Returns:
+            Tuple of amazon listings and unshipped orders, (None, None) on failure
+        """
+        try:
+            amazon_listings = self._allocate_listings(all_inventory, pos_data, self._load_listings())['amazon_listings']
+            amazon_orders = self._build_orders(amazon_listings, pos_data, all_inventory)['amazon_orders']
+            return amazon_listings, amazon_orders
+        except Exception as e:
+            logger.error(f"Amazon update failed: {e}")
+            return None, None
+
+    def push_amazon_quantities(self, amazon_listings: pd.DataFrame,
+                               feed_format: str = 'json') -> Optional[Dict[str, Any]]:
+        """
+        Send the listings whose quantity differs from inv_Sum as inventory feeds.
+
+        Returns:
+            Feed summary, or None if the feeds could not be built
+        """
+        try:
+            return AmazonFeedService(self.amazon_service, feed_format).push_quantities(amazon_listings)
+        except Exception as e:
+            logger.error(f"Amazon quantity feed failed: {e}")
+            return None
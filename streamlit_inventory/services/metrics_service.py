@@ -0,0 +1,221 @@
+"""
+Per-stage instrumentation of inventory updates.
+
+RunMonitor measures every stage of a Pipeline run (and any step measured inside a stage,
+such as the parse of a supplier file) and writes the run as a JSON manifest to
+appdata/runs/, which the Dashboard page reads to compare runs.
+
+Each measurement records:
+    wall_s, cpu_s        elapsed and process CPU seconds
+    peak_rss_delta_mb    how much the step raised the process's peak resident memory
+    read_mb, written_mb  bytes read and written by the process (files, mail, database)
+    rows_in, rows_out    rows of the DataFrames the step received and returned
+
+Memory and I/O counters come from psutil when it is installed, otherwise from the
+resource module and /proc/self/io; a counter the platform does not offer is left empty.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+from datetime import datetime
+from pathlib import Path
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional, Tuple, Any, Iterator
+import pandas as pd
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+RUNS_DIR = 'appdata/runs'
+MB = 1024 * 1024
+
+
+def _peak_rss() -> Optional[int]:
+    """Peak resident memory of the process in bytes."""
+    if psutil is not None:
+        memory = psutil.Process().memory_info()
+        if hasattr(memory, 'peak_wset'):
+            return memory.peak_wset
+    if resource is not None:
+        # kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    return None
+
+
+def _io_counters() -> Optional[Tuple[int, int]]:
+    """Bytes read and written by the process, including sockets."""
+    if psutil is not None:
+        try:
+            counters = psutil.Process().io_counters()
+            return (getattr(counters, 'read_chars', counters.read_bytes),
+                    getattr(counters, 'write_chars', counters.write_bytes))
+        except (AttributeError, psutil.Error):
+            return None
+    try:
+        with open('/proc/self/io') as f:
+            values = dict(line.split(': ') for line in f.read().splitlines())
+        return int(values['rchar']), int(values['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def count_rows(values: Any) -> Optional[int]:
+    """Rows of the DataFrames among values (a frame, a dict or a sequence), None if there are none."""
+    if isinstance(values, pd.DataFrame):
+        return len(values)
+    if isinstance(values, dict):
+        values = list(values.values())
+    if isinstance(values, (list, tuple)):
+        counts = [count_rows(value) for value in values]
+        counts = [count for count in counts if count is not None]
+        return sum(counts) if counts else None
+    return None
+
+
+@dataclass
+class StageMetrics:
+    """Measurements of one stage or step."""
+    stage: str
+    parent: Optional[str] = None
+    status: str = 'ran'
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    peak_rss_delta_mb: Optional[float] = None
+    read_mb: Optional[float] = None
+    written_mb: Optional[float] = None
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+
+
+@dataclass
+class RunMonitor:
+    """Collects StageMetrics of one update run and saves them as a manifest."""
+    source: str = 'streamlit'
+    run_id: str = field(default_factory=lambda: time.strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6])
+    started: float = field(default_factory=time.time)
+    stages: List[StageMetrics] = field(default_factory=list)
+    _active: List[str] = field(default_factory=list, repr=False)
+
+    @contextmanager
+    def measure(self, stage: str, rows_in: Optional[int] = None) -> Iterator[StageMetrics]:
+        """
+        Measure the block as a stage; steps measured inside it get it as parent.
+
+        The yielded StageMetrics can be given rows_out (and a status) by the block.
+        If the block raises, the stage is recorded as failed and the error propagates.
+        """
+        metrics = StageMetrics(stage, self._active[-1] if self._active else None, rows_in=rows_in)
+        self.stages.append(metrics)
+        self._active.append(stage)
+
+        peak, io = _peak_rss(), _io_counters()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield metrics
+        except BaseException:
+            metrics.status = 'failed'
+            raise
+        finally:
+            metrics.wall_s = round(time.perf_counter() - wall, 4)
+            metrics.cpu_s = round(time.process_time() - cpu, 4)
+            peak_after, io_after = _peak_rss(), _io_counters()
+            if peak is not None and peak_after is not None:
+                metrics.peak_rss_delta_mb = round((peak_after - peak) / MB, 2)
+            if io is not None and io_after is not None:
+                metrics.read_mb = round((io_after[0] - io[0]) / MB, 3)
+                metrics.written_mb = round((io_after[1] - io[1]) / MB, 3)
+            self._active.pop()
+            logger.info(f"{stage}: {metrics.status} in {metrics.wall_s:.2f}s "
+                        f"(cpu {metrics.cpu_s:.2f}s, rows {metrics.rows_in} -> {metrics.rows_out})")
+
+    def record(self, stage: str, status: str) -> StageMetrics:
+        """Record a stage that did not run (cached or skipped)."""
+        metrics = StageMetrics(stage, self._active[-1] if self._active else None, status=status)
+        self.stages.append(metrics)
+        return metrics
+
+    def add(self, metrics: StageMetrics) -> StageMetrics:
+        """Record a step measured elsewhere (ahead of its stage or in a worker process) under the running stage."""
+        metrics.parent = self._active[-1] if self._active else None
+        self.stages.append(metrics)
+        return metrics
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """One row per stage and step, in the order they started."""
+        return pd.DataFrame([asdict(metrics) for metrics in self.stages],
+                            columns=[name for name in StageMetrics.__dataclass_fields__])
+
+    def save(self, root_path: str = '', status: str = 'completed',
+             errors: Optional[Dict[str, Exception]] = None) -> Path:
+        """
+        Write the run manifest to appdata/runs/<run_id>.json.
+
+        Args:
+            root_path: Root path for appdata files
+            status: 'completed' or 'failed'
+            errors: Error of each failed stage
+
+        Returns:
+            Path of the manifest
+        """
+        manifest = {
+            'run_id': self.run_id, 'source': self.source, 'status': status,
+            'started': self.started, 'finished': time.time(),
+            'errors': {name: str(error) for name, error in (errors or {}).items()},
+            'stages': [asdict(metrics) for metrics in self.stages]
+        }
+        path = Path(f'{root_path}{RUNS_DIR}') / f'{self.run_id}.json'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(manifest, f, indent=1)
+        logger.info(f"Run manifest saved to {path}")
+        return path
+
+
+def load_run_manifests(root_path: str = '', limit: int = 30) -> pd.DataFrame:
+    """
+    Stages of the most recent run manifests, one row per stage.
+
+    Args:
+        root_path: Root path for appdata files
+        limit: Number of runs to read, newest first
+
+    Returns:
+        DataFrame with run_id, source, run_status, started (local time) and the StageMetrics columns
+    """
+    runs_dir = Path(f'{root_path}{RUNS_DIR}')
+    columns = ['run_id', 'source', 'run_status', 'started'] + list(StageMetrics.__dataclass_fields__)
+    if not runs_dir.is_dir():
+        return pd.DataFrame(columns=columns)
+
+    rows = []
+    for path in sorted(runs_dir.glob('*.json'), key=os.path.getmtime, reverse=True)[:limit]:
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping run manifest {path}: {e}")
+            continue
+        for stage in manifest['stages']:
+            rows.append({'run_id': manifest['run_id'], 'source': manifest['source'],
+                         'run_status': manifest['status'], 'started': manifest['started'], **stage})
+
+    runs = pd.DataFrame(rows, columns=columns)
+    runs['started'] = pd.to_datetime([datetime.fromtimestamp(started) for started in runs['started']])
+    return runs
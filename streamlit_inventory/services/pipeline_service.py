@@ -0,0 +1,385 @@
+"""
+Inventory update pipeline.
+Runs the stages of an update (supplier files, backorders, POS, Amazon, save) as a small DAG
+instead of the fixed sequence of invUpdateWindow.py Worker.run().
+
+Each stage declares the artifacts it reads and writes. A stage's fingerprint combines its
+name, its key (external state it depends on, such as file versions or options) and the
+fingerprints of its inputs. Outputs are cached by fingerprint in a StageCache that outlives
+a run, so a rerun after a failure re-executes only the failed stage and the stages
+downstream of anything that changed. Stages reading external systems (mail, POS, Amazon)
+set max_age so their cached results expire.
+
+CheckpointCache also writes every stage's outputs to a run directory (DataFrames as
+Feather, anything else pickled), so a run that crashed or was closed can be resumed by a
+new process from the last completed stage.
+"""
+
+import json
+import time
+import uuid
+import pickle
+import shutil
+import hashlib
+import logging
+import pandas as pd
+import pyarrow as pa
+from pathlib import Path
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Any, Callable, Iterable
+
+from .metrics_service import RunMonitor, count_rows
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineError(Exception):
+    """Invalid pipeline definition."""
+    pass
+
+
+@dataclass
+class Stage:
+    """
+    One step of the pipeline.
+
+    run is called with the input artifacts as keyword arguments and returns a dictionary
+    with exactly the declared outputs.
+    """
+    name: str
+    run: Callable[..., Dict[str, Any]]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    optional: Tuple[str, ...] = ()          # inputs passed as None when their stage failed
+    key: Optional[Callable[[], Any]] = None  # external state the stage depends on
+    max_age: Optional[float] = None         # seconds a cached result stays valid
+    label: str = ''
+
+    @property
+    def description(self) -> str:
+        return self.label or self.name
+
+
+def file_key(*paths: str) -> List[Any]:
+    """Version of files for a stage key: (path, mtime_ns, size), None for missing files."""
+    versions = []
+    for path in paths:
+        try:
+            stat = Path(path).stat()
+            versions.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            versions.append((path, None))
+    return versions
+
+
+@dataclass
+class CacheEntry:
+    fingerprint: str
+    outputs: Dict[str, Any]
+    execution_id: str
+    created: float
+
+
+class StageCache:
+    """Stage outputs by fingerprint, kept by the window or session between runs."""
+
+    def __init__(self):
+        self._entries: Dict[str, CacheEntry] = {}
+
+    def get(self, stage: Stage, fingerprint: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(stage.name)
+        if entry is None or entry.fingerprint != fingerprint:
+            return None
+        if stage.max_age is not None and time.time() - entry.created > stage.max_age:
+            return None
+        return entry
+
+    def put(self, stage: Stage, fingerprint: str, outputs: Dict[str, Any]) -> CacheEntry:
+        entry = CacheEntry(fingerprint, outputs, uuid.uuid4().hex, time.time())
+        self._entries[stage.name] = entry
+        return entry
+
+    def invalidate(self, *stage_names: str):
+        for name in stage_names:
+            self._entries.pop(name, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class Pipeline:
+    """Dependency-ordered stages with cached outputs."""
+
+    def __init__(self, stages: List[Stage], cache: Optional[StageCache] = None):
+        """
+        Initialize pipeline.
+
+        Args:
+            stages: Stages in preferred order; a stage always runs after the stages it reads from
+            cache: Cache shared with earlier runs, a new one by default
+
+        Raises:
+            PipelineError: Duplicate stage names or outputs, unknown inputs or a cycle
+        """
+        self.cache = cache if cache is not None else StageCache()
+        self.stages = self._order(stages)
+        self.status: Dict[str, str] = {}
+        self.errors: Dict[str, Exception] = {}
+        self._force: set = set()
+
+    @staticmethod
+    def _order(stages: List[Stage]) -> List[Stage]:
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise PipelineError(f"Duplicate stage names in {names}")
+
+        producer = {}
+        for stage in stages:
+            for output in stage.outputs:
+                if output in producer:
+                    raise PipelineError(f"{output} is written by {producer[output]} and {stage.name}")
+                producer[output] = stage.name
+
+        depends = {}
+        for stage in stages:
+            unknown = [name for name in stage.inputs + stage.optional if name not in producer]
+            if unknown:
+                raise PipelineError(f"{stage.name} reads {unknown}, which no stage writes")
+            depends[stage.name] = {producer[name] for name in stage.inputs + stage.optional}
+
+        # declaration order among the stages whose inputs are ready
+        ordered, done = [], set()
+        pending = list(stages)
+        while pending:
+            ready = next((stage for stage in pending if depends[stage.name] <= done), None)
+            if ready is None:
+                raise PipelineError(f"Cycle between stages {[stage.name for stage in pending]}")
+            ordered.append(ready)
+            done.add(ready.name)
+            pending.remove(ready)
+        return ordered
+
+    @staticmethod
+    def _fingerprint(stage: Stage, input_fingerprints: List[Any]) -> str:
+        key = stage.key() if stage.key else None
+        payload = json.dumps([stage.name, key, input_fingerprints], default=str, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def cached(self, stage_name: str) -> bool:
+        """
+        Whether run() reuses the cached result of a stage that reads no artifacts.
+        Lets the first of several such stages do the work of the others that will run
+        (supplier files are parsed in one batch).
+
+        Raises:
+            PipelineError: The stage reads artifacts, so its fingerprint is only known during a run
+        """
+        stage = next(stage for stage in self.stages if stage.name == stage_name)
+        if stage.inputs or stage.optional:
+            raise PipelineError(f"{stage_name} reads artifacts; its cache state is known only when it runs")
+        if stage_name in self._force:
+            return False
+        return self.cache.get(stage, self._fingerprint(stage, [])) is not None
+
+    def run(self, force: Iterable[str] = (),
+            on_stage: Optional[Callable[[Stage, int, int, str], None]] = None,
+            monitor: Optional[RunMonitor] = None) -> Dict[str, Any]:
+        """
+        Run every stage whose fingerprint has no cached result.
+
+        A failing stage is recorded in errors and skips the stages that need its outputs;
+        stages reading them as optional inputs run with None.
+
+        Args:
+            force: Names of stages to run even if cached (their dependents follow)
+            on_stage: Called with (stage, index, total, status) before a stage runs ('running')
+                and after it ('ran', 'cached', 'failed' or 'skipped')
+            monitor: Records time, memory, I/O and rows of every stage
+
+        Returns:
+            Artifacts by name
+        """
+        force = self._force = set(force)
+        artifacts: Dict[str, Any] = {}
+        fingerprints: Dict[str, str] = {}
+        self.status, self.errors = {}, {}
+        total = len(self.stages)
+
+        for index, stage in enumerate(self.stages):
+            missing = [name for name in stage.inputs if name not in artifacts]
+            if missing:
+                self.status[stage.name] = 'skipped'
+                if monitor:
+                    monitor.record(stage.name, 'skipped')
+                logger.warning(f"Skipping {stage.name}: {missing} not available")
+                if on_stage:
+                    on_stage(stage, index, total, 'skipped')
+                continue
+
+            names = stage.inputs + stage.optional
+            fingerprint = self._fingerprint(stage, [fingerprints.get(name) for name in names])
+            entry = None if stage.name in force else self.cache.get(stage, fingerprint)
+
+            if entry is None:
+                if on_stage:
+                    on_stage(stage, index, total, 'running')
+                inputs = {name: artifacts.get(name) for name in names}
+                try:
+                    with monitor.measure(stage.name, count_rows(inputs)) if monitor else nullcontext() as metrics:
+                        outputs = stage.run(**inputs) or {}
+                        if set(outputs) != set(stage.outputs):
+                            raise PipelineError(f"{stage.name} returned {sorted(outputs)}, "
+                                                f"declared {sorted(stage.outputs)}")
+                        if metrics:
+                            metrics.rows_out = count_rows(outputs)
+                except Exception as e:
+                    self.status[stage.name] = 'failed'
+                    self.errors[stage.name] = e
+                    logger.error(f"Stage {stage.name} failed: {e}")
+                    if on_stage:
+                        on_stage(stage, index, total, 'failed')
+                    continue
+                entry = self.cache.put(stage, fingerprint, outputs)
+                self.status[stage.name] = 'ran'
+            else:
+                self.status[stage.name] = 'cached'
+                if monitor:
+                    monitor.record(stage.name, 'cached').rows_out = count_rows(entry.outputs)
+                logger.info(f"Stage {stage.name} reused from cache")
+
+            for name in stage.outputs:
+                artifacts[name] = entry.outputs[name]
+                fingerprints[name] = f'{entry.execution_id}:{name}'
+            if on_stage:
+                on_stage(stage, index, total, self.status[stage.name])
+
+        return artifacts
+
+
+class CheckpointCache(StageCache):
+    """
+    StageCache persisted to a run directory.
+
+    Layout: <run_dir>/run.json holds the state of the last run and <run_dir>/<stage>/ the
+    outputs of one stage plus checkpoint.json, which is written last so a stage interrupted
+    while saving is simply run again.
+    """
+
+    RUN_FILE = 'run.json'
+    CHECKPOINT_FILE = 'checkpoint.json'
+
+    def __init__(self, run_dir: str):
+        """
+        Initialize checkpoint cache.
+
+        Args:
+            run_dir: Directory of the checkpoints, created on first write
+        """
+        super().__init__()
+        self.run_dir = Path(run_dir)
+
+    def _stage_dir(self, stage_name: str) -> Path:
+        return self.run_dir / stage_name
+
+    def get(self, stage: Stage, fingerprint: str) -> Optional[CacheEntry]:
+        if stage.name not in self._entries:
+            entry = self._read(stage.name, fingerprint)
+            if entry is not None:
+                self._entries[stage.name] = entry
+        return super().get(stage, fingerprint)
+
+    def put(self, stage: Stage, fingerprint: str, outputs: Dict[str, Any]) -> CacheEntry:
+        entry = super().put(stage, fingerprint, outputs)
+        try:
+            self._write(stage.name, entry)
+        except Exception as e:
+            # the run goes on with the in-memory entry; only resuming from this stage is lost
+            logger.warning(f"Could not checkpoint {stage.name}: {e}")
+            shutil.rmtree(self._stage_dir(stage.name), ignore_errors=True)
+        return entry
+
+    def _write(self, stage_name: str, entry: CacheEntry):
+        stage_dir = self._stage_dir(stage_name)
+        shutil.rmtree(stage_dir, ignore_errors=True)
+        stage_dir.mkdir(parents=True)
+
+        files = {}
+        for name, value in entry.outputs.items():
+            if isinstance(value, pd.DataFrame):
+                try:
+                    value.to_feather(stage_dir / f'{name}.feather')
+                    files[name] = f'{name}.feather'
+                    continue
+                except (pa.ArrowException, ValueError, TypeError):
+                    # mixed object columns that Arrow cannot type
+                    pass
+            with open(stage_dir / f'{name}.pkl', 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            files[name] = f'{name}.pkl'
+
+        checkpoint = {'fingerprint': entry.fingerprint, 'execution_id': entry.execution_id,
+                      'created': entry.created, 'files': files}
+        with open(stage_dir / self.CHECKPOINT_FILE, 'w') as f:
+            json.dump(checkpoint, f)
+
+    def _read(self, stage_name: str, fingerprint: str) -> Optional[CacheEntry]:
+        """Checkpointed entry of a stage, None if missing, unreadable or for another fingerprint."""
+        stage_dir = self._stage_dir(stage_name)
+        try:
+            with open(stage_dir / self.CHECKPOINT_FILE) as f:
+                checkpoint = json.load(f)
+            if checkpoint['fingerprint'] != fingerprint:
+                return None
+
+            outputs = {}
+            for name, file_name in checkpoint['files'].items():
+                if file_name.endswith('.feather'):
+                    outputs[name] = pd.read_feather(stage_dir / file_name)
+                else:
+                    with open(stage_dir / file_name, 'rb') as f:
+                        outputs[name] = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring checkpoint of {stage_name}: {e}")
+            return None
+
+        logger.info(f"Loaded checkpoint of {stage_name}")
+        return CacheEntry(fingerprint, outputs, checkpoint['execution_id'], checkpoint['created'])
+
+    def invalidate(self, *stage_names: str):
+        super().invalidate(*stage_names)
+        for name in stage_names:
+            shutil.rmtree(self._stage_dir(name), ignore_errors=True)
+
+    def clear(self):
+        super().clear()
+        shutil.rmtree(self.run_dir, ignore_errors=True)
+
+    def last_run(self) -> Optional[Dict[str, Any]]:
+        """State of the last run ('running', 'failed' or 'completed'), None if there was none."""
+        try:
+            with open(self.run_dir / self.RUN_FILE) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def interrupted(self) -> bool:
+        """Whether the last run crashed or had failed stages, so it can be resumed."""
+        run = self.last_run()
+        return run is not None and run['status'] != 'completed'
+
+    def begin_run(self):
+        self._write_run({'status': 'running', 'started': time.time()})
+
+    def end_run(self, errors: Dict[str, Exception]):
+        run = self.last_run() or {}
+        run.update({'status': 'failed' if errors else 'completed', 'finished': time.time(),
+                    'errors': {name: str(error) for name, error in errors.items()}})
+        self._write_run(run)
+
+    def _write_run(self, run: Dict[str, Any]):
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.run_dir / self.RUN_FILE, 'w') as f:
+            json.dump(run, f)
@@ -0,0 +1,363 @@
+"""
+Square inventory sync service.
+Extracted from squareInvUpdate.py. Pushes only the counts that moved since the last
+successful sync and keeps a cached catalog object_id/UPC mapping that is refreshed incrementally.
+"""
+
+import json
+import uuid
+import random
+import datetime
+import logging
+import threading
+from pathlib import Path
+from time import sleep, monotonic
+from typing import Dict, List, Optional, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+from square.client import Client
+
+logger = logging.getLogger(__name__)
+
+
+class SquareService:
+    """Service for pushing store quantities to Square inventory."""
+
+    BATCH_SIZE = 100  # maximum number of changes per batch_change_inventory call
+    CATALOG_PAGE_LIMIT = 1000  # maximum page size of search_catalog_objects
+    CATALOG_COLUMNS = ['object_id', 'upc', 'item_id', 'version', 'updated_at']
+    DEFAULT_LOCATION_ID = '7BRJFTZVH3FSX'
+
+    def __init__(self, root_path: str = '', client: Optional[Client] = None,
+                 max_workers: int = 4, requests_per_second: float = 5.0, max_retries: int = 5):
+        """
+        Initialize Square service.
+
+        Args:
+            root_path: Root path for appdata files
+            client: Square client to use instead of one built from square_auth.json
+            max_workers: Number of batches submitted concurrently
+            requests_per_second: Upper bound on batch requests per second across all workers
+            max_retries: Retries per batch on throttling, server errors and connection errors
+        """
+        self.root_path = root_path
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self._state_path = Path(f'{root_path}appdata/square_sync_state.json')
+        self._catalog_path = Path(f'{root_path}appdata/square_catalog.feather')
+        self._catalog_meta_path = Path(f'{root_path}appdata/square_catalog.json')
+        self._limiter = _IntervalLimiter(requests_per_second)
+        self._load_config()
+        self.client = client or self._create_client()
+
+    def _load_config(self):
+        """Load Square API configuration from JSON file."""
+        try:
+            with open(f'{self.root_path}appdata/square_auth.json') as f:
+                config = json.load(f)
+                self.access_token = config['access_token']
+                self.environment = config['environment']
+                # 'custom' environment points the client at a local stand-in (see dev/square_standin.py)
+                self.custom_url = config.get('custom_url')
+                self.location_id = config.get('location_id', self.DEFAULT_LOCATION_ID)
+        except FileNotFoundError:
+            logger.error(f"Square config file not found: {self.root_path}appdata/square_auth.json")
+            raise
+        except KeyError as e:
+            logger.error(f"Missing Square config key: {e}")
+            raise
+
+    def _create_client(self) -> Client:
+        """Create Square client from configuration."""
+        if self.environment == 'custom':
+            return Client(access_token=self.access_token, environment='custom', custom_url=self.custom_url)
+        return Client(access_token=self.access_token, environment=self.environment)
+
+    def get_catalog_mapping(self, refresh: bool = False) -> pd.DataFrame:
+        """
+        Get the object_id/UPC mapping of REGULAR item variations.
+
+        The mapping is cached on disk. Later calls only fetch catalog objects updated
+        since the cached catalog time (deleted items included) and merge them in.
+
+        Args:
+            refresh: Ignore the cache and fetch the whole catalog
+
+        Returns:
+            DataFrame with object_id, upc, item_id, version and updated_at columns
+        """
+        cached, latest_time = (None, None) if refresh else self._load_catalog_cache()
+
+        try:
+            objects, new_latest_time = self._search_catalog(begin_time=latest_time)
+        except Exception as e:
+            if cached is not None:
+                logger.warning(f"Square catalog refresh failed, using cached mapping: {e}")
+                return cached
+            raise
+
+        changed = self._catalog_rows(objects)
+        if cached is None:
+            mapping = changed
+        else:
+            # Updated items carry their full variation list, so their cached rows are replaced.
+            touched = {obj['id'] for obj in objects}
+            kept = cached[~cached['item_id'].isin(touched)]
+            mapping = pd.concat([kept, changed], ignore_index=True) if len(changed) else kept.reset_index(drop=True)
+
+        if cached is None or len(objects):
+            self._save_catalog_cache(mapping, new_latest_time or latest_time)
+        logger.info(f"Square catalog: {len(mapping)} variations ({len(objects)} items fetched)")
+        return mapping
+
+    def _search_catalog(self, begin_time: Optional[str] = None):
+        """
+        Fetch catalog items, following the pagination cursor.
+
+        Returns:
+            Tuple of item objects and the catalog latest_time reported by Square
+        """
+        body = {'object_types': ['ITEM'], 'limit': self.CATALOG_PAGE_LIMIT}
+        if begin_time:
+            body['begin_time'] = begin_time
+            body['include_deleted_objects'] = True
+
+        objects = []
+        latest_time = None
+        while True:
+            self._limiter.wait()
+            result = self.client.catalog.search_catalog_objects(body=body)
+            if result.is_error():
+                raise RuntimeError(f"Square catalog search failed ({result.status_code}): {result.errors}")
+
+            objects.extend(result.body.get('objects', []))
+            latest_time = result.body.get('latest_time', latest_time)
+            cursor = result.body.get('cursor')
+            if not cursor:
+                return objects, latest_time
+            body['cursor'] = cursor
+
+    def _catalog_rows(self, objects: List[Dict[str, Any]]) -> pd.DataFrame:
+        """Build the variation mapping of live REGULAR items in one DataFrame construction."""
+        rows = [
+            (variation['id'], variation.get('item_variation_data', {}).get('upc'), item['id'],
+             variation.get('version'), variation.get('updated_at'))
+            for item in objects
+            if not item.get('is_deleted') and item.get('item_data', {}).get('product_type', 'REGULAR') == 'REGULAR'
+            for variation in item['item_data'].get('variations', [])
+            if not variation.get('is_deleted')
+        ]
+        mapping = pd.DataFrame.from_records(rows, columns=self.CATALOG_COLUMNS)
+        missing_upc = mapping['upc'].isna()
+        if missing_upc.any():
+            logger.warning(f"{missing_upc.sum()} Square variations have no UPC: "
+                           f"{', '.join(mapping.loc[missing_upc, 'object_id'])}")
+        return mapping[~missing_upc].reset_index(drop=True)
+
+    def _load_catalog_cache(self):
+        """Load cached catalog mapping and its catalog time, (None, None) if unusable."""
+        if not (self._catalog_path.exists() and self._catalog_meta_path.exists()):
+            return None, None
+        try:
+            with open(self._catalog_meta_path) as f:
+                meta = json.load(f)
+            if meta.get('environment') != self.environment:
+                return None, None
+            mapping = pd.read_feather(self._catalog_path)
+            if list(mapping.columns) != self.CATALOG_COLUMNS:
+                return None, None
+            return mapping, meta.get('latest_time')
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable Square catalog cache: {e}")
+            return None, None
+
+    def _save_catalog_cache(self, mapping: pd.DataFrame, latest_time: Optional[str]):
+        """Save catalog mapping, then its metadata, so the metadata never describes a newer mapping."""
+        try:
+            mapping.reset_index(drop=True).to_feather(self._catalog_path)
+            with open(self._catalog_meta_path, 'w') as f:
+                json.dump({'environment': self.environment, 'latest_time': latest_time, 'rows': len(mapping)}, f)
+        except Exception as e:
+            logger.warning(f"Could not write Square catalog cache: {e}")
+
+    def load_sync_state(self) -> Dict[str, int]:
+        """Load last pushed quantity per catalog_object_id."""
+        if not self._state_path.exists():
+            return {}
+        try:
+            with open(self._state_path) as f:
+                return {k: int(v) for k, v in json.load(f).get('counts', {}).items()}
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable Square sync state: {e}")
+            return {}
+
+    def save_sync_state(self, state: Dict[str, int]):
+        """Save last pushed quantities, replacing the file atomically."""
+        tmp_path = self._state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'location_id': self.location_id,
+                'updated_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                'counts': state
+            }, f)
+        tmp_path.replace(self._state_path)
+
+    def compute_delta(self, counts: pd.DataFrame, state: Optional[Dict[str, int]] = None) -> pd.DataFrame:
+        """
+        Select the counts that differ from the last pushed quantities.
+
+        Args:
+            counts: DataFrame with 'object_id' and 'quantity' columns
+            state: Last pushed quantities (loaded from disk when omitted)
+
+        Returns:
+            Rows of counts whose quantity changed or was never pushed
+        """
+        if state is None:
+            state = self.load_sync_state()
+
+        counts = counts[['object_id', 'quantity']].drop_duplicates('object_id', keep='last')
+        last = counts['object_id'].map(state)
+        changed = last.isna() | (last != counts['quantity'])
+        return counts[changed].reset_index(drop=True)
+
+    def push_counts(self, counts: pd.DataFrame, full: bool = False) -> Dict[str, Any]:
+        """
+        Push physical counts to Square, sending only changed quantities.
+
+        Args:
+            counts: DataFrame with 'object_id' and 'quantity' columns
+            full: Send every count regardless of the stored state
+
+        Returns:
+            Summary with number of changes sent, batches and failed batches
+        """
+        counts = counts[['object_id', 'quantity']].copy()
+        counts['quantity'] = pd.to_numeric(counts['quantity'], errors='coerce').fillna(0).clip(lower=0).astype('int64')
+
+        state = self.load_sync_state()
+        delta = counts.drop_duplicates('object_id', keep='last') if full else self.compute_delta(counts, state)
+
+        summary = {'total': len(counts), 'changed': len(delta), 'batches': 0, 'failed_batches': 0, 'errors': []}
+        if delta.empty:
+            logger.info("Square inventory already up to date")
+            return summary
+
+        occurred_at = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        object_ids = delta['object_id'].tolist()
+        quantities = delta['quantity'].tolist()
+        batches = [
+            (object_ids[i:i + self.BATCH_SIZE], quantities[i:i + self.BATCH_SIZE])
+            for i in range(0, len(delta), self.BATCH_SIZE)
+        ]
+        summary['batches'] = len(batches)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._submit_batch, self._build_batch_body(ids, qtys, occurred_at)): (ids, qtys)
+                for ids, qtys in batches
+            }
+            for future in as_completed(futures):
+                ids, qtys = futures[future]
+                error = future.result()
+                if error is None:
+                    state.update(zip(ids, qtys))
+                else:
+                    summary['failed_batches'] += 1
+                    summary['errors'].append(error)
+
+        self.save_sync_state(state)
+        logger.info(f"Pushed {summary['changed']} Square counts in {summary['batches']} batches "
+                    f"({summary['failed_batches']} failed)")
+        return summary
+
+    def push_pos_quantities(self, pos_data: pd.DataFrame, upc_column: str = 'Item Lookup Code',
+                            quantity_column: str = 'Qty On Hand', full: bool = False,
+                            refresh_catalog: bool = False) -> Dict[str, Any]:
+        """
+        Push quantities of an already loaded POS snapshot to the matching Square variations.
+
+        Args:
+            pos_data: POS frame (fromPOS) keyed by the normalized UPC string
+            upc_column: Column holding the UPC / Item Lookup Code
+            quantity_column: Column holding the quantity to push
+            full: Send every count regardless of the stored state
+            refresh_catalog: Fetch the whole catalog instead of catalog changes only
+
+        Returns:
+            Summary from push_counts
+        """
+        mapping = self.get_catalog_mapping(refresh=refresh_catalog)[['object_id', 'upc']]
+        quantities = pos_data[[upc_column, quantity_column]].astype({upc_column: str})
+        counts = mapping.merge(quantities, how='inner', left_on='upc', right_on=upc_column)
+        counts = counts.rename(columns={quantity_column: 'quantity'})[['object_id', 'quantity']]
+
+        logger.info(f"Matched {len(counts)} of {len(mapping)} Square variations to POS items")
+        return self.push_counts(counts, full=full)
+
+    def _build_batch_body(self, object_ids: List[str], quantities: List[int], occurred_at: str) -> Dict[str, Any]:
+        """Build batch_change_inventory body. The idempotency key is fixed here and reused on retries."""
+        return {
+            'idempotency_key': str(uuid.uuid4()),
+            'changes': [
+                {
+                    'type': 'PHYSICAL_COUNT',
+                    'physical_count': {
+                        'catalog_object_id': object_id,
+                        'state': 'IN_STOCK',
+                        'location_id': self.location_id,
+                        'quantity': str(quantity),
+                        'occurred_at': occurred_at
+                    }
+                }
+                for object_id, quantity in zip(object_ids, quantities)
+            ]
+        }
+
+    def _submit_batch(self, body: Dict[str, Any]) -> Optional[str]:
+        """
+        Submit one batch, retrying throttled, failed and dropped requests with the same idempotency key.
+
+        Returns:
+            None on success, otherwise an error description
+        """
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                sleep(min(2 ** attempt, 30) * (0.5 + random.random()))
+
+            self._limiter.wait()
+            try:
+                result = self.client.inventory.batch_change_inventory(body=body)
+            except Exception as e:
+                error = f"Square request failed: {e}"
+                logger.warning(f"{error} (attempt {attempt + 1})")
+                continue
+
+            if result.is_success():
+                return None
+
+            error = f"Square batch {body['idempotency_key']} failed ({result.status_code}): {result.errors}"
+            if result.status_code != 429 and result.status_code < 500:
+                break
+            logger.warning(f"{error} (attempt {attempt + 1})")
+
+        logger.error(error)
+        return error
+
+
+class _IntervalLimiter:
+    """Thread-safe minimum interval between requests."""
+
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = monotonic()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if wait_time > 0:
+            sleep(wait_time)